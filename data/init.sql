@@ -180,3 +180,26 @@ INSERT INTO chat_edges (from_name, to_name) VALUES
     ('feedback_eingabe', 'feedback_gesendet'),
     ('feedback_nein', 'ende'),
     ('feedback_gesendet', 'ende');
+
+-- Version of the conversation graph, bumped on every change to its tables.
+-- The token is new for every database, so a rebuilt database never matches
+-- a graph snapshot of an old one. Ticket writes do not touch it.
+CREATE TABLE IF NOT EXISTS graph_version (
+    token TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO graph_version (token) VALUES (lower(hex(randomblob(16))));
+
+CREATE TRIGGER IF NOT EXISTS chat_nodes_insert AFTER INSERT ON chat_nodes
+BEGIN UPDATE graph_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS chat_nodes_update AFTER UPDATE ON chat_nodes
+BEGIN UPDATE graph_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS chat_nodes_delete AFTER DELETE ON chat_nodes
+BEGIN UPDATE graph_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS chat_edges_insert AFTER INSERT ON chat_edges
+BEGIN UPDATE graph_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS chat_edges_update AFTER UPDATE ON chat_edges
+BEGIN UPDATE graph_version SET version = version + 1; END;
+CREATE TRIGGER IF NOT EXISTS chat_edges_delete AFTER DELETE ON chat_edges
+BEGIN UPDATE graph_version SET version = version + 1; END;
@@ -6,9 +6,10 @@ current_dir = os.path.dirname(__file__)
 db_path = os.path.join(current_dir, "bugland.db")
 init_path = os.path.join(current_dir, "init.sql")
 
-# Delete old DB if it exists
-if os.path.exists(db_path):
-    os.remove(db_path)
+# Delete old DB if it exists, with the WAL files the ticket store leaves next to it
+for path in (db_path, db_path + "-wal", db_path + "-shm"):
+    if os.path.exists(path):
+        os.remove(path)
 
 # Connect to the SQLite database (this also creates the new database file)
 conn = sqlite3.connect(os.path.join(current_dir, "bugland.db"))
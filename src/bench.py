@@ -0,0 +1,134 @@
+import argparse
+import itertools
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+
+from chatbot.benchmark import (compare_results, environment, fixture_model, format_comparison,
+                               format_results, load_results, measure, save_results)
+from chatbot.chat import Chat
+from chatbot.debug_mode import close_logs, configure_log_sink, flush_logs, log_chat, persist_chat_log
+from chatbot.evaluation import choice_points
+from chatbot.graph import CompiledGraph, load_graph, read_graph
+from chatbot.matchers import IndexCache, ResultCache, StringMatcher, node_vocabulary
+from chatbot.repliers import GraphReplier
+from chatbot.tokens import tokenize
+from chatbot.types import ChatNode
+
+# Requests hitting keywords, near misses and unrelated text
+KEYWORD_REQUESTS = ["ich bin privat", "mein cleanbug startet nicht", "windowfly", "ja", "nein danke",
+                    "ich habe eine allgemeine frage", "business kunde", "der gartenroboter ist laut"]
+FREE_REQUESTS = ["mein gerät funktioniert seit gestern gar nicht mehr", "hallo",
+                 "ich weiß nicht genau was ich brauche", "können sie mir helfen"]
+# A solved cleanbug problem without feedback
+CONVERSATION = ["privat", "cleanbug", "startet nicht", "ja", "nein"]
+# choices of the wide candidate set
+MANY_CHOICES = 200
+
+
+def suite(db_path: pathlib.Path, extra_words: int):
+    """(name, fn, setup) for every benchmark."""
+    graph = load_graph(db_path)
+    points = choice_points({n.name: n for n in graph})
+    model = fixture_model(node_vocabulary([n.content for n in graph]), extra_words=extra_words)
+    # requests of fixture words outside the graph: scored through embedding neighbours
+    unknown = model.index_to_key[-extra_words:]
+    model_requests = [" ".join(unknown[i:i + 3]) for i in range(0, 300, 3)] + FREE_REQUESTS
+
+    def cycling(requests):
+        pairs = itertools.cycle([(r, nodes) for r in requests for nodes in points])
+        return lambda: next(pairs)
+
+    keyword_pair, free_pair, model_pair = cycling(KEYWORD_REQUESTS), cycling(FREE_REQUESTS), cycling(model_requests)
+    # a few answers typed over and over
+    repeated_pair = cycling(model_requests[:3])
+    # without result caches, every request is scored
+    plain = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    semantic = StringMatcher(cache=IndexCache(), model=model, results=ResultCache(0))
+    cold = StringMatcher(cache=IndexCache(), model=model, results=ResultCache(0))
+    cached = StringMatcher(cache=IndexCache(), model=model, results=ResultCache())
+    replier = GraphReplier(graph)
+
+    def conversation():
+        chat = Chat(replier, semantic, reset_log=False)
+        for request in [chat.START] + CONVERSATION:
+            chat.reply(request)
+
+    # one question with many choices, as in large graphs
+    vocabulary = node_vocabulary([n.content for n in graph])
+    menu = ChatNode('menu', 'o', 'Worum geht es?')
+    for i in range(MANY_CHOICES):
+        menu.addChild(ChatNode(f'wahl_{i}', 'c', ";".join(vocabulary[(3 * i + k) % len(vocabulary)] for k in range(3))))
+    wide = CompiledGraph.from_nodes(menu)
+    wide_choices = wide.children(wide.root)
+    wide_requests = itertools.cycle(model_requests)
+    requests = itertools.cycle(KEYWORD_REQUESTS + FREE_REQUESTS)
+
+    node = graph.node(graph.root)
+    entries = [{'kind': 'chat', 'name': n.name, 'type': n.type, 'content': n.content} for n in graph]
+
+    return [
+        ('match/keyword', lambda: plain.match(*keyword_pair()), None),
+        ('semantic_match/no_model', lambda: plain.semantic_match(*free_pair()), None),
+        ('semantic_match/model', lambda: semantic.semantic_match(*model_pair()), None),
+        ('semantic_match/model_result_cache', lambda: cached.semantic_match(*repeated_pair()), None),
+        ('semantic_match/model_cold_index', lambda: cold.semantic_match(*model_pair()), cold.cache.clear),
+        (f'semantic_match/{MANY_CHOICES}_choices_cold_index',
+         lambda: cold.semantic_match(next(wide_requests), wide_choices), cold.cache.clear),
+        ('tokenize/request', lambda: tokenize(next(requests)), None),
+        ('graph_load/sqlite', lambda: read_graph(db_path), None),
+        ('graph_load/snapshot', lambda: load_graph(db_path), None),
+        ('chat/conversation', conversation, None),
+        ('log/append_100', lambda: [log_chat(node) for _ in range(100)], None),
+        ('log/flush_63', flush_logs, lambda: [log_chat(node) for _ in range(63)]),
+        ('log/persist', lambda: persist_chat_log(entries), None),
+    ]
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Benchmark the matcher, graph loading, chat and logging hot paths")
+    parser.add_argument('--database', type=pathlib.Path, default=project_root / 'data' / 'bugland.db',
+                        help="Chat graph database (copied, the original is not touched)")
+    parser.add_argument('--repeat', type=int, default=200, help="Timed runs per benchmark")
+    parser.add_argument('--extra-words', type=int, default=5000,
+                        help="Words of the fixture embedding besides the graph vocabulary")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--output', type=pathlib.Path, help="Write the results as JSON")
+    parser.add_argument('--compare', type=pathlib.Path, help="JSON results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Relative slowdown counted as a regression (0.25 = 25%%, file I/O is noisy)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = pathlib.Path(tmp) / 'bugland.db'
+        shutil.copy(args.database, db_path)
+        os.environ['CHAT_LOG_PATH'] = str(pathlib.Path(tmp) / 'chat_log.jsonl')
+        os.environ.pop('GLOVE_MODEL_PATH', None)
+        # gensim's progress bars would flood the output and be timed with the index builds
+        os.environ['TQDM_DISABLE'] = '1'
+        configure_log_sink(buffer_size=64, flush_interval=60, background=False)
+
+        results = {}
+        for name, fn, setup in suite(db_path, args.extra_words):
+            if args.filter in name:
+                results[name] = measure(fn, repeat=args.repeat, setup=setup)
+        close_logs()
+
+    print(format_results(results))
+    if args.output:
+        save_results(args.output, results, environment())
+        print(f"Results written to {args.output}")
+    if args.compare:
+        rows = compare_results(load_results(args.compare), results, args.threshold)
+        print()
+        print(format_comparison(rows))
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
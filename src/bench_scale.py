@@ -0,0 +1,109 @@
+import argparse
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from chatbot.benchmark import percentile
+from chatbot.debug_mode import close_logs, configure_log_sink, set_memory_log
+from chatbot.graph import load_graph
+from chatbot.matchers import StringMatcher
+from chatbot.synthetic import generate_graph, run_sessions, scripted_walks
+
+
+def peak_rss_kib():
+    """Peak resident memory of this process in KiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _worker(args):
+    """One process: load the graph, run its share of the scripts on some threads."""
+    db_path, log_path, scripts, threads = args
+    os.environ['CHAT_LOG_PATH'] = log_path
+    set_memory_log(False)
+    configure_log_sink(background=True)
+    start = time.perf_counter()
+    graph = load_graph(db_path)
+    load = time.perf_counter() - start
+    result = run_sessions(graph, StringMatcher(), scripts, workers=threads)
+    close_logs()
+    result.update(load_seconds=load, graph_kib=graph.nbytes() / 1024, rss_kib=peak_rss_kib())
+    return result
+
+
+def run(db_path, tmp, scripts, mode, concurrency):
+    """Run the scripts with ``concurrency`` threads in one process or that many processes."""
+    processes, threads = (concurrency, 1) if mode == 'process' else (1, concurrency)
+    log_path = str(pathlib.Path(tmp) / 'chat_log.jsonl')
+    chunks = [(str(db_path), log_path, scripts[i::processes], threads) for i in range(processes)]
+    # fresh processes, so peak memory belongs to this run only
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        parts = list(pool.map(_worker, chunks))
+    elapsed = time.perf_counter() - start
+    busy = max(p['seconds'] for p in parts)
+    latencies = sorted(l * 1000 for p in parts for l in p['latencies'])
+    rss = [p['rss_kib'] for p in parts if p['rss_kib'] is not None]
+    return {
+        'turns': len(latencies),
+        'off_script': sum(p['off_script'] for p in parts),
+        'turns_per_s': len(latencies) / busy if busy else 0.0,
+        'wall_s': elapsed,
+        'load_ms': statistics.median(p['load_seconds'] for p in parts) * 1000,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'graph_kib': parts[0]['graph_kib'],
+        'rss_mib': max(rss) / 1024 if rss else None,
+        'total_rss_mib': sum(rss) / 1024 if rss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scripted chat sessions against synthetic graphs of growing size")
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Graph sizes to generate")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help="Sessions running at the same time")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                        help="Run concurrent sessions as threads of one process or as processes")
+    parser.add_argument('--sessions', type=int, default=1000, help="Sessions per run")
+    parser.add_argument('--max-turns', type=int, default=20, help="User turns per session at most")
+    parser.add_argument('--branching', type=int, default=3, help="Choices per question")
+    parser.add_argument('--keywords', type=int, default=3, help="Keywords per choice")
+    parser.add_argument('--cycle-rate', type=float, default=0.05,
+                        help="Share of choices leading back to an earlier question")
+    parser.add_argument('--input-rate', type=float, default=0.05,
+                        help="Share of questions asking for free text")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of graph and scripts")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'conc':>5} {'turns':>7} {'turns/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'load ms':>8} {'graph KiB':>10} {'RSS MiB':>8} {'off':>4}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nodes in args.nodes:
+            db_path = pathlib.Path(tmp) / f"synthetic_{nodes}.db"
+            generate_graph(db_path, nodes, args.branching, args.keywords, args.cycle_rate,
+                           args.input_rate, args.seed)
+            load_graph(db_path)  # write the snapshot once, every run then loads it
+            scripts = scripted_walks(load_graph(db_path), args.sessions, args.max_turns, args.seed)
+            for concurrency in args.concurrency:
+                r = run(db_path, tmp, scripts, args.mode, concurrency)
+                rss = f"{r['rss_mib']:8.1f}" if r['rss_mib'] is not None else f"{'-':>8}"
+                print(f"{nodes:>8} {concurrency:>5} {r['turns']:>7} {r['turns_per_s']:>9.0f} "
+                      f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['load_ms']:>8.1f} "
+                      f"{r['graph_kib']:>10.1f} {rss} {r['off_script']:>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import multiprocessing
+import os
+import pathlib
+import statistics
+import tempfile
+import time
+
+from chatbot.benchmark import fixture_model, memory_usage
+from chatbot.evaluation import choice_points
+from chatbot.graph import load_graph
+from chatbot.matchers import MODEL_PATH_ENV, SHARED_MODEL_ENV, IndexCache, ResultCache, StringMatcher, node_vocabulary
+
+# Requests for a real model; the fixture model gets requests of its own words
+REQUESTS = ["my vacuum cleaner does not start", "the window robot falls down", "weeds in the garden",
+            "i have a general question", "business customer", "the device is loud"]
+
+
+def _publisher(path, ready, barrier, results):
+    """The loader: copy the model into shared memory and keep it until the workers are measured."""
+    from chatbot.semantic import load_model
+    from chatbot.shared_model import SharedModel
+
+    with SharedModel.publish(load_model(path), source=path) as shared:
+        ready.put((shared.name, shared.size))
+        barrier.wait()
+        results.put(('loader', 0.0, memory_usage(), None))
+        barrier.wait()
+
+
+def _worker(env, db_path, requests, barrier, results):
+    """One matcher process: load or attach the model, match every request, report its memory."""
+    import chatbot.semantic  # noqa: F401 -- numpy and gensim are not part of the model's cost
+    os.environ.update(env, TQDM_DISABLE='1')
+    graph = load_graph(db_path)
+    points = choice_points({n.name: n for n in graph})
+    base = memory_usage()
+    start = time.perf_counter()
+    matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    matcher.warm_up(points)
+    load = time.perf_counter() - start
+    for request in requests:
+        for nodes in points:
+            matcher.semantic_match(request, nodes)
+    # every process holds its model while all of them are measured
+    barrier.wait()
+    results.put(('worker', load, memory_usage(), base))
+    barrier.wait()
+
+
+def run(mode, model_path, db_path, requests, workers):
+    """Memory of ``workers`` matcher processes loading the model file or attaching one shared copy."""
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    processes = []
+    block = None
+    if mode == 'shared':
+        ready = ctx.Queue()
+        barrier = ctx.Barrier(workers + 1)
+        processes.append(ctx.Process(target=_publisher, args=(str(model_path), ready, barrier, results)))
+        processes[0].start()
+        name, block = ready.get()
+        env = {SHARED_MODEL_ENV: name}
+    else:
+        barrier = ctx.Barrier(workers)
+        env = {MODEL_PATH_ENV: str(model_path)}
+    for _ in range(workers):
+        processes.append(ctx.Process(target=_worker, args=(env, str(db_path), requests, barrier, results)))
+        processes[-1].start()
+    parts = [results.get() for _ in processes]
+    for p in processes:
+        p.join()
+
+    measured = [p for p in parts if p[2] is not None]
+    if not measured:
+        return None
+    own = [(usage, base) for kind, _, usage, base in measured if kind == 'worker']
+    return {
+        'load_ms': statistics.median(load for kind, load, _, _ in parts if kind == 'worker') * 1000,
+        'rss_mib': statistics.median(u['rss'] for u, _ in own) / 1024,
+        'pss_mib': statistics.median(u['pss'] for u, _ in own) / 1024,
+        'model_uss_mib': statistics.median(u['uss'] - b['uss'] for u, b in own) / 1024,
+        'total_pss_mib': sum(u['pss'] for _, _, u, _ in measured) / 1024,
+        'block_mib': block / 2 ** 20 if block else None,
+    }
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Memory of matcher processes each loading the model versus attaching one shared copy")
+    parser.add_argument('--model', type=pathlib.Path,
+                        help="Embeddings (.kv or word2vec text); default: a fixture model of --words words")
+    parser.add_argument('--words', type=int, default=400000, help="Words of the fixture model")
+    parser.add_argument('--database', type=pathlib.Path, default=project_root / 'data' / 'bugland.db',
+                        help="Chat graph whose choice points are matched")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8], help="Matcher processes per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path, requests = args.model, REQUESTS
+        if model_path is None:
+            graph = load_graph(args.database)
+            model = fixture_model(node_vocabulary([n.content for n in graph]), extra_words=args.words)
+            model_path = pathlib.Path(tmp) / 'fixture.kv'
+            model.save(str(model_path))
+            unknown = model.index_to_key[-30:]
+            requests = [" ".join(unknown[i:i + 3]) for i in range(0, 30, 3)]
+            del model
+
+        print(f"{'mode':>7} {'workers':>8} {'load ms':>8} {'RSS MiB':>8} {'PSS MiB':>8} "
+              f"{'model USS':>10} {'total PSS':>10} {'block MiB':>10}")
+        for workers in args.workers:
+            for mode in ('file', 'shared'):
+                r = run(mode, model_path, args.database, requests, workers)
+                if r is None:
+                    print("Memory is read from /proc/self/smaps_rollup, which this system does not have.")
+                    return
+                block = f"{r['block_mib']:10.1f}" if r['block_mib'] is not None else f"{'-':>10}"
+                print(f"{mode:>7} {workers:>8} {r['load_ms']:>8.1f} {r['rss_mib']:>8.1f} {r['pss_mib']:>8.1f} "
+                      f"{r['model_uss_mib']:>10.1f} {r['total_pss_mib']:>10.1f} {block}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import pathlib
+import statistics
+import tempfile
+import time
+
+from chatbot.graph import load_graph, snapshot_path
+from chatbot.synthetic import generate_graph
+
+
+def time_load(db_path, cold, repeat):
+    times = []
+    for _ in range(repeat):
+        if cold:
+            snapshot_path(db_path).unlink(missing_ok=True)
+        start = time.perf_counter()
+        load_graph(db_path)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Compare graph loading from the database and from its snapshot")
+    parser.add_argument('--database', type=pathlib.Path, default=project_root / 'data' / 'bugland.db',
+                        help="Path to the chat graph database")
+    parser.add_argument('--nodes', type=int, nargs='*', default=[],
+                        help="Also benchmark synthetic graphs of these sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        databases = [args.database]
+        for n in args.nodes:
+            databases.append(pathlib.Path(tmp) / f"synthetic_{n}.db")
+            generate_graph(databases[-1], n)
+        for db in databases:
+            nodes = len(load_graph(db, snapshot=False))
+            read = time_load(db, cold=True, repeat=args.repeat)
+            warm = time_load(db, cold=False, repeat=args.repeat)
+            print(f"{db.name}: {nodes} nodes, cold {read:.2f} ms (read DB + write snapshot), "
+                  f"warm {warm:.2f} ms (snapshot), {read / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
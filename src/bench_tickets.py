@@ -0,0 +1,104 @@
+import argparse
+import multiprocessing
+import pathlib
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from chatbot.tickets import TicketStore
+
+SCHEMA = """CREATE TABLE tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status VARCHAR(20) DEFAULT 'open',
+    content TEXT
+)"""
+
+
+def insert_per_connection(db_path):
+    """The old pattern: connect, insert and commit for every ticket."""
+    def open_ticket(email, content):
+        conn = sqlite3.connect(db_path, timeout=30)
+        with conn:
+            conn.execute("INSERT INTO tickets (email, content) VALUES (?, ?)", (email, content))
+        conn.close()
+    return open_ticket, lambda: None
+
+
+def insert_with_store(db_path, batch_size, max_delay):
+    store = TicketStore(db_path, batch_size=batch_size, max_delay=max_delay)
+    return store.open_ticket, store.close
+
+
+def run_sessions(open_ticket, sessions, tickets):
+    """Insert tickets from concurrent session threads; returns per-insert latencies."""
+    latencies = []
+    lock = threading.Lock()
+
+    def session(n):
+        own = []
+        for i in range(tickets):
+            start = time.perf_counter()
+            open_ticket(f"user{n}@example.com", f"ticket_eroeffnen_email: ticket {i}")
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def _process_worker(args):
+    db_path, mode, sessions, tickets, batch_size, max_delay = args
+    if mode == 'store':
+        open_ticket, close = insert_with_store(db_path, batch_size, max_delay)
+    else:
+        open_ticket, close = insert_per_connection(db_path)
+    latencies = run_sessions(open_ticket, sessions, tickets)
+    close()
+    return latencies
+
+
+def bench(mode, args, tmp):
+    db_path = pathlib.Path(tmp) / f"{mode}.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(SCHEMA)
+    conn.close()
+    work = (str(db_path), mode, args.sessions, args.tickets, args.batch_size, args.max_delay)
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        latencies = [l for part in pool.map(_process_worker, [work] * args.processes) for l in part]
+    elapsed = time.perf_counter() - start
+    stored = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))] * 1000
+    print(f"{mode:>15}: {stored} tickets in {elapsed:.2f} s, {stored / elapsed:8.0f} inserts/s, "
+          f"latency p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {p99:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket inserts per second under concurrent sessions")
+    parser.add_argument('--processes', type=int, default=2, help="Processes writing to the same database")
+    parser.add_argument('--sessions', type=int, default=32, help="Concurrent session threads per process")
+    parser.add_argument('--tickets', type=int, default=50, help="Tickets opened per session")
+    parser.add_argument('--batch-size', type=int, default=64, help="Tickets per group commit")
+    parser.add_argument('--max-delay', type=float, default=0.0,
+                        help="Seconds a group commit waits for more tickets")
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.sessions} sessions x {args.tickets} tickets")
+    with tempfile.TemporaryDirectory() as tmp:
+        bench('per-connection', args, tmp)
+        bench('store', args, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+from chatbot.matchers import build_neighbour_table, load_model, model_name, node_vocabulary
+from build_termsim import load_keyword_texts
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Precompute the nearest embedding neighbours of every GloVe word"
+    )
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to use")
+    parser.add_argument('--pruned', action='store_true',
+                        help="Use the GloVe subset written by prune_glove.py")
+    parser.add_argument('--k', type=int, default=100, help="Neighbours stored per word")
+    parser.add_argument('--top-n', type=int, default=None,
+                        help="Only the graph vocabulary and the top_n most frequent words get a row "
+                             "(default: every word); other words are searched at match time")
+    parser.add_argument('--database', type=pathlib.Path,
+                        default=project_root / 'data' / 'bugland.db',
+                        help="Path to the chat graph database (for --top-n)")
+    parser.add_argument('--batch', type=int, default=64, help="Words searched at once")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Threads searching batches")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if args.pruned:
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.pruned.kv")
+    elif not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    name = model_name(str(glove_file))
+    output = glove_file.with_name(f"{name}.neighbours")
+
+    print(f"Loading GloVe model {glove_file.name}...")
+    model = load_model(str(glove_file))
+    words = None
+    if args.top_n is not None:
+        words = model.index_to_key[:args.top_n] + node_vocabulary(load_keyword_texts(args.database))
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        print(f"\r{done}/{total} words, {elapsed:.0f} s, about {elapsed / done * (total - done):.0f} s left",
+              end='', file=sys.stderr)
+
+    table = build_neighbour_table(model, name, k=args.k, words=words, batch=args.batch,
+                                  workers=args.workers, progress=progress)
+    print(file=sys.stderr)
+    table.save(str(output))
+    size = table.indices.nbytes + table.similarities.nbytes + table.row_of.nbytes
+    print(f"Saved {table.k} neighbours of {len(table.indices)} words to {output.name} "
+          f"({size / 2**20:.1f} MB) in {time.perf_counter() - start:.0f} s.")
+
+
+if __name__ == '__main__':
+    main()
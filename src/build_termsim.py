@@ -0,0 +1,47 @@
+import argparse
+import pathlib
+import sqlite3
+
+from chatbot.matchers import build_term_similarity, load_model, model_name
+
+
+def load_keyword_texts(db_path):
+    """Return the content of every node the user can match against."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT content FROM chat_nodes WHERE type != 'o'").fetchall()
+    conn.close()
+    return [content for (content,) in rows if content]
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Precompute the term similarity matrix for the graph vocabulary"
+    )
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to use")
+    parser.add_argument('--database', type=pathlib.Path,
+                        default=project_root / 'data' / 'bugland.db',
+                        help="Path to the chat graph database")
+    parser.add_argument('--output', type=pathlib.Path, default=None,
+                        help="Output file (defaults to bugland.<dim>d.termsim next to the database)")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    output = args.output or args.database.with_name(f"{args.database.stem}.{args.glove_dim}d.termsim")
+
+    print(f"Loading node keywords from {args.database}...")
+    texts = load_keyword_texts(args.database)
+    print(f"Loading GloVe model {glove_file.name}...")
+    model = load_model(str(glove_file))
+
+    print("Building term similarity matrix...")
+    termsim = build_term_similarity(texts, model, model_name(str(glove_file)))
+    termsim.save(str(output))
+    print(f"Saved {len(termsim.dictionary)} terms to {output}.")
+
+
+if __name__ == '__main__':
+    main()
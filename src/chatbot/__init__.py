@@ -1,5 +1,15 @@
 from .chat import *
-from .cli import *
+from .graph import *
 from .matchers import *
 from .repliers import *
-from .types import *
\ No newline at end of file
+from .types import *
+
+# the CLI pulls in prompt_toolkit; only import it when asked for
+_CLI_NAMES = ('Cli', 'ChatChoiceCompleter')
+
+
+def __getattr__(name):
+    if name in _CLI_NAMES:
+        from . import cli
+        return getattr(cli, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
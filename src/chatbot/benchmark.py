@@ -0,0 +1,157 @@
+import json
+import platform
+import random
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """q-th percentile (0-100) of sorted values, linearly interpolated."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn: Callable[[], object], repeat: int = 200, warmup: int = 5, setup: Optional[Callable] = None) -> dict:
+    """Time repeated calls of fn and its peak memory.
+
+    ``setup`` runs before every call outside the timing (e.g. to drop a
+    cache). Latencies are in microseconds; peak memory is what tracemalloc
+    sees during one extra call, in KiB.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    us = sorted(t * 1e6 for t in times)
+    return {
+        'runs': repeat,
+        'mean_us': sum(us) / len(us),
+        'p50_us': percentile(us, 50),
+        'p90_us': percentile(us, 90),
+        'p99_us': percentile(us, 99),
+        'max_us': us[-1],
+        'peak_kib': peak / 1024,
+    }
+
+
+def environment() -> dict:
+    """Where the results were taken: commit, interpreter and machine."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def memory_usage() -> Optional[Dict[str, int]]:
+    """Memory of this process in KiB from /proc/self/smaps_rollup (Linux, None elsewhere).
+
+    ``rss`` counts shared pages in full, ``pss`` divides them among the
+    processes mapping them, ``uss`` is memory no other process shares.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {parts[0][:-1]: int(parts[1]) for parts in map(str.split, f) if parts[0].endswith(':')}
+    except OSError:
+        return None
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def save_results(path, results: Dict[str, dict], env: dict) -> None:
+    with open(path, 'w') as f:
+        json.dump({'environment': env, 'results': results}, f, indent=2)
+
+
+def load_results(path) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def compare_results(baseline: Dict[str, dict], current: Dict[str, dict], threshold: float = 0.25) -> List[dict]:
+    """Relative change of p50 and p99 per benchmark present in both runs.
+
+    A benchmark counts as a regression when either got slower by more
+    than ``threshold`` (0.25 = 25%).
+    """
+    rows = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = {k: (now[k] - before[k]) / before[k] if before[k] else 0.0 for k in ('p50_us', 'p99_us')}
+        rows.append({'name': name, 'p50_change': change['p50_us'], 'p99_change': change['p99_us'],
+                     'regression': max(change.values()) > threshold})
+    return rows
+
+
+def format_results(results: Dict[str, dict]) -> str:
+    lines = [f"{'benchmark':<40} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'peak KiB':>10}"]
+    for name, r in results.items():
+        lines.append(f"{name:<40} {r['p50_us']:10.1f} {r['p90_us']:10.1f} {r['p99_us']:10.1f} {r['peak_kib']:10.1f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict]) -> str:
+    lines = [f"{'benchmark':<40} {'p50':>9} {'p99':>9}"]
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        lines.append(f"{row['name']:<40} {row['p50_change']:+9.1%} {row['p99_change']:+9.1%}{flag}")
+    return "\n".join(lines)
+
+
+def fixture_words(count: int, seed: int = 0) -> List[str]:
+    """Distinct lowercase pseudo-words (letters only, so the tokenizer keeps them)."""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def fixture_model(vocabulary: List[str], extra_words: int = 5000, dim: int = 50, seed: int = 0):
+    """Deterministic offline embedding standing in for GloVe.
+
+    Every vocabulary word gets a random vector; the extra words are noisy
+    copies of them, so nearest-neighbour searches find related terms the
+    way they would in a real model.
+    """
+    import numpy as np
+    from gensim.models import KeyedVectors
+
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(len(vocabulary), dim)).astype(np.float32)
+    extra = [w for w in fixture_words(extra_words + len(vocabulary), seed) if w not in set(vocabulary)]
+    extra = extra[:extra_words]
+    parents = rng.integers(len(vocabulary), size=len(extra))
+    noisy = base[parents] + 0.6 * rng.normal(size=(len(extra), dim)).astype(np.float32)
+    model = KeyedVectors(dim)
+    model.add_vectors(list(vocabulary) + extra, np.vstack([base, noisy]))
+    return model
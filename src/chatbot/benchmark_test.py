@@ -0,0 +1,41 @@
+from .benchmark import *
+
+
+def test_percentile_interpolates():
+    """Test percentiles of a small sorted list"""
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 50) == 0.0
+
+
+def test_measure_reports_latency_and_memory():
+    """Test that measure calls setup before every run and reports percentiles"""
+    calls = []
+    result = measure(lambda: [0] * 10000, repeat=10, warmup=2, setup=lambda: calls.append(1))
+    assert len(calls) == 13
+    assert result['runs'] == 10
+    assert result['p50_us'] <= result['p99_us'] <= result['max_us']
+    assert result['peak_kib'] > 50
+
+
+def test_compare_results_flags_regressions(tmp_path):
+    """Test that saved results can be compared against a later run"""
+    base = {'a': {'p50_us': 10.0, 'p99_us': 20.0}, 'gone': {'p50_us': 1.0, 'p99_us': 1.0}}
+    save_results(tmp_path / 'base.json', base, {'commit': None})
+    current = {'a': {'p50_us': 10.5, 'p99_us': 30.0}, 'new': {'p50_us': 1.0, 'p99_us': 1.0}}
+    rows = compare_results(load_results(tmp_path / 'base.json'), current, threshold=0.25)
+    assert [r['name'] for r in rows] == ['a']
+    assert rows[0]['p99_change'] == 0.5
+    assert rows[0]['regression']
+
+
+def test_fixture_model_is_deterministic():
+    """Test that the offline embedding is reproducible and has related neighbours"""
+    first = fixture_model(['cleanbug', 'windowfly'], extra_words=50, dim=8)
+    second = fixture_model(['cleanbug', 'windowfly'], extra_words=50, dim=8)
+    assert first.index_to_key == second.index_to_key
+    assert (first.vectors == second.vectors).all()
+    assert len(first) == 52
+    assert all(w.isalpha() for w in first.index_to_key)
@@ -1,32 +1,90 @@
 import os
 import json
+from typing import Optional
+
 from .repliers import *
 from .matchers import *
 from .debug_mode import init_chat_log, log_chat
+from .profiling import span
+
+
+class Session:
+    """
+    State of one conversation: position, path taken and the user's inputs.
+    The graph is shared between sessions and never modified; text entered
+    at input nodes is kept here by node name.
+    """
+    def __init__(self, start: list[ChatNode]) -> None:
+        self.current_nodes = start
+        self.path: list[ChatNode] = []
+        self.inputs: dict[str, str] = {}
+
+    def content(self, node: ChatNode) -> str:
+        """Content of a node as seen in this session (the user's text for inputs)."""
+        return self.inputs.get(node.name, node.content)
+
 
 class Chat:
-    def __init__(self, replier: Replier, matcher: Matcher):
+    def __init__(self, replier: Replier, matcher: Matcher, session: Optional[Session] = None,
+                 reset_log: bool = True):
         self.replier = replier
         self.matcher = matcher
-        self.current_nodes = replier.get_start()
-        self.log: list[ChatNode] = []
-        # clear existing chat log storage
-        init_chat_log()
+        self.session = session if session is not None else Session(replier.get_start())
+        # clear existing chat log storage (servers share one log across sessions)
+        if reset_log:
+            init_chat_log()
 
         self.START = ""
 
+    @property
+    def current_nodes(self) -> list[ChatNode]:
+        return self.session.current_nodes
+
+    @current_nodes.setter
+    def current_nodes(self, nodes: list[ChatNode]) -> None:
+        self.session.current_nodes = nodes
+
+    @property
+    def log(self) -> list[ChatNode]:
+        return self.session.path
+
+    @property
+    def inputs(self) -> dict[str, str]:
+        return self.session.inputs
+
     def advance(self, request: str) -> list[ChatNode]:
+        # The graph may have been reloaded since the last turn
+        self.current_nodes = self.replier.current(self.current_nodes)
+        # ended, or a reload deleted every node the session waited at: it is done
+        if not self.current_nodes:
+            return []
         # Use semantic matching if available, otherwise fallback to exact match
-        if hasattr(self.matcher, 'semantic_match'):
-            node = self.matcher.semantic_match(request, self.current_nodes, default=self.START)
-        else:
-            node = self.matcher.match(request, self.current_nodes, default=self.START)
+        with span('match'):
+            if hasattr(self.matcher, 'semantic_match'):
+                node = self.matcher.semantic_match(request, self.current_nodes, default=self.START)
+            else:
+                node = self.matcher.match(request, self.current_nodes, default=self.START)
         # record in both local and debug_mode store
         self.log.append(node)
-        log_chat(node)
+        with span('log'):
+            log_chat(node)
 
-        # Insert request string to node if input
-        if node.type == 'i': node.content = request
+        # Keep the request string of input nodes in the session, not the shared node
+        if node.type == 'i': self.inputs[node.name] = request
 
-        self.current_nodes = self.replier.reply(node)
+        with span('reply'):
+            self.current_nodes = self.replier.reply(node)
         return self.current_nodes
+
+    def reply(self, request: str) -> list[ChatNode]:
+        """
+        Advance with the user's request and on through all following bot outputs.
+        Returns the output nodes passed; afterwards current_nodes holds the nodes
+        awaiting the user's next request (empty once the conversation ended).
+        """
+        outputs = []
+        nodes = self.advance(request)
+        while nodes and nodes[0].type == 'o':
+            outputs.append(nodes[0])
+            nodes = self.advance(request)
+        return outputs
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock
-from .chat import Chat
+from .chat import Chat, Session
 from .types import ChatNode
 
 @pytest.fixture
@@ -8,6 +8,7 @@ def mock_replier():
     replier = Mock()
     start_nodes = [ChatNode("start", "o", "Welcome!")]
     replier.get_start.return_value = start_nodes
+    replier.current.side_effect = lambda nodes: nodes
     return replier
 
 @pytest.fixture
@@ -64,7 +65,9 @@ def test_advance_with_input_node(chat, mock_matcher, mock_replier):
     result = chat.advance(request)
     
     # Verify the behavior
-    assert matched_node.content == request  # Content should be updated
+    assert chat.inputs == {"name_input": request}  # Input kept in the session
+    assert matched_node.content == ""  # The shared node is not modified
+    assert chat.session.content(matched_node) == request
     assert result == next_nodes
     assert chat.current_nodes == next_nodes
 
@@ -91,7 +94,8 @@ def test_conversation_flow(chat, mock_matcher, mock_replier):
     mock_replier.reply.return_value = second_response
     
     result2 = chat.advance(second_request)
-    assert second_matched.content == second_request
+    assert chat.inputs["feeling"] == second_request
+    assert second_matched.content == ""
     assert result2 == second_response
     assert chat.current_nodes == second_response
 
@@ -122,4 +126,20 @@ def test_chat_log_accumulates(chat, mock_matcher, mock_replier):
     mock_matcher.semantic_match.return_value = second_node
     mock_replier.reply.return_value = [second_node]
     chat.advance("two")
-    assert chat.log == [first_node, second_node]
\ No newline at end of file
+    assert chat.log == [first_node, second_node]
+
+
+def test_sessions_share_graph(mock_matcher, mock_replier):
+    """Test that two sessions on one graph keep their inputs apart"""
+    email = ChatNode("email", "i", "")
+    done = [ChatNode("done", "o", "Danke!")]
+    mock_matcher.semantic_match.return_value = email
+    mock_replier.reply.return_value = done
+    first = Chat(mock_replier, mock_matcher)
+    second = Chat(mock_replier, mock_matcher, session=Session([email]))
+    first.advance("a@example.com")
+    second.advance("b@example.com")
+    assert first.inputs == {"email": "a@example.com"}
+    assert second.inputs == {"email": "b@example.com"}
+    assert second.log == [email]
+    assert email.content == ""
@@ -9,7 +9,7 @@ class ChatChoiceCompleter(Completer):
     def get_completions(self, document, complete_event):
         word = document.text_before_cursor
         for node in self.chat.current_nodes:
-            keyword = node.content.split(";")[0]
+            keyword = node.keywords[0]
             if keyword.lower().startswith(word.lower()):
                 yield Completion(keyword, start_position=-len(word))
 
@@ -1,7 +1,11 @@
 import os
 import json
+import time
+import queue
+import atexit
 import builtins
 import warnings
+import threading
 
 
 def is_debug():
@@ -29,37 +33,181 @@ def get_log_dir():
 
 def get_chat_log_path():
     """Return the path to the chat log file."""
-    return os.environ.get('CHAT_LOG_PATH', os.path.join(get_log_dir(), 'chat_log.json'))
-
-
-def init_chat_log():
-    """Initialize (or clear) and return the chat log path."""
-    path = get_chat_log_path()
+    # only create the default log directory when it is used
+    return os.environ.get('CHAT_LOG_PATH') or os.path.join(get_log_dir(), 'chat_log.jsonl')
+
+
+class JsonlLogSink:
+    """Append-only JSON Lines writer for log entries.
+
+    Entries are buffered and appended once ``buffer_size`` entries are
+    pending or, when the next entry arrives, ``flush_interval`` seconds have
+    passed since the last write.
+    With ``background=True`` a writer thread does the disk I/O, so logging
+    never blocks a chat turn.
+    """
+    _CLOSE = object()
+
+    def __init__(self, path, buffer_size=64, flush_interval=1.0, background=False):
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_write = time.monotonic()
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, entry):
+        """Queue an entry, writing the buffer if the flush policy says so."""
+        if self._queue is not None:
+            self._queue.put(entry)
+            return
+        with self._lock:
+            self._buffer.append(entry)
+            if self._due(len(self._buffer)):
+                self._append(self._buffer)
+                self._buffer = []
+
+    def flush(self):
+        """Write all pending entries now."""
+        if self._queue is not None:
+            if self._thread.is_alive():
+                done = threading.Event()
+                self._queue.put(done)
+                done.wait()
+            return
+        with self._lock:
+            self._append(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        """Flush and stop the writer thread, if any."""
+        if self._queue is not None and self._thread.is_alive():
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+        else:
+            self.flush()
+
+    def _due(self, pending):
+        return pending >= self.buffer_size or time.monotonic() - self._last_write >= self.flush_interval
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is self._CLOSE:
+                self._append(pending)
+                return
+            if isinstance(item, threading.Event):
+                # flush request from another thread
+                self._append(pending)
+                pending = []
+                item.set()
+                continue
+            if item is not None:
+                pending.append(item)
+            if pending and (item is None or self._due(len(pending))):
+                self._append(pending)
+                pending = []
+
+    def _append(self, entries):
+        self._last_write = time.monotonic()
+        if not entries:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + '\n' for e in entries)
+        except Exception as e:
+            warnings.warn(f"Could not persist unified log: {e}")
+
+
+def configure_log_sink(buffer_size=None, flush_interval=None, background=None):
+    """Replace the log sink, e.g. to change its flush policy.
+
+    Given options are kept for later sinks; options never set fall back to
+    LOG_BUFFER_SIZE, LOG_FLUSH_INTERVAL and LOG_BACKGROUND from the environment.
+    """
+    global _sink
+    if _sink is not None:
+        _sink.close()
+    given = {'buffer_size': buffer_size, 'flush_interval': flush_interval, 'background': background}
+    _sink_options.update({k: v for k, v in given.items() if v is not None})
+    options = {
+        'buffer_size': int(os.environ.get('LOG_BUFFER_SIZE', 64)),
+        'flush_interval': float(os.environ.get('LOG_FLUSH_INTERVAL', 1.0)),
+        'background': os.environ.get('LOG_BACKGROUND', '') not in ('', '0'),
+    }
+    options.update(_sink_options)
+    _sink = JsonlLogSink(get_chat_log_path(), **options)
+    return _sink
+
+
+def _get_sink():
+    return _sink if _sink is not None else configure_log_sink()
+
+
+def flush_logs():
+    """Write all buffered log entries to disk."""
+    if _sink is not None:
+        _sink.flush()
+
+
+def close_logs():
+    """Flush buffered log entries and stop the background writer."""
+    global _sink
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+
+
+def _reset_log_file(path, what):
+    # pending entries belong to the previous log
+    close_logs()
     try:
-        with open(path, 'w') as f:
-            json.dump([], f, indent=2)
+        open(path, 'w').close()
     except Exception as e:
-        warnings.warn(f"Could not clear chat log file: {e}")
+        warnings.warn(f"Could not clear {what} file: {e}")
     _entries.clear()
+    configure_log_sink()
     return path
 
+
+def init_chat_log():
+    """Initialize (or clear) and return the chat log path."""
+    return _reset_log_file(get_chat_log_path(), 'chat log')
+
 def persist_chat_log(log, path=None):
-    """Persist the given chat log list to disk."""
+    """Rewrite the given chat log list to disk as JSON Lines."""
     if path is None:
         path = get_chat_log_path()
     try:
-        with open(path, 'w') as f:
-            json.dump(log, f, indent=2, ensure_ascii=False)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(e, ensure_ascii=False) + '\n' for e in log)
     except Exception as e:
         warnings.warn(f"Could not persist unified log: {e}")
 
 
+def set_memory_log(flag: bool):
+    """Enable or disable keeping log entries in memory (long-running servers)."""
+    global _keep_entries
+    _keep_entries = flag
+
+
 def log_chat(node):
-    """Append a ChatNode to in-memory log and persist to disk."""
+    """Append a ChatNode to the in-memory log and the log sink."""
     # record a chat entry in unified log
     entry = {'kind': 'chat', 'name': node.name, 'type': node.type, 'content': node.content}
-    _entries.append(entry)
-    persist_chat_log(_entries, get_chat_log_path())
+    if _keep_entries:
+        _entries.append(entry)
+    _get_sink().write(entry)
 
 
 def get_chat_log() -> list:
@@ -75,23 +223,16 @@ def get_semantic_log_path():
 def init_semantic_log():
     """Initialize (or clear) and return the shared log path."""
     # use chat log path for unified storage
-    path = get_chat_log_path()
-    try:
-        with open(path, 'w') as f:
-            json.dump([], f, indent=2)
-    except Exception as e:
-        warnings.warn(f"Could not clear unified log file: {e}")
-    _entries.clear()
-    return path
+    return _reset_log_file(get_chat_log_path(), 'unified log')
 
 
 def log_semantic(req, name, info):
-    """Record a semantic match event in-memory and persist to disk."""
+    """Record a semantic match event in-memory and in the log sink."""
     # record a semantic entry in unified log
     entry = {'kind': 'semantic', 'req': req, 'name': name, 'info': info}
-    _entries.append(entry)
-    # persist using chat log path
-    persist_chat_log(_entries, get_chat_log_path())
+    if _keep_entries:
+        _entries.append(entry)
+    _get_sink().write(entry)
     debug_print(f"[LOG] '{req}' -> {name} ({info})")
 
 
@@ -103,3 +244,9 @@ def get_semantic_log() -> list:
 
 # In-memory log storage
 _entries: list = []
+_keep_entries = True
+# Sink appending entries to the chat log file
+_sink = None
+_sink_options: dict = {}
+# Make sure buffered entries reach the disk on exit
+atexit.register(close_logs)
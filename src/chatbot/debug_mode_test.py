@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from . import debug_mode
+from .debug_mode import *
+from .types import ChatNode
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / 'chat_log.jsonl'
+    monkeypatch.setenv('CHAT_LOG_PATH', str(path))
+    yield path
+    # restore the default flush policy for other tests
+    debug_mode._sink_options.clear()
+    close_logs()
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_log_is_buffered_and_appended(log_path):
+    """Test that entries are appended in batches of buffer_size"""
+    init_chat_log()
+    configure_log_sink(buffer_size=3, flush_interval=60)
+    log_chat(ChatNode('start', 'o', 'Hallo'))
+    log_semantic('privat', 'private', 'exact(privat)')
+    assert _read(log_path) == []
+    log_chat(ChatNode('private', 'c', 'privat'))
+    assert [e['kind'] for e in _read(log_path)] == ['chat', 'semantic', 'chat']
+    log_chat(ChatNode('produkt', 'o', 'Worum geht es?'))
+    flush_logs()
+    assert _read(log_path)[-1]['name'] == 'produkt'
+
+
+def test_in_memory_logs_are_kept(log_path):
+    """Test that get_chat_log and get_semantic_log still see all entries"""
+    init_semantic_log()
+    log_chat(ChatNode('start', 'o', 'Hallo'))
+    log_semantic('mein cleanbug', 'cleanbug', 0.42)
+    assert len(get_chat_log()) == 2
+    assert get_semantic_log() == [{'kind': 'semantic', 'req': 'mein cleanbug', 'name': 'cleanbug', 'info': 0.42}]
+
+
+def test_init_clears_log_file(log_path):
+    """Test that init_chat_log truncates the file and drops pending entries"""
+    init_chat_log()
+    log_chat(ChatNode('start', 'o', 'Hallo'))
+    flush_logs()
+    init_chat_log()
+    assert log_path.read_text() == ''
+    assert get_chat_log() == []
+
+
+def test_background_writer(log_path):
+    """Test that a background sink writes everything on flush and close"""
+    init_chat_log()
+    configure_log_sink(buffer_size=1000, flush_interval=60, background=True)
+    for i in range(100):
+        log_chat(ChatNode(f'n{i}', 'o', 'text'))
+    flush_logs()
+    assert len(_read(log_path)) == 100
+    log_chat(ChatNode('last', 'o', 'text'))
+    close_logs()
+    assert _read(log_path)[-1]['name'] == 'last'
@@ -0,0 +1,370 @@
+import itertools
+import json
+import multiprocessing
+import pathlib
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .graph import load_graph
+from .matchers import MIN_SCORE, CentroidMatcher, IndexCache, ResultCache, StringMatcher
+from .types import ChatNode
+
+# Matchers a log can be replayed with
+REPLAY_MATCHERS = {'string': StringMatcher, 'centroid': CentroidMatcher}
+# Upper bounds of the score histogram bins
+SCORE_BINS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def load_requests(paths: List[pathlib.Path]) -> List[str]:
+    """Read requests from text files (one per line) or unified chat logs (.jsonl or .json)."""
+    requests = []
+    for path in paths:
+        if path.suffix in ('.json', '.jsonl'):
+            text = path.read_text()
+            if path.suffix == '.json':
+                entries = json.loads(text)
+            else:
+                entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+            requests += [e['req'] for e in entries if e.get('kind') == 'semantic']
+        else:
+            requests += [line.strip() for line in path.read_text().splitlines() if line.strip()]
+    return requests
+
+
+def choice_points(node_map: Dict[str, ChatNode]) -> List[List[ChatNode]]:
+    """Children lists of all nodes at which the user picks a choice or enters text."""
+    points, seen = [], set()
+    for node in node_map.values():
+        names = tuple(c.name for c in node.children)
+        if names not in seen and any(c.type != 'o' for c in node.children):
+            seen.add(names)
+            points.append(node.children)
+    return points
+
+
+def compare_matchers(first, second, requests: List[str] = (), points: List[List[ChatNode]] = (),
+                     pairs: Iterable[Tuple[str, List[ChatNode]]] = ()) -> dict:
+    """Score requests with two matchers and compare.
+
+    ``pairs`` are requests with the candidates they were logged at (see
+    logged_requests); ``requests`` without a logged position are scored at
+    every choice point in ``points``. Final decisions are compared for all
+    pairs; best nodes, accept/reject decisions and score differences only
+    where both matchers scored semantically (exact keyword hits do not
+    depend on the model).
+    """
+    import numpy as np
+    total = same_final = semantic = same_best = same_accept = 0
+    diffs = []
+    latencies = ([], [])
+    everywhere = ((request, nodes) for request in requests for nodes in points)
+    for request, nodes in itertools.chain(pairs, everywhere):
+        results = []
+        for matcher, latency in zip((first, second), latencies):
+            start = time.perf_counter()
+            best, info = matcher.score(request, nodes)
+            final = matcher.resolve(request, nodes, best, info)
+            latency.append(time.perf_counter() - start)
+            results.append((best, info, final, matcher.min_score))
+        (a_best, a_info, a_final, a_min), (b_best, b_info, b_final, b_min) = results
+        total += 1
+        same_final += a_final is b_final
+        if isinstance(a_info, float) and isinstance(b_info, float):
+            semantic += 1
+            same_best += a_best is b_best
+            same_accept += (a_info >= a_min) == (b_info >= b_min)
+            diffs.append(abs(a_info - b_info))
+    return {
+        'decisions': total,
+        'same_final': same_final / total if total else None,
+        'semantic': semantic,
+        'same_best': same_best / semantic if semantic else None,
+        'same_accept': same_accept / semantic if semantic else None,
+        'mean_score_diff': float(np.mean(diffs)) if diffs else None,
+        'max_score_diff': float(np.max(diffs)) if diffs else None,
+        'latency_ms': [_percentiles(latency) for latency in latencies],
+    }
+
+
+def _percentiles(seconds: List[float]) -> dict:
+    if not seconds:
+        return {}
+    import numpy as np
+    ms = np.asarray(seconds) * 1000
+    return {'p50': float(np.percentile(ms, 50)), 'p99': float(np.percentile(ms, 99))}
+
+
+def format_report(report: dict, names=('first', 'second')) -> str:
+    """Human readable summary of compare_matchers()."""
+    lines = [f"Compared {report['decisions']} decisions ({report['semantic']} semantic):"]
+    if report['decisions']:
+        lines.append(f" - same final node:      {report['same_final']:.1%}")
+    if report['semantic']:
+        lines.append(f" - same best node:       {report['same_best']:.1%}")
+        lines.append(f" - same accept/reject:   {report['same_accept']:.1%}")
+        lines.append(f" - mean |score diff|:    {report['mean_score_diff']:.4f}")
+        lines.append(f" - max |score diff|:     {report['max_score_diff']:.4f}")
+    for name, latency in zip(names, report['latency_ms']):
+        if latency:
+            lines.append(f" - {name} latency:  p50 {latency['p50']:.3f} ms, p99 {latency['p99']:.3f} ms")
+    return "\n".join(lines)
+
+
+def iter_log(paths: Iterable[pathlib.Path]) -> Iterator[dict]:
+    """Entries of unified chat logs, .jsonl streamed line by line (.json files are read whole)."""
+    for path in paths:
+        path = pathlib.Path(path)
+        if path.suffix == '.json':
+            yield from json.loads(path.read_text())
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def logged_decisions(entries: Iterable[dict]) -> Iterator[Tuple[str, str, object, Optional[str]]]:
+    """(request, logged node, logged info, node before) of every semantic entry.
+
+    The candidates of a decision are the children of the chat node logged
+    last before it; ``None`` at the start of a log.
+    """
+    before = None
+    for entry in entries:
+        kind = entry.get('kind')
+        if kind == 'chat':
+            before = entry.get('name')
+        elif kind == 'semantic':
+            yield entry['req'], entry['name'], entry['info'], before
+
+
+def logged_requests(paths: List[pathlib.Path], graph) -> Tuple[List[Tuple[str, List[ChatNode]]], List[str], int]:
+    """Requests of request files and chat logs, for compare_matchers.
+
+    Returns every logged semantic decision as its request with the
+    candidates it was made at (placed as by plan_replay), the requests of
+    text files, which have no position, and the number of logged decisions
+    whose node is not in the graph any more.
+    """
+    pairs, unplaced = [], 0
+    sets = [[graph[name] for name in names] for names in candidate_names(graph)]
+    logs = [p for p in paths if p.suffix in ('.json', '.jsonl')]
+    for path in logs:
+        # one file at a time: a decision's candidates depend on the entries before it
+        tallies, file_unplaced = plan_replay(logged_decisions(iter_log([path])), graph)
+        pairs += [(request, sets[point]) for (request, point, _, _), count in tallies.items()
+                  for _ in range(count)]
+        unplaced += file_unplaced
+    return pairs, load_requests([p for p in paths if p not in logs]), unplaced
+
+
+def candidate_names(graph) -> List[Tuple[str, ...]]:
+    """Node names of the graph's choice points, the candidate sets a log is replayed against."""
+    return [tuple(n.name for n in nodes) for nodes in choice_points({n.name: n for n in graph})]
+
+
+def plan_replay(decisions: Iterable[tuple], graph) -> Tuple[Counter, int]:
+    """Group logged decisions by candidate set for replaying.
+
+    Returns a Counter of ``(request, set, logged node, logged info)``, sets
+    being positions in candidate_names(graph), and the number of decisions
+    whose node is not in the graph any more. A decision belongs to the
+    children of the node logged before it if they contain the logged node,
+    otherwise (interleaved sessions) to the first candidate set that does.
+    """
+    points = candidate_names(graph)
+    index = {names: i for i, names in enumerate(points)}
+    holding = {}
+    for i, names in enumerate(points):
+        for name in names:
+            holding.setdefault(name, i)
+    tallies, unplaced = Counter(), 0
+    for request, name, info, before in decisions:
+        point = None
+        if before is not None and before in graph.ids:
+            point = index.get(tuple(n.name for n in graph[before].children))
+        if point is None or name not in points[point]:
+            point = holding.get(name)
+        if point is None:
+            unplaced += 1
+            continue
+        tallies[request, point, name, info] += 1
+    return tallies, unplaced
+
+
+# Graph, matcher and candidate sets of a replay worker process
+_replay_state = None
+
+
+def _init_replay(db_path, root: str, matcher: str, min_score: Optional[float]) -> None:
+    global _replay_state
+    graph = load_graph(db_path, root)
+    cls = REPLAY_MATCHERS[matcher]
+    # every pair is scored once, a result cache would only cost memory
+    instance = cls(cache=IndexCache(factory=cls.index_factory), results=ResultCache(0))
+    if min_score is not None:
+        instance.min_score = min_score
+    _replay_state = graph, instance, [[graph[name] for name in names] for names in candidate_names(graph)]
+
+
+def _plan_file(path: pathlib.Path) -> Tuple[Counter, int]:
+    return plan_replay(logged_decisions(iter_log([path])), _replay_state[0])
+
+
+def _replay_chunk(pairs: List[Tuple[str, int]]) -> List[tuple]:
+    _, matcher, sets = _replay_state
+    results = []
+    for request, point in pairs:
+        nodes = sets[point]
+        start = time.perf_counter()
+        best, info = matcher.score(request, nodes)
+        final = matcher.resolve(request, nodes, best, info)
+        results.append((best.name if best is not None else None, info, final.name,
+                        time.perf_counter() - start))
+    return results
+
+
+def replay_log(paths: Iterable[pathlib.Path], db_path, matcher: str = 'string',
+               min_score: Optional[float] = None, logged_min_score: float = MIN_SCORE,
+               workers: int = 1, root: str = "start", chunk_size: int = 512) -> dict:
+    """Re-run the semantic decisions of chat logs through a matcher and compare.
+
+    Logs are streamed; identical (request, candidate set) pairs are scored
+    once and weighted by how often they were logged, so replay time grows
+    with the distinct requests rather than the turns. With ``workers`` > 1
+    a pool of processes reads the log files and scores the pairs, each
+    loading the graph and the model configured in the environment
+    (GLOVE_MODEL_PATH or GLOVE_SHARED_MODEL). ``min_score`` overrides the
+    matcher's threshold, ``logged_min_score`` is the one the logs were
+    written with. Creating a matcher clears the chat log, so CHAT_LOG_PATH
+    must not name a log being replayed.
+    """
+    start = time.perf_counter()
+    init = (db_path, root, matcher, min_score)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_replay, initargs=init)
+        run = pool.map
+    else:
+        _init_replay(*init)
+        run = map
+    try:
+        # one file per task: a decision's candidates depend on the entries before it
+        tallies, unplaced = Counter(), 0
+        for file_tallies, file_unplaced in run(_plan_file, [pathlib.Path(p) for p in paths]):
+            tallies.update(file_tallies)
+            unplaced += file_unplaced
+        # sorted by candidate set, so every chunk reuses a few indexes
+        pairs = sorted({(request, point) for request, point, _, _ in tallies}, key=lambda p: (p[1], p[0]))
+        # a few chunks per worker at least, so they all get work
+        chunk_size = max(1, min(chunk_size, -(-len(pairs) // (4 * workers))))
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        scored = [r for chunk in run(_replay_chunk, chunks) for r in chunk]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    results = dict(zip(pairs, scored))
+    threshold = min_score if min_score is not None else REPLAY_MATCHERS[matcher].min_score
+    report = _replay_report(tallies, results, threshold, logged_min_score)
+    report.update(unplaced=unplaced, pairs=len(pairs), workers=workers,
+                  seconds=time.perf_counter() - start)
+    return report
+
+
+def _replay_report(tallies: Counter, results: dict, threshold: float, logged_min_score: float) -> dict:
+    import numpy as np
+    turns = same_best = same_final = semantic = same_accept = accepted = 0
+    logged_scores, replayed_scores, diffs = [], [], []
+    changes = Counter()
+    for (request, point, name, info), count in tallies.items():
+        best, new_info, final, _ = results[request, point]
+        # what the logged run ended with: the best node unless its score missed the threshold
+        logged_final = name if not isinstance(info, float) or info >= logged_min_score else None
+        turns += count
+        same_best += count * (best == name)
+        if logged_final is not None:
+            same_final += count * (final == logged_final)
+        if isinstance(new_info, float):
+            replayed_scores.append((new_info, count))
+            accepted += count * (new_info >= threshold)
+        if isinstance(info, float) and isinstance(new_info, float):
+            semantic += count
+            logged_scores.append((info, count))
+            same_accept += count * ((info >= logged_min_score) == (new_info >= threshold))
+            diffs.append((abs(info - new_info), count))
+        if best != name:
+            changes[request, name, best] += count
+
+    def weighted(values):
+        return np.repeat([v for v, _ in values], [c for _, c in values]) if values else np.zeros(0)
+
+    replayed = weighted(replayed_scores)
+    logged = weighted(logged_scores)
+    diff = weighted(diffs)
+    histogram = np.histogram(np.clip(replayed, 0.0, 1.0), bins=(0.0,) + SCORE_BINS)[0] if replayed.size else None
+    placed_final = sum(c for (_, _, _, info), c in tallies.items()
+                       if not isinstance(info, float) or info >= logged_min_score)
+    latencies = [r[3] for r in results.values()]
+    return {
+        'turns': turns,
+        'semantic': semantic,
+        'same_best': same_best / turns if turns else None,
+        'same_final': same_final / placed_final if placed_final else None,
+        'same_accept': same_accept / semantic if semantic else None,
+        'accepted': accepted / replayed.size if replayed.size else None,
+        'threshold': threshold,
+        'logged_scores': _quantiles(logged),
+        'replayed_scores': _quantiles(replayed),
+        'histogram': dict(zip(SCORE_BINS, histogram.tolist())) if histogram is not None else {},
+        'mean_score_diff': float(diff.mean()) if diff.size else None,
+        'max_score_diff': float(diff.max()) if diff.size else None,
+        'changes': [(count, request, name, best) for (request, name, best), count in changes.most_common(10)],
+        'latency_ms': _percentiles(latencies),
+    }
+
+
+def _quantiles(scores) -> dict:
+    if not len(scores):
+        return {}
+    import numpy as np
+    return {f'p{q}': float(np.percentile(scores, q)) for q in (10, 50, 90)}
+
+
+def format_replay(report: dict) -> str:
+    """Human readable summary of replay_log()."""
+    lines = [f"Replayed {report['turns']} logged decisions ({report['pairs']} distinct) "
+             f"in {report['seconds']:.1f} s on {report['workers']} worker(s)"]
+    if report['unplaced']:
+        lines.append(f" - not in the graph any more: {report['unplaced']}")
+    if report['turns']:
+        lines.append(f" - same best node:       {report['same_best']:.1%}")
+    if report['same_final'] is not None:
+        lines.append(f" - same accepted node:   {report['same_final']:.1%}")
+    if report['semantic']:
+        lines.append(f" - same accept/reject:   {report['same_accept']:.1%} ({report['semantic']} semantic)")
+        lines.append(f" - mean |score diff|:    {report['mean_score_diff']:.4f}")
+        lines.append(f" - max |score diff|:     {report['max_score_diff']:.4f}")
+    if report['accepted'] is not None:
+        lines.append(f" - accepted at {report['threshold']}:     {report['accepted']:.1%} of semantic scores")
+    for name in ('logged_scores', 'replayed_scores'):
+        q = report[name]
+        if q:
+            lines.append(f" - {name.replace('_', ' ')}:  p10 {q['p10']:.3f}, p50 {q['p50']:.3f}, p90 {q['p90']:.3f}")
+    if report['histogram']:
+        total = sum(report['histogram'].values())
+        lines.append(" - replayed score histogram:")
+        low = 0.0
+        for high, count in report['histogram'].items():
+            lines.append(f"     {low:.1f}-{high:.1f} {count:>9} {'#' * round(40 * count / total)}")
+            low = high
+    if report['changes']:
+        lines.append(" - most frequent changes (turns, request, logged -> replayed):")
+        for count, request, name, best in report['changes']:
+            lines.append(f"     {count:>7}  {request!r}: {name} -> {best}")
+    latency = report['latency_ms']
+    if latency:
+        lines.append(f" - latency per request:  p50 {latency['p50']:.3f} ms, p99 {latency['p99']:.3f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+import json
+import sqlite3
+
+from . import evaluation
+from .evaluation import *
+from .graph import CompiledGraph
+from .matchers import CentroidMatcher, StringMatcher
+from .types import ChatNode
+
+
+def test_load_requests(tmp_path):
+    """Test that requests are read from text files and semantic log entries"""
+    (tmp_path / 'requests.txt').write_text("mein cleanbug\n\n  ja  \n")
+    (tmp_path / 'chat_log.json').write_text(json.dumps([
+        {'kind': 'chat', 'name': 'start', 'type': 'o', 'content': 'Hallo'},
+        {'kind': 'semantic', 'req': 'privat', 'name': 'private', 'info': 'exact(privat)'},
+    ]))
+    (tmp_path / 'chat_log.jsonl').write_text(
+        json.dumps({'kind': 'semantic', 'req': 'nein', 'name': 'nein', 'info': 0.3}) + '\n')
+    paths = [tmp_path / 'requests.txt', tmp_path / 'chat_log.json', tmp_path / 'chat_log.jsonl']
+    assert load_requests(paths) == ['mein cleanbug', 'ja', 'privat', 'nein']
+
+
+def test_choice_points_skips_outputs_and_duplicates():
+    """Test that only distinct children lists with choices are returned"""
+    start = ChatNode('start', 'o', 'Hallo')
+    a, b = ChatNode('a', 'c', 'a'), ChatNode('b', 'c', 'b')
+    out = ChatNode('out', 'o', 'Antwort')
+    start.addChild(a)
+    start.addChild(b)
+    a.addChild(out)
+    other = ChatNode('other', 'o', 'Nochmal')
+    other.addChild(a)
+    other.addChild(b)
+    node_map = {n.name: n for n in (start, a, b, out, other)}
+    assert choice_points(node_map) == [[a, b]]
+
+
+def test_compare_matchers_identical():
+    """Test that comparing a matcher with itself reports full agreement"""
+    nodes = [ChatNode('x', 'c', 'foo'), ChatNode('y', 'c', 'bar')]
+    matcher = StringMatcher()
+    report = compare_matchers(matcher, matcher, ['foo', 'bar', 'baz'], [nodes])
+    assert report['decisions'] == 3
+    assert report['same_final'] == 1.0
+    assert len(report['latency_ms']) == 2
+    assert 'same final node' in format_report(report)
+
+
+def _replay_graph():
+    nodes = [("start", "o", "Hallo"), ("privat", "c", "privat"), ("firma", "c", "firma;business"),
+             ("frage", "o", "Welches Gerät?"), ("cleanbug", "c", "cleanbug"), ("windowfly", "c", "windowfly")]
+    edges = [("start", "privat"), ("start", "firma"), ("privat", "frage"), ("firma", "frage"),
+             ("frage", "cleanbug"), ("frage", "windowfly")]
+    return nodes, edges
+
+
+def _replay_log(path):
+    entries = [
+        {'kind': 'chat', 'name': 'start', 'type': 'o', 'content': 'Hallo'},
+        {'kind': 'semantic', 'req': 'ich bin privat', 'name': 'privat', 'info': 'exact(privat)'},
+        {'kind': 'chat', 'name': 'privat', 'type': 'c', 'content': 'privat'},
+        {'kind': 'chat', 'name': 'frage', 'type': 'o', 'content': 'Welches Gerät?'},
+        {'kind': 'semantic', 'req': 'mein staubsauger', 'name': 'cleanbug', 'info': 0.4},
+        {'kind': 'chat', 'name': 'cleanbug', 'type': 'c', 'content': 'cleanbug'},
+        {'kind': 'semantic', 'req': 'business', 'name': 'firma', 'info': 'exact(business)'},
+        {'kind': 'semantic', 'req': 'alt', 'name': 'geloescht', 'info': 0.9},
+    ]
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries * 3))
+
+
+def test_plan_replay_places_decisions(tmp_path):
+    """Test that decisions are grouped by the candidate set they were made at"""
+    graph = CompiledGraph(*_replay_graph())
+    _replay_log(tmp_path / 'chat_log.jsonl')
+    tallies, unplaced = plan_replay(logged_decisions(iter_log([tmp_path / 'chat_log.jsonl'])), graph)
+    points = candidate_names(graph)
+    start, frage = points.index(("privat", "firma")), points.index(("cleanbug", "windowfly"))
+    # 'business' follows cleanbug (another session): placed by its node
+    assert tallies == {('ich bin privat', start, 'privat', 'exact(privat)'): 3,
+                       ('mein staubsauger', frage, 'cleanbug', 0.4): 3,
+                       ('business', start, 'firma', 'exact(business)'): 3}
+    assert unplaced == 3
+
+
+def test_logged_requests_keep_their_choice_point(tmp_path, monkeypatch):
+    """Test that logged requests are compared at the candidates they were logged at only"""
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'out.jsonl'))
+    monkeypatch.delenv('GLOVE_MODEL_PATH', raising=False)
+    graph = CompiledGraph(*_replay_graph())
+    _replay_log(tmp_path / 'chat_log.jsonl')
+    (tmp_path / 'requests.txt').write_text("windowfly\n")
+    pairs, requests, unplaced = logged_requests([tmp_path / 'chat_log.jsonl', tmp_path / 'requests.txt'], graph)
+    assert sorted((request, [n.name for n in nodes]) for request, nodes in pairs) == [
+        ('business', ['privat', 'firma'])] * 3 + [('ich bin privat', ['privat', 'firma'])] * 3 + [
+        ('mein staubsauger', ['cleanbug', 'windowfly'])] * 3
+    assert (requests, unplaced) == (['windowfly'], 3)
+    points = [[graph['privat'], graph['firma']], [graph['cleanbug'], graph['windowfly']]]
+    matcher = StringMatcher()
+    report = compare_matchers(matcher, matcher, requests, points, pairs)
+    assert report['decisions'] == 9 + 2
+
+
+def _replay_db(tmp_path):
+    nodes, edges = _replay_graph()
+    db = tmp_path / 'graph.db'
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE chat_nodes (name TEXT, type TEXT, content TEXT)")
+    conn.execute("CREATE TABLE chat_edges (from_name TEXT, to_name TEXT)")
+    conn.executemany("INSERT INTO chat_nodes VALUES (?, ?, ?)", nodes)
+    conn.executemany("INSERT INTO chat_edges VALUES (?, ?)", edges)
+    conn.commit()
+    conn.close()
+    return db
+
+
+def test_replay_log(tmp_path, monkeypatch):
+    """Test that replaying keyword decisions agrees, in process and in a process pool"""
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'replay_out.jsonl'))
+    monkeypatch.delenv('GLOVE_MODEL_PATH', raising=False)
+    monkeypatch.delenv('GLOVE_SHARED_MODEL', raising=False)
+    db = _replay_db(tmp_path)
+    logs = [tmp_path / 'a.jsonl', tmp_path / 'b.jsonl']
+    for path in logs:
+        _replay_log(path)
+
+    report = replay_log(logs, db)
+    assert (report['turns'], report['pairs'], report['unplaced']) == (18, 3, 6)
+    # without a model only the keyword decisions come out the same
+    assert report['same_best'] == 2 / 3
+    assert report['changes'] == [(6, 'mein staubsauger', 'cleanbug', None)]
+    assert 'same best node' in format_replay(report)
+    pooled = replay_log(logs, db, workers=2)
+    assert {k: pooled[k] for k in ('turns', 'same_best', 'same_final', 'changes')} == \
+        {k: report[k] for k in ('turns', 'same_best', 'same_final', 'changes')}
+
+
+def test_replay_log_with_centroid_matcher(tmp_path, monkeypatch):
+    """Test that a centroid replay scores with centroid indexes and the centroid threshold"""
+    from .semantic import CentroidIndex
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'replay_out.jsonl'))
+    monkeypatch.delenv('GLOVE_SHARED_MODEL', raising=False)
+    model = tmp_path / 'model.w2v.txt'
+    model.write_text("3 3\ncleanbug 0.9 0.1 0.0\nstaubsauger 1.0 0.0 0.1\nwindowfly 0.1 0.9 0.0\n")
+    monkeypatch.setenv('GLOVE_MODEL_PATH', str(model))
+    db = _replay_db(tmp_path)
+    _replay_log(tmp_path / 'chat_log.jsonl')
+
+    report = replay_log([tmp_path / 'chat_log.jsonl'], db, matcher='centroid')
+    assert report['threshold'] == CentroidMatcher.min_score
+    _, matcher, _ = evaluation._replay_state
+    indexes = [index for _, index in matcher.cache._entries.values()]
+    assert indexes and all(isinstance(index, CentroidIndex) for index in indexes)
+    assert report['same_best'] == 1.0
@@ -0,0 +1,304 @@
+import hashlib
+import os
+import pathlib
+import pickle
+import sqlite3
+import threading
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .tokens import tokenize
+from .types import ChatNode
+
+
+class GraphNode:
+    """Read-only view of one node of a CompiledGraph.
+
+    Has the attributes of a ChatNode (name, type, content, keywords, tokens,
+    children), so matchers, chats and sessions use it unchanged. Views are
+    created on first access and reused, so nodes can be compared by identity.
+    """
+    __slots__ = ('graph', 'id')
+
+    def __init__(self, graph: "CompiledGraph", id: int) -> None:
+        self.graph = graph
+        self.id = id
+
+    @property
+    def name(self) -> str:
+        return self.graph.names[self.id]
+
+    @property
+    def type(self) -> str:
+        return chr(self.graph.types[self.id])
+
+    @property
+    def content(self) -> str:
+        return self.graph.contents[self.id]
+
+    @property
+    def keywords(self) -> Tuple[str, ...]:
+        keywords = self.graph._keywords[self.id]
+        return keywords if keywords is not None else self.graph.keywords(self.id)
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        tokens = self.graph._tokens[self.id]
+        return tokens if tokens is not None else self.graph.tokens(self.id)
+
+    @property
+    def children(self) -> List["GraphNode"]:
+        children = self.graph._children[self.id]
+        return children if children is not None else self.graph.children(self.id)
+
+    def __repr__(self) -> str:
+        return f"GraphNode({self.name!r}, {self.type!r})"
+
+
+class CompiledGraph:
+    """Immutable conversation graph in compact arrays.
+
+    Node ids index ``names``, ``types`` (one byte per node) and ``contents``;
+    repeated contents are stored once. Children are in CSR form: the children
+    of node i are ``targets[offsets[i]:offsets[i + 1]]`` in edge order. Node
+    views, children lists and the keywords and tokens of a node's content
+    exist only for nodes a conversation visited; each is built once. Views
+    and children lists are filled under a lock, so turns on other threads
+    get the same view objects.
+    """
+    __slots__ = ('names', 'types', 'contents', 'ids', 'offsets', 'targets', 'root', '_views', '_children',
+                 '_keywords', '_tokens', '_lock')
+
+    def __init__(self, nodes: Iterable[Tuple[str, str, str]], edges: Iterable[Tuple[str, str]],
+                 root: str = "start") -> None:
+        self.names: List[str] = []
+        self.contents: List[str] = []
+        types = bytearray()
+        texts: dict = {}
+        for name, type, content in nodes:
+            self.names.append(name)
+            content = content or ""
+            self.contents.append(texts.setdefault(content, content))
+            types.append(ord(type))
+        self.types = bytes(types)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+
+        # counting sort of the edges by source keeps their order per node
+        pairs = [(self.ids[frm], self.ids[to]) for frm, to in edges]
+        counts = [0] * (len(self.names) + 1)
+        for frm, _ in pairs:
+            counts[frm + 1] += 1
+        for i in range(len(self.names)):
+            counts[i + 1] += counts[i]
+        self.offsets = array('I', counts)
+        self.targets = array('I', bytes(4 * len(pairs)))
+        fill = list(counts)
+        for frm, to in pairs:
+            self.targets[fill[frm]] = to
+            fill[frm] += 1
+
+        # None if the graph has no such node
+        self.root = self.ids.get(root)
+        self._reset_caches()
+
+    @classmethod
+    def from_nodes(cls, root: ChatNode) -> "CompiledGraph":
+        """Compile the graph of ChatNodes reachable from root."""
+        nodes, edges, seen, stack = [], [], {root.name}, [root]
+        while stack:
+            node = stack.pop()
+            nodes.append((node.name, node.type, node.content))
+            for child in node.children:
+                edges.append((node.name, child.name))
+                if child.name not in seen:
+                    seen.add(child.name)
+                    stack.append(child)
+        return cls(nodes, edges, root.name)
+
+    def node(self, id: int) -> GraphNode:
+        view = self._views[id]
+        if view is None:
+            with self._lock:
+                view = self._views[id]
+                if view is None:
+                    view = self._views[id] = GraphNode(self, id)
+        return view
+
+    def __getitem__(self, name: str) -> GraphNode:
+        return self.node(self.ids[name])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[GraphNode]:
+        return (self.node(i) for i in range(len(self.names)))
+
+    def children(self, id: int) -> List[GraphNode]:
+        """Children of node id; the list is built on first visit and shared, do not modify it."""
+        children = self._children[id]
+        if children is None:
+            views = [self.node(t) for t in self.targets[self.offsets[id]:self.offsets[id + 1]]]
+            with self._lock:
+                children = self._children[id]
+                if children is None:
+                    children = self._children[id] = views
+        return children
+
+    def keywords(self, id: int) -> Tuple[str, ...]:
+        """The ';'-separated keywords of node id's content, split on first use."""
+        keywords = self._keywords[id]
+        if keywords is None:
+            keywords = self._keywords[id] = tuple(self.contents[id].split(';'))
+        return keywords
+
+    def tokens(self, id: int) -> Tuple[str, ...]:
+        """Tokens of node id's keywords, tokenized on first use."""
+        tokens = self._tokens[id]
+        if tokens is None:
+            tokens = self._tokens[id] = tuple(tokenize(self.contents[id].replace(';', ' ')))
+        return tokens
+
+    def __getstate__(self) -> tuple:
+        # views, children lists, keywords and tokens are rebuilt on demand
+        return self.names, self.types, self.contents, self.offsets, self.targets, self.root
+
+    def __setstate__(self, state: tuple) -> None:
+        self.names, self.types, self.contents, self.offsets, self.targets, self.root = state
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self._reset_caches()
+
+    def _reset_caches(self) -> None:
+        self._views: List = [None] * len(self.names)
+        self._children: List = [None] * len(self.names)
+        self._keywords: List = [None] * len(self.names)
+        self._tokens: List = [None] * len(self.names)
+        self._lock = threading.Lock()
+
+    def nbytes(self) -> int:
+        """Size of the id, type and adjacency arrays (strings not included)."""
+        return (len(self.types) + self.offsets.itemsize * len(self.offsets)
+                + self.targets.itemsize * len(self.targets))
+
+
+def diff_graphs(old: CompiledGraph, new: CompiledGraph) -> dict:
+    """Names of the nodes that differ between two versions of a graph.
+
+    ``added`` and ``removed`` nodes, ``changed`` nodes (type or content)
+    and ``rewired`` nodes whose children (names, in order) differ.
+    """
+    added = new.ids.keys() - old.ids.keys()
+    removed = old.ids.keys() - new.ids.keys()
+    changed, rewired = set(), set()
+    for name, i in new.ids.items():
+        j = old.ids.get(name)
+        if j is None:
+            continue
+        if new.types[i] != old.types[j] or new.contents[i] != old.contents[j]:
+            changed.add(name)
+        if ([new.names[t] for t in new.targets[new.offsets[i]:new.offsets[i + 1]]]
+                != [old.names[t] for t in old.targets[old.offsets[j]:old.offsets[j + 1]]]):
+            rewired.add(name)
+    return {'added': added, 'removed': removed, 'changed': changed, 'rewired': rewired}
+
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".graph"
+
+
+def snapshot_path(db_path) -> pathlib.Path:
+    """Snapshot file of a database: bugland.db -> bugland.graph."""
+    return pathlib.Path(db_path).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def load_graph(db_path, root: str = "start", snapshot: bool = True) -> CompiledGraph:
+    """Load the compiled conversation graph, from its snapshot if still valid.
+
+    The snapshot next to the database is used while the graph version kept
+    by the database's triggers (see init.sql) is unchanged, or for databases
+    without one, while the file's size and mtime are; otherwise (unversioned
+    databases only) its content hash decides. A stale or missing snapshot
+    is rewritten after reading the database.
+    """
+    if not snapshot:
+        return read_graph(db_path, root)
+    path = snapshot_path(db_path)
+    signature = graph_signature(db_path)
+    data = _read_snapshot(path)
+    digest = None
+    if data is not None and data['root'] == root:
+        if data['signature'] == signature:
+            return data['graph']
+        # a new graph version is a change, even if it still sits in the WAL and not the file
+        versioned = isinstance(signature[0], str)
+        # touched or copied but not changed: keep the graph, store the new mtime
+        digest = None if versioned else _file_hash(db_path)
+        if data['hash'] == digest:
+            _write_snapshot(path, data['graph'], root, signature, digest)
+            return data['graph']
+    graph = read_graph(db_path, root)
+    _write_snapshot(path, graph, root, signature, digest or _file_hash(db_path))
+    return graph
+
+
+def graph_signature(db_path) -> tuple:
+    """Changes whenever the graph tables do: the graph version, or size and mtime without one."""
+    version = _graph_version(db_path)
+    if version:
+        return version
+    stat = os.stat(db_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_graph(db_path, root: str = "start") -> CompiledGraph:
+    """Read and compile the conversation graph from the database."""
+    conn = sqlite3.connect(db_path)
+    nodes = conn.execute("SELECT name, type, content FROM chat_nodes").fetchall()
+    edges = conn.execute("SELECT from_name, to_name FROM chat_edges").fetchall()
+    conn.close()
+    return CompiledGraph(nodes, edges, root)
+
+
+def _graph_version(db_path) -> Optional[tuple]:
+    """(token, version) of the graph tables, or None if the database has no graph_version."""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT token, version FROM graph_version").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    return tuple(row) if row else None
+
+
+def _file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_snapshot(path: pathlib.Path):
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+        return None
+    return data
+
+
+def _write_snapshot(path: pathlib.Path, graph: CompiledGraph, root: str, signature: tuple, digest: str) -> None:
+    data = {'version': SNAPSHOT_VERSION, 'root': root, 'signature': signature,
+            'hash': digest, 'graph': graph}
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # readers see either the old or the new snapshot, never a partial one
+        os.replace(tmp, path)
+    except OSError:
+        # a read-only data directory only costs the speedup
+        tmp.unlink(missing_ok=True)
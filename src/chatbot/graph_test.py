@@ -0,0 +1,179 @@
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from . import graph as graph_module
+from .chat import Chat
+from .graph import CompiledGraph, GraphNode, diff_graphs, load_graph, read_graph, snapshot_path
+from .matchers import StringMatcher
+from .repliers import GraphReplier
+from .types import ChatNode
+
+
+def _chat_graph():
+    start = ChatNode("start", "o", "Hallo!")
+    private = ChatNode("private", "c", "privat")
+    business = ChatNode("business", "c", "business")
+    problem = ChatNode("problem", "o", "Was ist das Problem?")
+    start.addChild(private)
+    start.addChild(business)
+    private.addChild(problem)
+    business.addChild(problem)
+    return start
+
+
+def test_compiled_graph_keeps_structure():
+    """Test that compiling keeps nodes, contents and child order"""
+    graph = CompiledGraph.from_nodes(_chat_graph())
+    assert len(graph) == 4
+    start = graph.node(graph.root)
+    assert (start.name, start.type, start.content) == ("start", "o", "Hallo!")
+    assert [c.name for c in start.children] == ["private", "business"]
+    # shared children are stored once and views are reused
+    assert graph["private"].children[0] is graph["business"].children[0]
+    assert isinstance(start, GraphNode)
+
+
+def test_views_are_shared_across_threads(monkeypatch):
+    """Test that threads visiting a fresh graph together get the same views and children"""
+    class SlowNode(GraphNode):
+        __slots__ = ()
+
+        def __init__(self, graph, id):
+            # widen the window between the cache check and the fill
+            time.sleep(0.01)
+            super().__init__(graph, id)
+
+    monkeypatch.setattr(graph_module, "GraphNode", SlowNode)
+    graph = CompiledGraph.from_nodes(_chat_graph())
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def visit():
+        barrier.wait()
+        seen.append((graph.node(graph.root), graph["private"].children))
+
+    threads = [threading.Thread(target=visit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(view is seen[0][0] for view, _ in seen)
+    assert all(children is seen[0][1] for _, children in seen)
+
+
+def test_compiled_graph_csr_layout():
+    """Test the CSR arrays and shared contents"""
+    nodes = [("a", "o", "x"), ("b", "c", "same"), ("c", "c", "same")]
+    graph = CompiledGraph(nodes, [("a", "c"), ("a", "b"), ("b", "c")], root="a")
+    assert list(graph.offsets) == [0, 2, 3, 3]
+    assert list(graph.targets) == [2, 1, 2]
+    assert graph.contents[1] is graph.contents[2]
+    assert graph.types == b"occ"
+
+
+def test_graph_replier_on_compiled_graph():
+    """Test that a chat runs unchanged on a compiled graph"""
+    replier = GraphReplier(CompiledGraph.from_nodes(_chat_graph()))
+    chat = Chat(replier, StringMatcher())
+    assert [n.name for n in chat.current_nodes] == ["start"]
+    assert [n.name for n in chat.advance(chat.START)] == ["private", "business"]
+    assert [n.name for n in chat.advance("business")] == ["problem"]
+    assert [n.name for n in chat.log] == ["start", "business"]
+
+
+def test_diff_graphs():
+    """Test that added, removed, changed and rewired nodes are told apart"""
+    old = CompiledGraph([("a", "o", "x"), ("b", "c", "b"), ("c", "c", "c")], [("a", "b"), ("a", "c")], root="a")
+    new = CompiledGraph([("a", "o", "x"), ("b", "c", "b;bee"), ("d", "c", "d")], [("a", "b"), ("a", "d")], root="a")
+    assert diff_graphs(old, new) == {'added': {"d"}, 'removed': {"c"}, 'changed': {"b"}, 'rewired': {"a"}}
+    assert diff_graphs(old, old) == {'added': set(), 'removed': set(), 'changed': set(), 'rewired': set()}
+
+
+def _write_db(path, nodes, edges):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS chat_nodes (name TEXT, content TEXT, type TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS chat_edges (from_name TEXT, to_name TEXT)")
+    conn.executemany("INSERT INTO chat_nodes VALUES (?, ?, ?)", nodes)
+    conn.executemany("INSERT INTO chat_edges VALUES (?, ?)", edges)
+    conn.commit()
+    conn.close()
+
+
+def test_load_graph(tmp_path):
+    """Test loading a compiled graph from the database"""
+    db = tmp_path / 'graph.db'
+    _write_db(db, [("start", "Hallo!", "o"), ("email", None, "i")], [("start", "email")])
+    graph = load_graph(db, snapshot=False)
+    assert [n.name for n in graph.node(graph.root).children] == ["email"]
+    assert graph["email"].content == ""
+    assert not snapshot_path(db).exists()
+
+
+def test_graph_snapshot_reuse_and_invalidation(tmp_path, monkeypatch):
+    """Test that the snapshot is reused until the database changes"""
+    db = tmp_path / 'graph.db'
+    _write_db(db, [("start", "Hallo!", "o")], [])
+    load_graph(db)
+    assert snapshot_path(db).is_file()
+
+    reads = []
+    monkeypatch.setattr(graph_module, 'read_graph', lambda *a: reads.append(a) or read_graph(*a))
+    assert load_graph(db)["start"].content == "Hallo!"
+    # same content with a new mtime is still valid
+    os.utime(db, ns=(0, 0))
+    assert load_graph(db)["start"].content == "Hallo!"
+    assert reads == []
+
+    _write_db(db, [("email", "", "i")], [("start", "email")])
+    graph = load_graph(db)
+    assert len(reads) == 1
+    assert [n.name for n in graph.node(graph.root).children] == ["email"]
+
+
+def test_graph_snapshot_ignores_broken_file(tmp_path):
+    """Test that an unreadable snapshot is replaced"""
+    db = tmp_path / 'graph.db'
+    _write_db(db, [("start", "Hallo!", "o")], [])
+    snapshot_path(db).write_bytes(b"not a pickle")
+    assert load_graph(db)["start"].content == "Hallo!"
+    assert load_graph(db)["start"].content == "Hallo!"
+
+
+def test_graph_snapshot_ignores_ticket_writes(tmp_path, monkeypatch):
+    """Test that only changes to the graph tables invalidate the snapshot"""
+    db = tmp_path / 'bugland.db'
+    conn = sqlite3.connect(db)
+    conn.executescript((pathlib.Path(__file__).parents[2] / 'data' / 'init.sql').read_text())
+    conn.close()
+    load_graph(db)
+
+    reads = []
+    monkeypatch.setattr(graph_module, 'read_graph', lambda *a: reads.append(a) or read_graph(*a))
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("INSERT INTO tickets (email, content) VALUES ('a@b.de', 'x')")
+    load_graph(db)
+    assert reads == []
+
+    with conn:
+        conn.execute("UPDATE chat_nodes SET content = 'Moin!' WHERE name = 'start'")
+    conn.close()
+    assert load_graph(db)["start"].content == "Moin!"
+    assert len(reads) == 1
+
+
+def test_graph_snapshot_sees_changes_in_the_wal(tmp_path):
+    """Test that a graph edit still in the write-ahead log invalidates the snapshot"""
+    db = tmp_path / 'bugland.db'
+    conn = sqlite3.connect(db)
+    conn.executescript((pathlib.Path(__file__).parents[2] / 'data' / 'init.sql').read_text())
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    load_graph(db)
+    with conn:
+        conn.execute("UPDATE chat_nodes SET content = 'Moin!' WHERE name = 'start'")
+    assert load_graph(db)["start"].content == "Moin!"
+    conn.close()
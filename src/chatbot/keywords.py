@@ -0,0 +1,79 @@
+from collections import deque
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over the ';'-separated keywords of a list of nodes.
+
+    All keyword occurrences in a request are found in a single pass over it.
+    Matching is case-insensitive; hits refer to the node by its position.
+    """
+    def __init__(self, contents: List[str]) -> None:
+        self._goto: list[dict] = [{}]
+        self._fail: list[int] = [0]
+        # (node index, keyword index, keyword) ending in each state
+        self._out: list[list] = [[]]
+        for node_idx, content in enumerate(contents):
+            for kw_idx, kw in enumerate(content.split(';')):
+                if kw:
+                    self._add(kw.lower(), (node_idx, kw_idx, kw))
+        self._link()
+
+    def _add(self, pattern: str, hit: tuple) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(hit)
+
+    def _link(self) -> None:
+        # breadth-first so every fail target is complete before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set:
+        """All (node index, keyword index, keyword) hits occurring in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = set()
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+    def first(self, text: str) -> Optional[int]:
+        """Index of the first node with any keyword in text."""
+        hits = self.find(text)
+        return min(h[0] for h in hits) if hits else None
+
+    def longest(self, text: str) -> Optional[Tuple[int, str]]:
+        """(node index, keyword) of the longest keyword in text, earliest on ties."""
+        hits = self.find(text)
+        if not hits:
+            return None
+        node_idx, _, kw = min(hits, key=lambda h: (-len(h[2]), h[0], h[1]))
+        return node_idx, kw
+
+
+@lru_cache(maxsize=1024)
+def automaton_for(contents: Tuple[str, ...]) -> KeywordAutomaton:
+    """Shared automaton for a tuple of node contents, built once."""
+    return KeywordAutomaton(list(contents))
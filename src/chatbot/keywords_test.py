@@ -0,0 +1,47 @@
+import random
+
+from .keywords import *
+
+
+def test_find_overlapping_keywords():
+    """Test that all overlapping and nested keywords are found in one pass"""
+    automaton = KeywordAutomaton(['roboter;reinigungsroboter', 'bug', 'cleanbug;robot'])
+    hits = automaton.find('Mein Reinigungsroboter Cleanbug')
+    assert {(h[0], h[2]) for h in hits} == {
+        (0, 'roboter'), (0, 'reinigungsroboter'), (1, 'bug'), (2, 'cleanbug'), (2, 'robot'),
+    }
+
+
+def test_case_insensitive_and_empty_keywords():
+    """Test that matching ignores case and skips empty keywords"""
+    automaton = KeywordAutomaton(['Ja;Feedback geben', '', 'nein;'])
+    assert automaton.first('JA bitte') == 0
+    assert automaton.first('nichts') is None
+    assert automaton.longest('ja, feedback geben') == (0, 'Feedback geben')
+
+
+def test_longest_prefers_earliest_on_ties():
+    """Test that equally long keywords resolve to the earliest node and keyword"""
+    automaton = KeywordAutomaton(['abc', 'xyz;bcd'])
+    assert automaton.longest('abcd xyz') == (0, 'abc')
+    assert automaton.first('xyz') == 1
+
+
+def test_matches_naive_substring_search():
+    """Test the automaton against the plain `kw in request` scan on random input"""
+    rng = random.Random(0)
+    alphabet = 'abc '
+    for _ in range(200):
+        contents = [';'.join(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+                             for _ in range(rng.randint(1, 3)))
+                    for _ in range(rng.randint(1, 4))]
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        naive = [(i, kw) for i, c in enumerate(contents) for kw in c.split(';') if kw and kw in text]
+        automaton = KeywordAutomaton(contents)
+        assert automaton.first(text) == (naive[0][0] if naive else None)
+        assert automaton.longest(text) == (max(naive, key=lambda x: len(x[1])) if naive else None)
+
+
+def test_automaton_for_is_shared():
+    """Test that automata are built once per tuple of node contents"""
+    assert automaton_for(('a;b', 'c')) is automaton_for(('a;b', 'c'))
@@ -1,51 +1,379 @@
 import os
-import pathlib
-import re
-import warnings
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
-
-import numpy as np
-from gensim.models import KeyedVectors, TfidfModel
-from gensim.utils import simple_preprocess
-from gensim.corpora import Dictionary
-from gensim.similarities import SparseTermSimilarityMatrix, WordEmbeddingSimilarityIndex, SoftCosineSimilarity
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 from .types import ChatNode
 from .debug_mode import init_semantic_log, log_semantic
+from .keywords import automaton_for
+from .tokens import node_tokens, tokenize
+from .profiling import span
+
+# numpy and gensim are only imported with the first semantic match (see semantic.py)
+if TYPE_CHECKING:
+    from gensim.models import KeyedVectors
+    from .semantic import GraphTermSimilarity, NeighbourTable
 
-_MODEL: Optional[KeyedVectors] = None
-_MODEL_PATH: Optional[str] = None
+_MODEL: Optional["KeyedVectors"] = None
+_MODEL_SOURCE: Optional[str] = None
+_MODEL_NAME: str = ""
+# shared block that could not be attached; the file is loaded instead
+_FAILED_SHARED: Optional[str] = None
+_MODEL_LOCK = threading.Lock()
 MODEL_PATH_ENV = "GLOVE_MODEL_PATH"
+# name of a shared memory block published by share_model.py, preferred over the file
+SHARED_MODEL_ENV = "GLOVE_SHARED_MODEL"
+NATIVE_MODEL_SUFFIX = ".kv"
+_TERMSIM: Optional["GraphTermSimilarity"] = None
+_TERMSIM_PATH: Optional[str] = None
+TERMSIM_PATH_ENV = "TERM_SIMILARITY_PATH"
+_NEIGHBOURS: Optional["NeighbourTable"] = None
+_NEIGHBOURS_PATH: Optional[str] = None
+NEIGHBOURS_PATH_ENV = "NEIGHBOUR_TABLE_PATH"
+INDEX_CACHE_SIZE_ENV = "SEMANTIC_INDEX_CACHE_SIZE"
+RESULT_CACHE_SIZE_ENV = "MATCH_CACHE_SIZE"
+RESULT_CACHE_TTL_ENV = "MATCH_CACHE_TTL"
+# minimum soft-cosine score for a semantic match to be accepted
+MIN_SCORE = 0.1
+# names that live in semantic.py but are also importable from here
+_SEMANTIC_NAMES = ('load_model', 'build_term_similarity', 'GraphTermSimilarity',
+                   'build_neighbour_table', 'NeighbourTable')
+
+
+def __getattr__(name: str):
+    if name in _SEMANTIC_NAMES:
+        from . import semantic
+        return getattr(semantic, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def model_name(path: str) -> str:
+    """Name of the embeddings behind a model file, independent of its format."""
+    name = os.path.basename(path)
+    for suffix in (NATIVE_MODEL_SUFFIX, '.w2v.txt', '.txt'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
 
-# suppress divide-by-zero warnings from gensim term similarity
-warnings.filterwarnings(
-    'ignore',
-    category=RuntimeWarning,
-    module='gensim.similarities.termsim'
-)
 
-def _get_model() -> Optional[KeyedVectors]:
-    """Lazily load or reload the GloVe model from env if changed."""
-    global _MODEL, _MODEL_PATH
+def _get_model() -> Optional["KeyedVectors"]:
+    """Lazily load or reload the GloVe model from env if changed.
+
+    A shared model (``GLOVE_SHARED_MODEL``) is attached instead of loading
+    the file, so worker processes use one copy of the vectors. If the block
+    does not exist, ``GLOVE_MODEL_PATH`` is loaded once and the attach is not
+    retried until ``GLOVE_SHARED_MODEL`` names another block.
+    """
+    global _MODEL, _MODEL_SOURCE, _MODEL_NAME, _FAILED_SHARED
+    shared = os.environ.get(SHARED_MODEL_ENV)
+    if shared == _FAILED_SHARED:
+        shared = None
     path = os.environ.get(MODEL_PATH_ENV)
+    source = f"shared:{shared}" if shared else path
+    if not source:
+        return None
+    if source != _MODEL_SOURCE:
+        # one load, also when a background warm-up and a turn ask at once
+        with _MODEL_LOCK:
+            if shared and shared == _FAILED_SHARED:
+                shared, source = None, path
+            if source != _MODEL_SOURCE:
+                _MODEL, _MODEL_SOURCE, _MODEL_NAME = None, None, ""
+                if shared:
+                    from .shared_model import SharedModel
+                    try:
+                        model = SharedModel.attach(shared)
+                    except FileNotFoundError:
+                        _FAILED_SHARED, shared, source = shared, None, path
+                    else:
+                        _MODEL, _MODEL_SOURCE = model.model, source
+                        _MODEL_NAME = model_name(model.meta['source'] or path or '')
+                if not shared and path and os.path.isfile(path):
+                    from .semantic import load_model
+                    _MODEL = load_model(path)
+                    _MODEL_SOURCE, _MODEL_NAME = source, model_name(path)
+                # indexes and results of the previous model are no longer valid
+                _INDEX_CACHE.clear()
+                _CENTROID_CACHE.clear()
+                _RESULT_CACHE.clear()
+                _CENTROID_RESULT_CACHE.clear()
+    return _MODEL
+
+
+def _get_term_similarity() -> Optional["GraphTermSimilarity"]:
+    """Lazily load or reload the precomputed term similarity matrix from env if changed."""
+    global _TERMSIM, _TERMSIM_PATH
+    path = os.environ.get(TERMSIM_PATH_ENV)
     if not path:
         return None
-    if path != _MODEL_PATH:
+    if path != _TERMSIM_PATH:
         if os.path.isfile(path):
-            _MODEL = KeyedVectors.load_word2vec_format(path, binary=False)
-            _MODEL_PATH = path
+            from .semantic import GraphTermSimilarity
+            _TERMSIM = GraphTermSimilarity.load(path)
+            _TERMSIM_PATH = path
         else:
-            _MODEL = None
-            _MODEL_PATH = None
-    return _MODEL
+            _TERMSIM = None
+            _TERMSIM_PATH = None
+        _INDEX_CACHE.clear()
+        _RESULT_CACHE.clear()
+    return _TERMSIM
+
+
+def _get_neighbour_table() -> Optional["NeighbourTable"]:
+    """Lazily load or reload the precomputed neighbour table from env if changed."""
+    global _NEIGHBOURS, _NEIGHBOURS_PATH
+    path = os.environ.get(NEIGHBOURS_PATH_ENV)
+    if not path:
+        return None
+    if path != _NEIGHBOURS_PATH:
+        if os.path.isfile(path):
+            from .semantic import NeighbourTable
+            _NEIGHBOURS = NeighbourTable.load(path)
+            _NEIGHBOURS_PATH = path
+        else:
+            _NEIGHBOURS = None
+            _NEIGHBOURS_PATH = None
+        _INDEX_CACHE.clear()
+        _RESULT_CACHE.clear()
+    return _NEIGHBOURS
+
+
+def node_vocabulary(texts: List[str]) -> List[str]:
+    """Distinct tokens of the given node contents, in first-seen order."""
+    return list(dict.fromkeys(t for text in texts for t in node_tokens(text)))
+
+
+class IndexCache:
+    """Bounded LRU cache of matcher indexes keyed by candidate node set.
+
+    ``factory(nodes, model, termsim, neighbours)`` builds an index on a miss;
+    matchers pass their own (``index_factory``), so a cache only returns an
+    index of the kind it is asked for.
+    """
+    def __init__(self, maxsize: int = 128, factory=None):
+        self.maxsize = maxsize
+        self.factory = factory if factory is not None else _semantic_index
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(nodes: List[ChatNode]) -> tuple:
+        return tuple((n.name, n.type, n.content) for n in nodes if n.type != 'o')
+
+    def get(self, nodes: List[ChatNode], model: "KeyedVectors",
+            termsim: Optional["GraphTermSimilarity"] = None, neighbours: Optional["NeighbourTable"] = None,
+            factory=None):
+        """Return the index for these nodes, building it on a miss (with ``factory`` if given)."""
+        factory = factory if factory is not None else self.factory
+        key = self.key(nodes)
+        with self._lock:
+            built, index = self._entries.get(key, (None, None))
+            if (index is not None and built is factory and index.model is model and index.termsim is termsim
+                    and index.neighbours is neighbours):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+        index = factory(nodes, model, termsim, neighbours)
+        with self._lock:
+            self._entries[key] = factory, index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def discard(self, keys) -> int:
+        """Drop the indexes of these candidate sets (``key(nodes)``); returns how many there were."""
+        with self._lock:
+            return sum(self._entries.pop(key, None) is not None for key in keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResultCache:
+    """Bounded LRU cache of semantic match results.
+
+    Keyed by the request's tokens and the candidate node set. Tokens are
+    sorted, as soft-cosine and centroid scores only depend on the bag of
+    words. An entry is only valid for the model and term similarity matrix
+    it was scored with, and for ``ttl`` seconds if given. It stores the
+    position of the best candidate, so a hit returns the node of the
+    current candidate list. ``maxsize=0`` disables caching.
+    """
+    MISS = object()
+
+    def __init__(self, maxsize: int = 4096, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tokens: List[str], nodes: List[ChatNode]) -> tuple:
+        return tuple(sorted(tokens)), IndexCache.key(nodes)
+
+    def get(self, key: tuple, model, termsim=None):
+        """(position, score) stored for key, or ``MISS``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, entry_model, entry_termsim, expires = entry
+                if (entry_model is model and entry_termsim is termsim
+                        and (expires is None or time.monotonic() < expires)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return self.MISS
+
+    def put(self, key: tuple, result: Tuple[Optional[int], Optional[float]], model, termsim=None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (result, model, termsim, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def discard(self, keys) -> int:
+        """Drop the results for these candidate sets (``IndexCache.key(nodes)``); returns how many."""
+        keys = set(keys)
+        with self._lock:
+            stale = [key for key in self._entries if key[1] in keys]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _semantic_index(nodes, model, termsim, neighbours):
+    from .semantic import SemanticIndex
+    return SemanticIndex(nodes, model, termsim, neighbours)
+
+
+def _centroid_index(nodes, model, termsim, neighbours):
+    from .semantic import CentroidIndex
+    return CentroidIndex(nodes, model, termsim, neighbours)
+
 
+# shared by all matchers so indexes survive across turns and sessions
+_INDEX_CACHE = IndexCache(int(os.environ.get(INDEX_CACHE_SIZE_ENV, 128)))
+_CENTROID_CACHE = IndexCache(int(os.environ.get(INDEX_CACHE_SIZE_ENV, 128)), factory=_centroid_index)
+# results differ per scoring method, so each matcher kind has its own
+_RESULT_CACHE = ResultCache(int(os.environ.get(RESULT_CACHE_SIZE_ENV, 4096)),
+                            float(os.environ.get(RESULT_CACHE_TTL_ENV, 0)))
+_CENTROID_RESULT_CACHE = ResultCache(int(os.environ.get(RESULT_CACHE_SIZE_ENV, 4096)),
+                                     float(os.environ.get(RESULT_CACHE_TTL_ENV, 0)))
 
-def _preprocess(text: str) -> List[str]:
-    """Tokenize and clean text."""
-    text = re.sub(r'<[^<>]+>', ' ', text)
-    text = re.sub(r'http[s]?://\S+', ' url ', text)
-    return [t for t in simple_preprocess(text) if t]
+
+class BackgroundWarmUp:
+    """Loads a matcher's model and builds its indexes in a background thread.
+
+    Until the warm-up is done the matcher answers with exact keyword matching
+    only, so no turn waits for the model. ``status()`` reports the state and
+    how long loading the model and building the indexes took; ``on_done`` is
+    called with the warm-up in its thread when it finishes, before ``wait``
+    returns.
+    """
+    def __init__(self, matcher: "StringMatcher", candidate_sets: List[List[ChatNode]] = (),
+                 on_done=None) -> None:
+        self.matcher = matcher
+        self.candidate_sets = list(candidate_sets)
+        self.on_done = on_done
+        self.available: Optional[bool] = None
+        self.error: Optional[BaseException] = None
+        self.model_seconds: Optional[float] = None
+        self.index_seconds: Optional[float] = None
+        # semantic matches answered by keyword matching while warming up
+        self.fallbacks = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-warm-up', daemon=True)
+
+    def start(self) -> "BackgroundWarmUp":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up finished (or timeout); returns whether it did."""
+        return self._done.wait(timeout)
+
+    def status(self) -> dict:
+        if self._finished is None:
+            state = 'loading'
+        elif self.error is not None:
+            state = 'failed'
+        else:
+            state = 'ready' if self.available else 'unavailable'
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return {'state': state, 'seconds': end - self._started if self._started is not None else 0.0,
+                'model_seconds': self.model_seconds, 'index_seconds': self.index_seconds,
+                'indexes': len(self.candidate_sets), 'fallbacks': self.fallbacks,
+                'error': repr(self.error) if self.error is not None else None}
+
+    def describe(self) -> str:
+        s = self.status()
+        if s['state'] == 'loading':
+            return f"Model warm-up: loading for {s['seconds']:.2f} s, {s['fallbacks']} keyword fallbacks so far"
+        if s['state'] == 'failed':
+            return f"Model warm-up: failed after {s['seconds']:.2f} s: {s['error']}"
+        if s['state'] == 'unavailable':
+            return "Model warm-up: no model, keyword matching only"
+        return (f"Model warm-up: ready after {s['seconds']:.2f} s (model {s['model_seconds']:.2f} s, "
+                f"{s['indexes']} indexes {s['index_seconds']:.2f} s), {s['fallbacks']} keyword fallbacks")
+
+    def _run(self) -> None:
+        try:
+            start = time.perf_counter()
+            self.available = self.matcher.warm_up()
+            self.model_seconds = time.perf_counter() - start
+            if self.available:
+                start = time.perf_counter()
+                self.matcher.warm_up(self.candidate_sets)
+                self.index_seconds = time.perf_counter() - start
+        except Exception as e:
+            self.error = e
+        self._finished = time.perf_counter()
+        try:
+            if self.on_done is not None:
+                self.on_done(self)
+        finally:
+            self._done.set()
 
 
 class Matcher(ABC):
@@ -53,83 +381,239 @@ class Matcher(ABC):
     def match(self, request: str, nodes: List[ChatNode], default: str = "") -> ChatNode:
         pass
 
+    def match_many(self, requests: List[str], nodes: List[ChatNode],
+                   default: str = "") -> List[Tuple[ChatNode, Union[str, float, None]]]:
+        """Match many requests against one candidate set, returning (node, info) pairs."""
+        return [(self.match(r, nodes, default), None) for r in requests]
+
 
 class StringMatcher(Matcher):
-    """Literal and semantic matcher for ChatNodes."""
-    def __init__(self):
+    """Literal and semantic matcher for ChatNodes.
+
+    Uses the GloVe model configured via ``GLOVE_MODEL_PATH`` unless an
+    explicit ``model`` (e.g. a pruned one) is given. Semantic results are
+    kept in ``results`` for repeated requests. After ``start_warm_up`` the
+    model loads in the background and keyword matching answers meanwhile.
+    """
+    min_score = MIN_SCORE
+    # builds the index of a candidate set, whichever cache it is kept in
+    index_factory = staticmethod(_semantic_index)
+
+    def __init__(self, cache: Optional[IndexCache] = None, model: Optional["KeyedVectors"] = None,
+                 results: Optional[ResultCache] = None):
         # clear semantic log storage
         init_semantic_log()
+        self.cache = cache if cache is not None else _INDEX_CACHE
+        self.results = results if results is not None else _RESULT_CACHE
+        self.model = model
+        self.background: Optional[BackgroundWarmUp] = None
 
     def match(self, request: str, nodes: List[ChatNode], default: str = "") -> ChatNode:
-        req = request.lower()
         # type 'o' always wins
         for n in nodes:
             if n.type == 'o':
                 return n
-        # keyword match
-        for n in nodes:
-            if any(kw and kw.lower() in req for kw in n.content.split(';')):
-                return n
+        # keyword match: first node with any keyword in the request
+        hit = automaton_for(tuple(n.content for n in nodes)).first(request)
+        if hit is not None:
+            return nodes[hit]
         return next((n for n in nodes if n.name == default), nodes[0])
 
     def semantic_match(self, request: str, nodes: List[ChatNode], default: str = "") -> ChatNode:
+        best, info = self.score(request, nodes)
+        if best is not None:
+            with span('log'):
+                self._log(request, best.name, info)
+        return self.resolve(request, nodes, best, info, default)
+
+    def resolve(self, request: str, nodes: List[ChatNode], best: Optional[ChatNode],
+                info: Union[str, float, None], default: str = "") -> ChatNode:
+        """Turn the result of score() into the chosen node."""
+        # exact keyword hits always win, scores need a minimum similarity
+        if best is None or (isinstance(info, float) and info < self.min_score):
+            return self.match(request, nodes, default)
+        return best
+
+    def score(self, request: str, nodes: List[ChatNode]) -> Tuple[Optional[ChatNode], Union[str, float, None]]:
+        """Find the best candidate for a request without logging or thresholding.
+
+        Returns the node with ``"exact(<keyword>)"`` for keyword hits or with its
+        soft-cosine score, and ``(None, None)`` if semantic matching is not possible.
+        """
         # 1) Exact keyword matching: pick the node with the longest matching keyword
-        req = request.lower()
-        exact = [ (n, kw)
-                  for n in nodes if n.type != 'o'
-                  for kw in n.content.split(';')
-                  if kw and kw.lower() in req ]
+        with span('exact_match'):
+            exact = self._exact(request, nodes)
         if exact:
-            # choose the most specific keyword and log it
-            n, kw = max(exact, key=lambda x: len(x[1]))
-            self._log(request, n.name, f"exact({kw})")
-            return n
+            return exact
         # 2) Load or reload the GloVe embedding model if needed
-        model = _get_model()
-        # fallback to simple match if model missing or no candidates
+        with span('model_load'):
+            model = self._model()
+            termsim = self._term_similarity() if model else None
+        # no semantic match if model missing or no candidates
         if not model or not nodes:
-            return self.match(request, nodes, default)
-        # 3) Prepare tokenized documents for Soft Cosine
-        corpus = [_preprocess(n.content.replace(';', ' ')) for n in nodes if n.type != 'o']
-        tokens = _preprocess(request)
-        # if preprocessing yields no tokens, fallback
-        if not corpus or not tokens:
-            return self.match(request, nodes, default)
-        # 4) Build dictionary and TF-IDF representation
-        dict_ = Dictionary(corpus + [tokens])
-        tfidf = TfidfModel(dictionary=dict_)
-        tfidf_corpus = [tfidf[dict_.doc2bow(c)] for c in corpus]
-        # remove docs that produce empty TF-IDF (zero vectors)
-        cand_nodes = [n for n in nodes if n.type != 'o']
-        valid_idxs = [i for i, doc in enumerate(tfidf_corpus) if doc]
-        if not valid_idxs:
-            return self.match(request, nodes, default)
-        filtered_corpus = [tfidf_corpus[i] for i in valid_idxs]
-        # 5) Create a SoftCosineSimilarity index using word embeddings, suppress NumPy runtime warnings
-        with np.errstate(divide='ignore', invalid='ignore'):
-            sim_index = WordEmbeddingSimilarityIndex(model)
-            matrix = SparseTermSimilarityMatrix(sim_index, dict_, tfidf)
-            softcos = SoftCosineSimilarity(filtered_corpus, matrix)
-        # 6) Transform query and compute similarity scores
-        vec = tfidf[dict_.doc2bow(tokens)]
-        # compute similarity scores, suppress divide-by-zero/runtime warnings
-        with np.errstate(divide='ignore', invalid='ignore'):
-            scores_raw = softcos[vec]
-        # map back to original candidates, zero for removed docs
-        scores = np.zeros(len(cand_nodes))
-        for idx_filt, orig_i in enumerate(valid_idxs):
-            scores[orig_i] = float(scores_raw[idx_filt])
-        # 7) Pick the highest-scoring candidate (or fallback)
-        idx = int(np.nanargmax(scores)) if scores.size else -1
-        if idx < 0:
-            return self.match(request, nodes, default)
-        # 8) Log the best semantic match and threshold by score
-        best = [n for n in nodes if n.type != 'o'][idx]
-        score = float(scores[idx])
-        self._log(request, best.name, score)
-        # require a minimum similarity (0.1) or fallback to keyword logic
-        return best if score >= 0.1 else self.match(request, nodes, default)
+            if any(n.type != 'o' for n in nodes):
+                self._fall_back()
+            return None, None
+        # 3) Same words against the same candidates: reuse the earlier result
+        with span('result_cache'):
+            tokens = tokenize(request)
+            key = self.results.key(tokens, nodes)
+            cached = self.results.get(key, model, termsim)
+        if cached is ResultCache.MISS:
+            cached = self._score_tokens(tokens, nodes, model, termsim)
+            self.results.put(key, cached, model, termsim)
+        idx, score = cached
+        if idx is None:
+            return None, None
+        return [n for n in nodes if n.type != 'o'][idx], score
+
+    def _score_tokens(self, tokens: List[str], nodes: List[ChatNode], model: "KeyedVectors",
+                      termsim: Optional["GraphTermSimilarity"]) -> Tuple[Optional[int], Optional[float]]:
+        """Position of the best candidate (among the non-output nodes) and its score."""
+        # Fetch the soft-cosine index for this candidate set (built once)
+        with span('index'):
+            index = self.cache.get(nodes, model, termsim, self._neighbour_table(), self.index_factory)
+        with span('scoring'):
+            if not index.nodes or not tokens:
+                return None, None
+            # Score the query against every candidate, zero for empty docs
+            scores = index.scores(tokens)
+            if scores is None or not scores.size:
+                return None, None
+            # Pick the highest-scoring candidate
+            import numpy as np
+            idx = int(np.nanargmax(scores))
+            return idx, float(scores[idx])
+
+    def match_many(self, requests: List[str], nodes: List[ChatNode],
+                   default: str = "", batch_size: int = 1024) -> List[Tuple[ChatNode, Union[str, float, None]]]:
+        """Match many requests against one candidate set without logging.
+
+        Returns the chosen node per request together with what semantic_match
+        would log for it: the exact keyword, the best score or None. All
+        requests without a keyword hit are scored in batches of ``batch_size``.
+        """
+        results: list = [None] * len(requests)
+        pending = []
+        for i, request in enumerate(requests):
+            exact = self._exact(request, nodes)
+            if exact:
+                results[i] = exact
+            else:
+                pending.append((i, tokenize(request)))
+        model = self._model()
+        if not model and pending and any(n.type != 'o' for n in nodes):
+            self._fall_back(len(pending))
+        if model and nodes and pending:
+            index = self.cache.get(nodes, model, self._term_similarity(), self._neighbour_table(), self.index_factory)
+        else:
+            index = None
+        if index is not None and index.nodes:
+            import numpy as np
+            scored = [(i, tokens) for i, tokens in pending if tokens]
+            for start in range(0, len(scored), batch_size):
+                batch = scored[start:start + batch_size]
+                scores = index.scores_many([tokens for _, tokens in batch])
+                if scores is None or not scores.size:
+                    break
+                best = np.nanargmax(scores, axis=1)
+                for (i, _), idx, row in zip(batch, best, scores):
+                    results[i] = (index.nodes[idx], float(row[idx]))
+        matched = []
+        for request, result in zip(requests, results):
+            best, info = result if result is not None else (None, None)
+            matched.append((self.resolve(request, nodes, best, info, default), info))
+        return matched
+
+    def warm_up(self, candidate_sets: List[List[ChatNode]] = ()) -> bool:
+        """Load the model and build the indexes of the given candidate sets.
+
+        Returns whether a model is available for semantic matching.
+        """
+        model = self._load_model()
+        if not model:
+            return False
+        termsim, neighbours = self._term_similarity(), self._neighbour_table()
+        for nodes in candidate_sets:
+            self.cache.get(nodes, model, termsim, neighbours, self.index_factory)
+        return True
+
+    def forget(self, keys) -> int:
+        """Drop cached indexes and results of these candidate sets (``IndexCache.key(nodes)``)."""
+        return self.cache.discard(keys) + self.results.discard(keys)
+
+    def start_warm_up(self, candidate_sets: List[List[ChatNode]] = (), on_done=None) -> BackgroundWarmUp:
+        """Run warm_up in a background thread; semantic matching starts once it is done."""
+        self.background = BackgroundWarmUp(self, candidate_sets, on_done)
+        return self.background.start()
+
+    def _exact(self, request: str, nodes: List[ChatNode]) -> Optional[Tuple[ChatNode, str]]:
+        cands = [n for n in nodes if n.type != 'o']
+        exact = automaton_for(tuple(n.content for n in cands)).longest(request)
+        if not exact:
+            return None
+        # choose the most specific keyword
+        idx, kw = exact
+        return cands[idx], f"exact({kw})"
+
+    def _model(self) -> Optional["KeyedVectors"]:
+        # keyword matching until the model is ready (or for good if loading failed)
+        return None if self._warming_up() else self._load_model()
+
+    def _warming_up(self) -> bool:
+        background = self.background
+        return background is not None and (not background.done() or background.error is not None)
+
+    def _fall_back(self, count: int = 1) -> None:
+        """Count semantic matches answered by keyword matching because the model is not ready."""
+        if self._warming_up():
+            self.background.fallbacks += count
+
+    def _load_model(self) -> Optional["KeyedVectors"]:
+        return self.model if self.model is not None else _get_model()
+
+    def _term_similarity(self) -> Optional["GraphTermSimilarity"]:
+        # only use a precomputed matrix that was built from the loaded model
+        if self.model is not None or _get_model() is None:
+            return None
+        termsim = _get_term_similarity()
+        if termsim is None or termsim.model_name != _MODEL_NAME:
+            return None
+        return termsim
+
+    def _neighbour_table(self) -> Optional["NeighbourTable"]:
+        # only use a table that was built from the loaded model
+        model = None if self.model is not None else _get_model()
+        if model is None:
+            return None
+        table = _get_neighbour_table()
+        if table is None or table.model_name != _MODEL_NAME or not table.fits(model):
+            return None
+        return table
 
     def _log(self, req: str, name: str, info):
         # delegate to debug_mode
-        log_semantic(req, name, info)
\ No newline at end of file
+        log_semantic(req, name, info)
+
+
+class CentroidMatcher(StringMatcher):
+    """Fast semantic matcher comparing mean word embeddings.
+
+    Each candidate node is represented by the normalized mean of its keyword
+    embeddings, so scoring a request is a single matrix-vector product.
+    Cosines of centroids run higher than soft-cosine scores, hence the
+    stricter threshold.
+    """
+    min_score = 0.5
+    index_factory = staticmethod(_centroid_index)
+
+    def __init__(self, cache: Optional[IndexCache] = None, model: Optional["KeyedVectors"] = None,
+                 results: Optional[ResultCache] = None):
+        super().__init__(cache if cache is not None else _CENTROID_CACHE, model,
+                         results if results is not None else _CENTROID_RESULT_CACHE)
+
+    def _term_similarity(self) -> Optional["GraphTermSimilarity"]:
+        return None
+
+    def _neighbour_table(self) -> Optional["NeighbourTable"]:
+        return None
\ No newline at end of file
@@ -1,6 +1,18 @@
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors, TfidfModel
+
 from .matchers import *
+from .semantic import NeighbourSimilarityIndex, build_neighbour_table, build_term_similarity
 
 from .types import ChatNode
+from .debug_mode import get_semantic_log
 
 def test_matchers():
     matchers = [
@@ -29,3 +41,342 @@ def test_semantic_match_fallback_to_match():
     # Default fallback
     result_default = matcher.semantic_match('no match here', nodes, default='y')
     assert result_default.name == 'y'
+
+
+def _write_model(path):
+    """Write a tiny word2vec text model with three separable topics."""
+    vectors = {
+        'cleanbug': [0.9, 0.1, 0.0], 'vacuum': [1.0, 0.0, 0.1],
+        'windowfly': [0.1, 0.9, 0.0], 'glass': [0.0, 1.0, 0.1],
+        'gardenbeetle': [0.0, 0.1, 0.9], 'weeds': [0.1, 0.0, 1.0],
+    }
+    with open(path, 'w') as f:
+        f.write(f"{len(vectors)} 3\n")
+        for word, vec in vectors.items():
+            f.write(word + ' ' + ' '.join(map(str, vec)) + '\n')
+    return str(path)
+
+
+def _product_nodes():
+    return [
+        ChatNode('cleanbug', 'c', 'cleanbug'),
+        ChatNode('windowfly', 'c', 'windowfly'),
+        ChatNode('gardenbeetle', 'c', 'gardenbeetle'),
+    ]
+
+
+def test_semantic_match_with_model(tmp_path, monkeypatch):
+    """Test that semantic_match picks the node closest in embedding space"""
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    matcher = StringMatcher(cache=IndexCache())
+    nodes = _product_nodes()
+    assert matcher.semantic_match('my vacuum', nodes).name == 'cleanbug'
+    assert matcher.semantic_match('dirty glass', nodes).name == 'windowfly'
+    assert matcher.semantic_match('weeds', nodes).name == 'gardenbeetle'
+
+
+def test_semantic_index_cache_hits_and_eviction(tmp_path, monkeypatch):
+    """Test that indexes are reused per candidate set and evicted by LRU"""
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    cache = IndexCache(maxsize=1)
+    # no result cache, every request reaches the index
+    matcher = StringMatcher(cache=cache, results=ResultCache(0))
+    nodes = _product_nodes()
+    matcher.semantic_match('my vacuum', nodes)
+    matcher.semantic_match('dirty glass', nodes)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 1}
+    # a different candidate set evicts the first one
+    matcher.semantic_match('weeds', nodes[1:])
+    matcher.semantic_match('my vacuum', nodes)
+    assert cache.misses == 3
+    assert len(cache) == 1
+
+
+def test_result_cache_reuses_scores_for_the_same_words(tmp_path, monkeypatch):
+    """Test that repeated requests are answered from the result cache"""
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    results = ResultCache(maxsize=2)
+    matcher = StringMatcher(cache=IndexCache(), results=results)
+    nodes = _product_nodes()
+    first = matcher.score('my vacuum', nodes)
+    # same bag of words, other order and case
+    assert matcher.score('Vacuum, MY!', nodes) == first
+    assert matcher.cache.stats()['misses'] == 1 and matcher.cache.stats()['hits'] == 0
+    assert results.stats()['hits'] == 1 and results.stats()['hit_rate'] == 0.5
+    # keyword hits never reach the cache
+    assert matcher.score('cleanbug', nodes)[1] == 'exact(cleanbug)'
+    assert results.stats()['misses'] == 1
+    # the hit returns the node of the current candidate list
+    copies = [ChatNode(n.name, n.type, n.content) for n in nodes]
+    assert matcher.score('my vacuum', copies)[0] is copies[0]
+    # another model invalidates the entry
+    other = StringMatcher(cache=IndexCache(), results=results,
+                          model=KeyedVectors.load_word2vec_format(str(tmp_path / 'model.w2v.txt')))
+    other.score('my vacuum', nodes)
+    assert results.stats()['misses'] == 2
+    # least recently used entries are evicted
+    matcher.score('dirty glass', nodes)
+    matcher.score('weeds', nodes)
+    assert len(results) == 2
+
+
+def test_result_cache_entries_expire():
+    """Test that entries older than the TTL are misses"""
+    results = ResultCache(ttl=0.05)
+    model = object()
+    key = ResultCache.key(['b', 'a'], [ChatNode('x', 'c', 'a')])
+    assert key == ResultCache.key(['a', 'b'], [ChatNode('x', 'c', 'a')])
+    results.put(key, (0, 0.9), model)
+    assert results.get(key, model) == (0, 0.9)
+    assert results.get(key, object()) is ResultCache.MISS
+    results.put(key, (0, 0.9), model)
+    time.sleep(0.06)
+    assert results.get(key, model) is ResultCache.MISS
+    assert len(results) == 0
+
+
+def test_background_warm_up_falls_back_to_keywords(tmp_path, monkeypatch):
+    """Test that turns use keyword matching while the model loads in the background"""
+    from . import semantic
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    release = threading.Event()
+    load_model = semantic.load_model
+
+    def slow_load(path):
+        release.wait(5)
+        return load_model(path)
+
+    monkeypatch.setattr(semantic, 'load_model', slow_load)
+    nodes = _product_nodes()
+    matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    warm_up = matcher.start_warm_up([nodes])
+    assert matcher.semantic_match('my vacuum', nodes, default='gardenbeetle').name == 'gardenbeetle'
+    assert matcher.semantic_match('cleanbug', nodes).name == 'cleanbug'
+    # advancing past a bot output is no semantic match
+    assert matcher.semantic_match('', [ChatNode('hint', 'o', 'Hinweis')]).name == 'hint'
+    assert warm_up.status()['state'] == 'loading'
+    assert warm_up.status()['fallbacks'] == 1
+    release.set()
+    assert warm_up.wait(5)
+    status = warm_up.status()
+    assert status['state'] == 'ready' and status['indexes'] == 1
+    assert status['model_seconds'] > 0 and status['index_seconds'] is not None
+    assert matcher.semantic_match('my vacuum', nodes, default='gardenbeetle').name == 'cleanbug'
+    assert warm_up.status()['fallbacks'] == 1
+    # the index was built by the warm-up
+    assert matcher.cache.stats()['hits'] == 1 and matcher.cache.stats()['misses'] == 1
+
+
+def test_failed_warm_up_keeps_keyword_matching(tmp_path, monkeypatch):
+    """Test that a model that cannot be loaded leaves keyword matching in place"""
+    from . import semantic
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+
+    def broken_load(path):
+        raise ValueError("not a model")
+
+    monkeypatch.setattr(semantic, 'load_model', broken_load)
+    done = []
+    matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    matcher.start_warm_up(on_done=done.append).wait(5)
+    assert done == [matcher.background]
+    assert matcher.background.status()['state'] == 'failed'
+    assert 'not a model' in matcher.background.describe()
+    assert matcher.semantic_match('my vacuum', _product_nodes(), default='windowfly').name == 'windowfly'
+
+
+def test_semantic_match_with_precomputed_term_similarity(tmp_path, monkeypatch):
+    """Test that a saved graph-wide matrix gives the same matches as building per set"""
+    model_path = _write_model(tmp_path / 'model.w2v.txt')
+    monkeypatch.setenv(MODEL_PATH_ENV, model_path)
+    nodes = _product_nodes()
+    model = KeyedVectors.load_word2vec_format(model_path, binary=False)
+    termsim = build_term_similarity([n.content for n in nodes], model, model_name(model_path))
+    termsim.save(str(tmp_path / 'graph.termsim'))
+    monkeypatch.setenv(TERMSIM_PATH_ENV, str(tmp_path / 'graph.termsim'))
+
+    matcher = StringMatcher(cache=IndexCache())
+    assert matcher._term_similarity() is not None
+    assert matcher.semantic_match('my vacuum', nodes).name == 'cleanbug'
+    assert matcher.semantic_match('dirty glass', nodes).name == 'windowfly'
+    # a subset of the graph is sliced out of the same matrix
+    assert matcher.semantic_match('weeds', nodes[1:]).name == 'gardenbeetle'
+
+
+def test_semantic_match_with_native_model(tmp_path, monkeypatch):
+    """Test that a native .kv model is memory-mapped and matches like the text model"""
+    from .matchers import _get_model
+    text_model = KeyedVectors.load_word2vec_format(_write_model(tmp_path / 'model.w2v.txt'))
+    text_model.save(str(tmp_path / 'model.kv'), separately=['vectors'])
+    monkeypatch.setenv(MODEL_PATH_ENV, str(tmp_path / 'model.kv'))
+
+    matcher = StringMatcher(cache=IndexCache())
+    assert matcher.semantic_match('my vacuum', _product_nodes()).name == 'cleanbug'
+    assert isinstance(_get_model().vectors, np.memmap)
+    assert model_name(str(tmp_path / 'model.kv')) == model_name(str(tmp_path / 'model.w2v.txt'))
+
+
+def test_score_with_explicit_model(tmp_path):
+    """Test that an explicitly given model is used and score() reports without logging"""
+    model = KeyedVectors.load_word2vec_format(_write_model(tmp_path / 'model.w2v.txt'))
+    matcher = StringMatcher(cache=IndexCache(), model=model)
+    nodes = _product_nodes()
+    node, info = matcher.score('dirty glass', nodes)
+    assert node.name == 'windowfly'
+    assert isinstance(info, float) and info >= MIN_SCORE
+    assert matcher.score('a windowfly', nodes) == (nodes[1], 'exact(windowfly)')
+    assert matcher.score('', nodes) == (None, None)
+    assert get_semantic_log() == []
+
+
+def test_centroid_matcher(tmp_path, monkeypatch):
+    """Test that CentroidMatcher matches like StringMatcher on clear requests"""
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    matcher = CentroidMatcher()
+    assert isinstance(matcher, Matcher)
+    nodes = _product_nodes()
+    assert matcher.semantic_match('my vacuum', nodes).name == 'cleanbug'
+    assert matcher.semantic_match('dirty glass', nodes).name == 'windowfly'
+    assert matcher.semantic_match('a gardenbeetle', nodes).name == 'gardenbeetle'
+    # unknown words score zero and fall back to the default
+    assert matcher.semantic_match('xyz', nodes, default='windowfly').name == 'windowfly'
+    node, score = matcher.score('weeds', nodes)
+    assert node.name == 'gardenbeetle' and score > matcher.min_score
+
+
+def test_neighbour_table_matches_embedding_search():
+    """Test that a neighbour table yields the neighbours a search of the model finds"""
+    from gensim.similarities import WordEmbeddingSimilarityIndex
+    from .benchmark import fixture_model
+
+    model = fixture_model(['cleanbug', 'windowfly', 'gardenbeetle'], extra_words=300)
+    words = model.index_to_key[:50]
+    table = build_neighbour_table(model, 'fixture', k=20, words=words, batch=16)
+    assert table.fits(model) and table.k == 20
+    searched = WordEmbeddingSimilarityIndex(model)
+    looked_up = NeighbourSimilarityIndex(table, model)
+    for word in words[:10] + [model.index_to_key[-1]]:  # the last word has no row
+        expected = list(searched.most_similar(word, topn=20))
+        got = list(looked_up.most_similar(word, topn=20))
+        assert [t for t, _ in got] == [t for t, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected], abs=2e-3)
+    assert list(looked_up.most_similar('unbekannt')) == []
+
+
+def test_semantic_match_with_neighbour_table(tmp_path, monkeypatch):
+    """Test that a saved neighbour table gives the same matches and is ignored for another model"""
+    model_path = _write_model(tmp_path / 'model.w2v.txt')
+    monkeypatch.setenv(MODEL_PATH_ENV, model_path)
+    model = KeyedVectors.load_word2vec_format(model_path, binary=False)
+    build_neighbour_table(model, model_name(model_path), k=3).save(str(tmp_path / 'model.neighbours'))
+    monkeypatch.setenv(NEIGHBOURS_PATH_ENV, str(tmp_path / 'model.neighbours'))
+
+    cache = IndexCache()
+    matcher = StringMatcher(cache=cache, results=ResultCache(0))
+    assert matcher._neighbour_table() is not None
+    nodes = _product_nodes()
+    assert matcher.semantic_match('my vacuum', nodes).name == 'cleanbug'
+    assert matcher.semantic_match('dirty glass', nodes).name == 'windowfly'
+    assert cache.get(nodes, model).neighbours is None
+    assert cache.get(nodes, matcher._load_model(), None, matcher._neighbour_table()).neighbours is not None
+    # built for other embeddings: neighbours are searched in the model again
+    build_neighbour_table(model, 'other', k=3).save(str(tmp_path / 'other.neighbours'))
+    monkeypatch.setenv(NEIGHBOURS_PATH_ENV, str(tmp_path / 'other.neighbours'))
+    assert matcher._neighbour_table() is None
+    assert matcher.semantic_match('weeds', nodes).name == 'gardenbeetle'
+
+
+def test_match_many_agrees_with_single_requests(tmp_path, monkeypatch):
+    """Test that batch matching returns the same nodes and scores as one-by-one"""
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    nodes = _product_nodes()
+    requests = ['my vacuum', 'dirty glass', 'a windowfly', 'xyz', '', 'weeds vacuum']
+    for matcher in (StringMatcher(cache=IndexCache()), CentroidMatcher()):
+        results = matcher.match_many(requests, nodes, default='gardenbeetle', batch_size=2)
+        assert len(results) == len(requests)
+        for request, (node, info) in zip(requests, results):
+            best, expected = matcher.score(request, nodes)
+            assert node is matcher.resolve(request, nodes, best, expected, default='gardenbeetle')
+            assert info == pytest.approx(expected) if isinstance(info, float) else info == expected
+    assert get_semantic_log() == []
+
+
+def _gensim_soft_cosine(corpus, tokens, model):
+    """Scores of the former per-request pipeline: dictionary and TF-IDF over the candidates and the request."""
+    from gensim.corpora import Dictionary
+    from gensim.similarities import SoftCosineSimilarity, SparseTermSimilarityMatrix, WordEmbeddingSimilarityIndex
+
+    dictionary = Dictionary(corpus + [tokens])
+    tfidf = TfidfModel(dictionary=dictionary)
+    docs = [tfidf[dictionary.doc2bow(c)] for c in corpus]
+    valid = [i for i, doc in enumerate(docs) if doc]
+    scores = np.zeros(len(corpus))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix = SparseTermSimilarityMatrix(WordEmbeddingSimilarityIndex(model), dictionary, tfidf)
+        index = SoftCosineSimilarity([docs[i] for i in valid], matrix)
+        scores[valid] = np.atleast_1d(index[tfidf[dictionary.doc2bow(tokens)]])
+    return scores
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_semantic_index_scores_like_gensim(seed):
+    """Test that cached indexes score requests as gensim's SoftCosineSimilarity over candidates and request"""
+    import random
+    from .benchmark import fixture_model, fixture_words
+    from .semantic import SemanticIndex
+
+    rng = random.Random(seed)
+    vocabulary = fixture_words(30, seed + 100)
+    model = fixture_model(vocabulary, extra_words=60, seed=seed)
+    nodes = [ChatNode(f'n{i}', 'c', ';'.join(rng.sample(vocabulary, rng.randint(1, 4)))) for i in range(6)]
+    index = SemanticIndex(nodes, model)
+    corpus = [list(n.tokens) for n in nodes]
+    other_words = model.index_to_key[len(vocabulary):]
+    queries = [[rng.choice(vocabulary) for _ in range(rng.randint(0, 2))]
+               + [rng.choice(other_words) for _ in range(rng.randint(0, 3))] for _ in range(30)]
+    queries = [q for q in queries if q]
+    for tokens, scores in zip(queries, index.scores_many(queries)):
+        assert scores == pytest.approx(_gensim_soft_cosine(corpus, tokens, model), abs=1e-5)
+
+
+def test_semantic_index_relates_unknown_terms_both_ways():
+    """Test that a request term counts as related when it is only among the neighbours of a candidate term"""
+    from .semantic import SemanticIndex
+
+    rng = np.random.default_rng(0)
+    # 'query' has 120 closer neighbours than 'vacuum', but is the nearest word to 'vacuum'
+    words = {'query': [1.0, 0, 0, 0], 'vacuum': [1.0, 1.0, 0, 0], 'glass': [0, 0, 1.0, 0]}
+    for i in range(120):
+        words[f'clone{i}'] = [1.0, 0, 0, 0.45 * rng.choice([-1, 1])]
+    model = KeyedVectors(4)
+    model.add_vectors(list(words), np.array(list(words.values()), dtype=np.float32))
+    nodes = [ChatNode('cleanbug', 'c', 'vacuum'), ChatNode('windowfly', 'c', 'glass')]
+    scores = SemanticIndex(nodes, model).scores(['query'])
+    expected = _gensim_soft_cosine([['vacuum'], ['glass']], ['query'], model)
+    assert expected[0] > 0
+    assert scores == pytest.approx(expected, abs=1e-5)
+
+
+def test_semantic_stack_is_imported_lazily(tmp_path):
+    """Test that importing the package and keyword matching do not load numpy or gensim"""
+    code = ("import sys, chatbot; from chatbot.types import ChatNode; "
+            "chatbot.StringMatcher().semantic_match('foo', [ChatNode('x', 'c', 'foo')]); "
+            "print(sorted(m for m in ('numpy', 'gensim') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=pathlib.Path(__file__).parents[1],
+                         env={'PATH': '', 'CHAT_LOG_PATH': str(tmp_path / 'chat_log.jsonl')})
+    assert out.stdout.strip() == "[]"
+
+
+def test_matcher_builds_its_own_index_kind(tmp_path, monkeypatch):
+    """Test that a matcher builds its kind of index in any cache, also one shared with another kind"""
+    from .semantic import CentroidIndex, SemanticIndex
+    monkeypatch.setenv(MODEL_PATH_ENV, _write_model(tmp_path / 'model.w2v.txt'))
+    nodes = _product_nodes()
+    cache = IndexCache()
+    centroid = CentroidMatcher(cache=cache, results=ResultCache(0))
+    string = StringMatcher(cache=cache, results=ResultCache(0))
+    assert centroid.score('my vacuum', nodes) == CentroidMatcher().score('my vacuum', nodes)
+    assert isinstance(cache.get(nodes, centroid._load_model(), factory=centroid.index_factory), CentroidIndex)
+    string.score('my vacuum', nodes)
+    assert isinstance(cache.get(nodes, string._load_model(), factory=string.index_factory), SemanticIndex)
@@ -0,0 +1,173 @@
+import bisect
+import contextlib
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# imports that dominate startup when they happen
+HEAVY_MODULES = ('numpy', 'scipy', 'gensim')
+
+
+class StartupTimer:
+    """Records named startup phases and the heavy modules each one imported."""
+    def __init__(self, start: float = None) -> None:
+        self.start = start if start is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float, List[str]]] = []
+        self._last = self.start
+        self._loaded = set(loaded_heavy_modules())
+
+    def mark(self, phase: str) -> None:
+        """End a phase now; its duration is the time since the previous mark."""
+        now = time.perf_counter()
+        loaded = loaded_heavy_modules()
+        self.phases.append((phase, now - self._last, [m for m in loaded if m not in self._loaded]))
+        self._loaded.update(loaded)
+        self._last = now
+
+    def resume(self) -> None:
+        """Leave out the time since the last mark, e.g. waiting for user input."""
+        self._last = time.perf_counter()
+
+    def total(self) -> float:
+        return sum(seconds for _, seconds, _ in self.phases)
+
+
+def loaded_heavy_modules() -> List[str]:
+    return [m for m in HEAVY_MODULES if m in sys.modules]
+
+
+def import_times(module: str = "chatbot", top: int = 10) -> List[Tuple[float, float, str]]:
+    """Slowest imports of a fresh interpreter importing module (``python -X importtime``).
+
+    Returns (cumulative ms, self ms, module) tuples, slowest first.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, cwd=sys.path[0] or None)
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = [f.strip() for f in line[len('import time:'):].split('|')]
+        if len(fields) == 3 and fields[0].isdigit():
+            times.append((int(fields[1]) / 1000, int(fields[0]) / 1000, fields[2].strip()))
+    return sorted(times, reverse=True)[:top]
+
+
+def format_startup_profile(timer: StartupTimer, imports: List[Tuple[float, float, str]] = ()) -> str:
+    lines = ["=== Startup Profile ==="]
+    for phase, seconds, imported in timer.phases:
+        note = f"  (imported {', '.join(imported)})" if imported else ""
+        lines.append(f" - {phase:<28} {seconds * 1000:9.1f} ms{note}")
+    lines.append(f" - {'total':<28} {timer.total() * 1000:9.1f} ms")
+    if imports:
+        lines.append("Slowest imports (cumulative / self):")
+        for cumulative, own, name in imports:
+            lines.append(f"   {cumulative:9.1f} ms {own:9.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+# --- Per-turn spans ----------------------------------------------------------
+
+# upper bounds (seconds) of the histogram buckets, the last bucket is open
+SPAN_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
+
+
+class SpanCollector:
+    """Receives the duration of every timed phase of a chat turn.
+
+    The base class ignores everything; while the active collector is not
+    ``enabled``, ``span`` does not even read the clock.
+    """
+    enabled = False
+
+    def record(self, phase: str, seconds: float) -> None:
+        pass
+
+
+class HistogramCollector(SpanCollector):
+    """Counts span durations per phase in logarithmic buckets (thread-safe)."""
+    enabled = True
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, List[int]] = {}
+        self.totals: Dict[str, float] = {}
+        self.maxima: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float) -> None:
+        bucket = bisect.bisect_left(SPAN_BUCKETS, seconds)
+        with self._lock:
+            counts = self.counts.get(phase)
+            if counts is None:
+                counts = self.counts[phase] = [0] * (len(SPAN_BUCKETS) + 1)
+                self.totals[phase] = self.maxima[phase] = 0.0
+            counts[bucket] += 1
+            self.totals[phase] += seconds
+            self.maxima[phase] = max(self.maxima[phase], seconds)
+
+    def summary(self) -> Dict[str, dict]:
+        """Calls, total, mean and max seconds and bucket counts per phase, in first-seen order."""
+        with self._lock:
+            return {phase: {'calls': sum(counts), 'total': self.totals[phase],
+                            'mean': self.totals[phase] / sum(counts), 'max': self.maxima[phase],
+                            'buckets': list(counts)}
+                    for phase, counts in self.counts.items()}
+
+
+class _Span:
+    __slots__ = ('phase', 'collector', 'start')
+
+    def __init__(self, phase: str, collector: SpanCollector) -> None:
+        self.phase = phase
+        self.collector = collector
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.collector.record(self.phase, time.perf_counter() - self.start)
+
+
+_NO_SPAN = contextlib.nullcontext()
+_collector: SpanCollector = SpanCollector()
+
+
+def set_collector(collector: SpanCollector = None) -> SpanCollector:
+    """Install the collector for all spans (None restores the no-op); returns the previous one."""
+    global _collector
+    previous = _collector
+    _collector = collector if collector is not None else SpanCollector()
+    return previous
+
+
+def get_collector() -> SpanCollector:
+    return _collector
+
+
+def span(phase: str):
+    """Context manager timing one phase of a turn into the active collector."""
+    collector = _collector
+    if not collector.enabled:
+        return _NO_SPAN
+    return _Span(phase, collector)
+
+
+def _bucket_label(i: int) -> str:
+    def fmt(seconds):
+        return f"{seconds * 1e6:.0f}us" if seconds < 1e-3 else (
+            f"{seconds * 1e3:.0f}ms" if seconds < 1 else f"{seconds:.0f}s")
+    return f"<{fmt(SPAN_BUCKETS[i])}" if i < len(SPAN_BUCKETS) else f">={fmt(SPAN_BUCKETS[-1])}"
+
+
+def format_span_profile(collector: HistogramCollector) -> str:
+    summary = collector.summary()
+    labels = [_bucket_label(i) for i in range(len(SPAN_BUCKETS) + 1)]
+    lines = ["=== Turn Profile ===",
+             f" {'phase':<18} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  "
+             + " ".join(f"{l:>7}" for l in labels)]
+    for phase, s in summary.items():
+        lines.append(f" {phase:<18} {s['calls']:>6} {s['total'] * 1000:>10.2f} {s['mean'] * 1000:>9.3f} "
+                     f"{s['max'] * 1000:>9.2f}  " + " ".join(f"{c:>7}" for c in s['buckets']))
+    return "\n".join(lines)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors
+
+from .chat import Chat
+from . import profiling
+from .matchers import IndexCache, StringMatcher
+from .profiling import *
+from .repliers import GraphReplier
+from .types import ChatNode
+
+
+@pytest.fixture
+def collector():
+    collector = HistogramCollector()
+    set_collector(collector)
+    yield collector
+    set_collector(None)
+
+
+def _chat():
+    model = KeyedVectors(2)
+    model.add_vectors(['cleanbug', 'vacuum', 'windowfly', 'glass'],
+                      np.array([[1.0, 0.1], [0.9, 0.2], [0.1, 1.0], [0.2, 0.9]], dtype=np.float32))
+    start = ChatNode('start', 'o', 'Worum geht es?')
+    start.children = [ChatNode('cleanbug', 'c', 'cleanbug'), ChatNode('windowfly', 'c', 'windowfly')]
+    return Chat(GraphReplier(start), StringMatcher(cache=IndexCache(), model=model))
+
+
+def test_spans_are_not_recorded_by_default(monkeypatch):
+    """Test that the default collector neither times nor records spans"""
+    default = get_collector()
+    assert not default.enabled
+    recorded = []
+    monkeypatch.setattr(default, 'record', lambda phase, seconds: recorded.append(phase))
+    monkeypatch.setattr(profiling, '_Span', lambda *args: pytest.fail('span was timed'))
+    with span('match'):
+        pass
+    assert recorded == []
+
+
+def test_turn_phases_are_recorded(collector, tmp_path, monkeypatch):
+    """Test that a semantic turn reports its matching, index, reply and logging phases"""
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'chat_log.jsonl'))
+    chat = _chat()
+    chat.reply(chat.START)
+    chat.reply('my vacuum')
+    summary = collector.summary()
+    for phase in ('match', 'exact_match', 'model_load', 'index', 'dictionary',
+                  'similarity_matrix', 'scoring', 'reply', 'log'):
+        assert summary[phase]['calls'] >= 1, phase
+    assert summary['similarity_matrix']['calls'] == 1
+    assert sum(summary['match']['buckets']) == summary['match']['calls']
+    assert summary['match']['total'] >= summary['scoring']['total']
+    report = format_span_profile(collector)
+    assert 'similarity_matrix' in report and '>=1s' in report
+
+
+def test_set_collector_returns_previous(collector):
+    """Test that installing a collector hands back the active one"""
+    assert set_collector(None) is collector
+    assert not get_collector().enabled
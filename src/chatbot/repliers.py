@@ -1,6 +1,8 @@
 from abc import abstractmethod
+from typing import Union
 
 from .types import *
+from .graph import CompiledGraph
 
 class Replier:
     """
@@ -16,6 +18,10 @@ class Replier:
     def get_start(self) -> list[ChatNode]:
         return []
 
+    def current(self, nodes: list[ChatNode]) -> list[ChatNode]:
+        """The nodes a session waits at, as of the replier's current graph."""
+        return nodes
+
 class HiReplier(Replier):
     def __init__(self) -> None:
         self.res = ChatNode("hi", "o", "Hi!")
@@ -29,12 +35,32 @@ class HiReplier(Replier):
         return [ChatNode("start", "o", "Hi!")]
 
 class GraphReplier(Replier):
-    def __init__(self, graph: ChatNode) -> None:
+    """Replies with the children of the matched node, either of a ChatNode graph or a CompiledGraph.
+
+    A CompiledGraph can be replaced while sessions run (see GraphWatcher):
+    nodes of the previous graph are looked up by name in the new one.
+    """
+    def __init__(self, graph: Union[ChatNode, CompiledGraph]) -> None:
         self.graph = graph
 
     def reply(self, request: ChatNode) -> list[ChatNode]:
+        graph = self.graph
+        if isinstance(graph, CompiledGraph):
+            if request.graph is not graph:
+                id = graph.ids.get(request.name)
+                return graph.children(id) if id is not None else []
+            return graph.children(request.id)
         return request.children
 
+    def current(self, nodes: list[ChatNode]) -> list[ChatNode]:
+        # the choices the user was shown stay, with their new content; deleted ones are dropped
+        graph = self.graph
+        if not isinstance(graph, CompiledGraph) or not nodes or nodes[0].graph is graph:
+            return nodes
+        return [graph[n.name] for n in nodes if n.name in graph.ids]
+
     def get_start(self) -> list[ChatNode]:
         # Return the defined 'start' node directly; no artificial wrapper needed since graph includes its own root
+        if isinstance(self.graph, CompiledGraph):
+            return [self.graph.node(self.graph.root)]
         return [self.graph]
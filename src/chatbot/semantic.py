@@ -0,0 +1,372 @@
+import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+from gensim.matutils import corpus2csc
+from gensim.models import KeyedVectors, TfidfModel
+from gensim.models.tfidfmodel import df2idf
+from gensim.utils import SaveLoad
+from gensim.corpora import Dictionary
+from gensim.similarities import SparseTermSimilarityMatrix, TermSimilarityIndex, WordEmbeddingSimilarityIndex
+
+from .types import ChatNode
+from .matchers import NATIVE_MODEL_SUFFIX
+from .tokens import node_tokens
+from .profiling import span
+
+# Everything that needs numpy and gensim. Imported by matchers on the first
+# semantic match, so runs that never need one start without them.
+
+# number of embedding neighbours considered per term (gensim's default)
+_NONZERO_LIMIT = 100
+
+# suppress divide-by-zero warnings from gensim term similarity
+warnings.filterwarnings(
+    'ignore',
+    category=RuntimeWarning,
+    module='gensim.similarities.termsim'
+)
+
+def load_model(path: str) -> KeyedVectors:
+    """Load embeddings from a native ``.kv`` file (memory-mapped read-only) or word2vec text."""
+    if path.endswith(NATIVE_MODEL_SUFFIX):
+        return KeyedVectors.load(path, mmap='r')
+    return KeyedVectors.load_word2vec_format(path, binary=False)
+
+
+def _query_idf(docfreq: int, totaldocs: int) -> float:
+    """IDF that counts the request as one extra document of the corpus."""
+    return df2idf(docfreq, totaldocs + 1)
+
+
+class GraphTermSimilarity(SaveLoad):
+    """Term similarity matrix over the vocabulary of a whole conversation graph.
+
+    Built ahead of time by ``build_termsim.py`` so that candidate indexes
+    only slice it instead of searching embedding neighbours per term.
+    """
+    def __init__(self, dictionary: Dictionary, matrix: SparseTermSimilarityMatrix, model_name: str):
+        self.dictionary = dictionary
+        self.matrix = matrix
+        self.model_name = model_name
+
+    def covers(self, terms: List[str]) -> bool:
+        return all(t in self.dictionary.token2id for t in terms)
+
+    def submatrix(self, terms: List[str]) -> SparseTermSimilarityMatrix:
+        """Similarity matrix restricted to the given terms, in that order."""
+        ids = [self.dictionary.token2id[t] for t in terms]
+        return SparseTermSimilarityMatrix(self.matrix.matrix[ids][:, ids])
+
+    def neighbours(self, term: str) -> list:
+        """(term, similarity) pairs stored for a graph term, excluding itself."""
+        term_id = self.dictionary.token2id[term]
+        column = self.matrix.matrix.getcol(term_id)
+        return [(self.dictionary[i], float(sim))
+                for i, sim in zip(column.indices, column.data) if i != term_id]
+
+
+class NeighbourTable(SaveLoad):
+    """Nearest embedding neighbours of a model's words, built offline.
+
+    Row ``row_of[i]`` holds the ``k`` words most similar to word ``i`` of
+    the model (itself excluded), best first: their indices as int32 and
+    cosines as float16. Built by ``build_neighbours.py`` for all words or
+    a subset; ``row_of`` is -1 for words without a row. Loaded
+    memory-mapped, so a lookup replaces a search of the whole vocabulary.
+    """
+    def __init__(self, indices: np.ndarray, similarities: np.ndarray, row_of: np.ndarray, model_name: str):
+        self.indices = indices
+        self.similarities = similarities
+        self.row_of = row_of
+        self.model_name = model_name
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def fits(self, model: KeyedVectors) -> bool:
+        """Whether the table was built for a model of this vocabulary size."""
+        return len(self.row_of) == len(model)
+
+    def row(self, index: int) -> int:
+        return int(self.row_of[index])
+
+    def save(self, path: str) -> None:
+        super().save(path, separately=['indices', 'similarities', 'row_of'])
+
+    @classmethod
+    def load(cls, path: str) -> "NeighbourTable":
+        return super().load(path, mmap='r')
+
+
+def build_neighbour_table(model: KeyedVectors, model_name: str, k: int = _NONZERO_LIMIT,
+                          words: Optional[Iterable[str]] = None, batch: int = 64, workers: int = 1,
+                          progress: Optional[Callable[[int, int], None]] = None) -> NeighbourTable:
+    """Exact top-``k`` cosine neighbours of ``words`` (default: all) among all words of the model.
+
+    Rows are searched ``batch`` at a time on ``workers`` threads (numpy
+    releases the GIL); each batch holds ``batch x len(model)`` floats.
+    ``progress(done, total)`` is called after every batch.
+    """
+    vectors = model.get_normed_vectors()
+    if words is None:
+        rows = np.arange(len(model))
+    else:
+        rows = np.array(sorted({model.key_to_index[w] for w in words if w in model.key_to_index}), dtype=np.int64)
+    k = min(k, len(model) - 1)
+    indices = np.empty((len(rows), k), dtype=np.int32)
+    similarities = np.empty((len(rows), k), dtype=np.float16)
+
+    def search(start):
+        ids = rows[start:start + batch]
+        dists = vectors[ids] @ vectors.T
+        dists[np.arange(len(ids)), ids] = -np.inf
+        top = np.argpartition(dists, -k, axis=1)[:, -k:]
+        top_sims = np.take_along_axis(dists, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind='stable')
+        indices[start:start + len(ids)] = np.take_along_axis(top, order, axis=1)
+        similarities[start:start + len(ids)] = np.take_along_axis(top_sims, order, axis=1)
+        return len(ids)
+
+    done = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for n in pool.map(search, range(0, len(rows), batch)):
+            done += n
+            if progress is not None:
+                progress(done, len(rows))
+    row_of = np.full(len(model), -1, dtype=np.int32)
+    row_of[rows] = np.arange(len(rows), dtype=np.int32)
+    return NeighbourTable(indices, similarities, row_of, model_name)
+
+
+class NeighbourSimilarityIndex(TermSimilarityIndex):
+    """``WordEmbeddingSimilarityIndex`` answering from a neighbour table.
+
+    Same similarities (cosine above ``threshold``, to the power of
+    ``exponent``) read from the table, at most ``table.k`` per term. Words
+    without a row are searched in the model.
+    """
+    def __init__(self, table: NeighbourTable, model: KeyedVectors, threshold: float = 0.0, exponent: float = 2.0):
+        self.table = table
+        self.model = model
+        self.threshold = threshold
+        self.exponent = exponent
+        self.fallback = WordEmbeddingSimilarityIndex(model, threshold, exponent)
+        super().__init__()
+
+    def most_similar(self, t1, topn=10):
+        index = self.model.key_to_index.get(t1)
+        row = self.table.row(index) if index is not None else -1
+        if row < 0:
+            yield from self.fallback.most_similar(t1, topn)
+            return
+        keys = self.model.index_to_key
+        for j, similarity in zip(self.table.indices[row, :topn].tolist(),
+                                 self.table.similarities[row, :topn].tolist()):
+            if similarity > self.threshold:
+                yield keys[j], similarity ** self.exponent
+
+
+def build_term_similarity(texts: List[str], model: KeyedVectors, model_name: str) -> GraphTermSimilarity:
+    """Build the term similarity matrix for the keywords of all given node contents."""
+    corpus = [list(node_tokens(t)) for t in texts]
+    dictionary = Dictionary(corpus)
+    if not len(dictionary):
+        raise ValueError("Node contents yield an empty vocabulary")
+    tfidf = TfidfModel(dictionary=dictionary, wglobal=_query_idf)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrix = SparseTermSimilarityMatrix(
+            WordEmbeddingSimilarityIndex(model), dictionary, tfidf, nonzero_limit=_NONZERO_LIMIT)
+    return GraphTermSimilarity(dictionary, matrix, model_name)
+
+
+class _RecordingIndex(TermSimilarityIndex):
+    """Term similarity index keeping the neighbours found while a matrix is built."""
+    def __init__(self, index: TermSimilarityIndex):
+        self.index = index
+        self.found = {}
+        super().__init__()
+
+    def most_similar(self, t1, topn=10):
+        found = self.found[t1] = list(self.index.most_similar(t1, topn))
+        return iter(found)
+
+
+class SemanticIndex:
+    """Soft-cosine structures for one candidate node set.
+
+    The dictionary, term frequencies and term similarity matrix only cover
+    the vocabulary of the candidates, so they are built once and reused for
+    every request. Scores equal those of gensim's SoftCosineSimilarity over
+    a dictionary and TF-IDF model built for the candidates and the request
+    (up to which neighbours fall under its limit of 100 per term): the
+    request counts as one more document, so the document weights of its
+    terms are corrected per request. Request terms outside the vocabulary
+    are related to it through embedding neighbours, in either direction, as
+    the term similarity matrix relates its own terms. With a precomputed graph-wide matrix both
+    steps become lookups into that matrix; with a neighbour table,
+    neighbours are read from it instead of searched.
+    """
+    def __init__(self, nodes: List[ChatNode], model: KeyedVectors,
+                 termsim: Optional[GraphTermSimilarity] = None, neighbours: Optional[NeighbourTable] = None):
+        self.model = model
+        self.termsim = termsim
+        self.neighbours = neighbours
+        self.nodes = [n for n in nodes if n.type != 'o']
+        # unknown terms that vocabulary terms list among their neighbours
+        self._reverse = None
+        with span('dictionary'):
+            corpus = [list(n.tokens) for n in self.nodes]
+            self.dictionary = Dictionary(corpus)
+            if neighbours is not None:
+                self.term_index = NeighbourSimilarityIndex(neighbours, model)
+            else:
+                self.term_index = WordEmbeddingSimilarityIndex(model)
+            self.matrix = None
+            if not len(self.dictionary):
+                return
+            self.tfidf = TfidfModel(dictionary=self.dictionary, wglobal=_query_idf)
+            counts = [self.dictionary.doc2bow(c) for c in corpus]
+            terms = [self.dictionary[i] for i in range(len(self.dictionary))]
+        with span('similarity_matrix'):
+            if termsim is not None and termsim.covers(terms):
+                self.matrix = termsim.submatrix(terms)
+            else:
+                # no (or a stale) precomputed matrix: search neighbours per term
+                recording = _RecordingIndex(self.term_index)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    self.matrix = SparseTermSimilarityMatrix(recording, self.dictionary, self.tfidf)
+                self._reverse = self._reverse_neighbours(recording.found)
+        num_docs = self.dictionary.num_docs
+        self._tf = corpus2csc(counts, num_terms=len(terms), num_docs=num_docs).tocsr()
+        self._df = np.array([self.dictionary.dfs[i] for i in range(len(terms))], dtype=float)
+        # document weights of terms the request does not share
+        self._idf = _query_idf(self._df, num_docs)
+
+    def scores(self, tokens: List[str]) -> Optional[np.ndarray]:
+        """Soft-cosine score of the request tokens against every candidate.
+
+        Returns None if no candidate has a usable TF-IDF vector.
+        """
+        scores = self.scores_many([tokens])
+        return None if scores is None else scores[0]
+
+    def scores_many(self, queries: List[List[str]]) -> Optional[np.ndarray]:
+        """Soft-cosine scores of many token lists at once, one row per query.
+
+        Like gensim's SoftCosineSimilarity, the candidates are normalized
+        over the terms related to the request only.
+        """
+        if self.matrix is None or not self._tf.nnz:
+            return None
+        sim = self.matrix.matrix
+        vocab = self.dictionary.token2id
+        num_docs = self.dictionary.num_docs
+        scores = np.zeros((len(queries), len(self.nodes)))
+        # neighbours of unknown terms are looked up once per batch
+        neighbours = {}
+        for q, tokens in enumerate(queries):
+            query = np.zeros(len(vocab))
+            doc_idf = self._idf.copy()
+            oov_terms, oov_weights = [], []
+            for term, tf in Counter(tokens).items():
+                term_id = vocab.get(term)
+                if term_id is not None:
+                    # the request is a document too: shared terms weigh less in the candidates
+                    query[term_id] = doc_idf[term_id] = _query_idf(self._df[term_id] + 1, num_docs)
+                    query[term_id] *= tf
+                else:
+                    oov_terms.append(term)
+                    oov_weights.append(tf * _query_idf(1, num_docs))
+            # similarities of unknown terms to the vocabulary and to each other
+            expanded = np.zeros(len(vocab))
+            oov_sim = np.eye(len(oov_terms))
+            oov_pos = {t: i for i, t in enumerate(oov_terms)}
+            for i, term in enumerate(oov_terms):
+                if term not in neighbours:
+                    neighbours[term] = self._neighbours(term)
+                related = {}
+                for other, similarity in neighbours[term]:
+                    if other in vocab:
+                        related[vocab[other]] = similarity
+                    elif other in oov_pos:
+                        j = oov_pos[other]
+                        oov_sim[i, j] = oov_sim[j, i] = max(oov_sim[i, j], similarity)
+                for term_id, similarity in self._reverse_of(term):
+                    related.setdefault(term_id, similarity)
+                for term_id, similarity in related.items():
+                    expanded[term_id] += oov_weights[i] * similarity
+            oov_weights = np.asarray(oov_weights)
+            # x^T S restricted to the vocabulary, and the terms it reaches
+            reach = sim.dot(query) + expanded
+            terms = np.flatnonzero(reach)
+            norm_sq = query @ reach + expanded @ query + oov_weights @ oov_sim @ oov_weights
+            if not terms.size or norm_sq <= 0:
+                continue
+            docs = self._tf[terms].toarray() * doc_idf[terms][:, None]
+            doc_norms_sq = np.einsum('ij,ij->j', docs, sim[terms][:, terms] @ docs)
+            cols = doc_norms_sq > 0
+            scores[q, cols] = (reach[terms] @ docs[:, cols]) / np.sqrt(norm_sq * doc_norms_sq[cols])
+        return np.clip(scores, -1.0, 1.0)
+
+    def _neighbours(self, term: str) -> list:
+        if self.termsim is not None and term in self.termsim.dictionary.token2id:
+            return self.termsim.neighbours(term)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return list(self.term_index.most_similar(term, topn=_NONZERO_LIMIT))
+
+    def _reverse_of(self, term: str) -> list:
+        """(vocabulary id, similarity) of the vocabulary terms that list ``term`` as a neighbour."""
+        if self.termsim is not None and term in self.termsim.dictionary.token2id:
+            # columns of the precomputed matrix are symmetric already
+            return []
+        if self._reverse is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._reverse = self._reverse_neighbours({
+                    t: list(self.term_index.most_similar(t, topn=_NONZERO_LIMIT)) for t in self.dictionary.token2id})
+        return self._reverse.get(term, [])
+
+    def _reverse_neighbours(self, found: dict) -> dict:
+        vocab = self.dictionary.token2id
+        reverse = {}
+        for term, pairs in found.items():
+            for other, similarity in pairs:
+                if other not in vocab:
+                    reverse.setdefault(other, []).append((vocab[term], similarity))
+        return reverse
+
+
+class CentroidIndex:
+    """Normalized mean embedding of every candidate node, stacked into one matrix."""
+    def __init__(self, nodes: List[ChatNode], model: KeyedVectors,
+                 termsim: Optional[GraphTermSimilarity] = None, neighbours: Optional[NeighbourTable] = None):
+        self.model = model
+        self.termsim = termsim
+        self.neighbours = neighbours
+        self.nodes = [n for n in nodes if n.type != 'o']
+        self.centroids = np.zeros((len(self.nodes), model.vector_size), dtype=np.float32)
+        for i, n in enumerate(self.nodes):
+            self.centroids[i] = self._centroid(n.tokens)
+
+    def _centroid(self, tokens: List[str]) -> np.ndarray:
+        known = [t for t in tokens if t in self.model.key_to_index]
+        if not known:
+            return np.zeros(self.model.vector_size, dtype=np.float32)
+        mean = np.mean([self.model.get_vector(t, norm=True) for t in known], axis=0)
+        norm = np.linalg.norm(mean)
+        return mean / norm if norm else mean
+
+    def scores(self, tokens: List[str]) -> Optional[np.ndarray]:
+        """Cosine of the request centroid with every node centroid."""
+        if not self.nodes:
+            return None
+        return self.centroids @ self._centroid(tokens)
+
+    def scores_many(self, queries: List[List[str]]) -> Optional[np.ndarray]:
+        """Cosines of many requests at once, one row per query."""
+        if not self.nodes:
+            return None
+        return np.stack([self._centroid(tokens) for tokens in queries]) @ self.centroids.T
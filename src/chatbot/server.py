@@ -0,0 +1,303 @@
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from .chat import Chat, Session
+from .matchers import Matcher
+from .repliers import Replier
+from .types import ChatNode
+
+# Largest request body accepted, user messages are short
+MAX_BODY = 64 * 1024
+
+_REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request",
+            404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class _Conversation:
+    """A Chat with its lock and last-use time; turns of one session never overlap."""
+    def __init__(self, chat: Chat) -> None:
+        self.chat = chat
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class ChatServer:
+    """Serves many concurrent chat sessions over a small JSON-over-HTTP API.
+
+    All sessions share one graph (replier) and one matcher, so the model and
+    its indexes are loaded once. Turns run in a thread pool to keep matching
+    off the event loop; at most ``max_concurrency`` turns run at a time and
+    further ones wait. New sessions beyond ``max_sessions`` are refused with
+    503, sessions idle for ``session_ttl`` seconds are dropped. ``on_turn``
+    gets the nodes each turn passed and ``on_finish`` the ended session,
+    both in the worker thread. A request that fails is answered with 500
+    and the session it failed in is dropped.
+
+    Routes:
+        POST   /sessions        start a session, returns the greeting
+        POST   /sessions/<id>   send {"text": ...}, returns the bot's reply
+        DELETE /sessions/<id>   end a session
+        GET    /status          session and turn counters, model warm-up and graph reload state
+    """
+    def __init__(self, replier: Replier, matcher: Matcher, workers: Optional[int] = None,
+                 max_concurrency: int = 64, max_sessions: int = 10000, session_ttl: float = 1800.0,
+                 on_turn: Optional[Callable[[Session, list[ChatNode]], None]] = None,
+                 on_finish: Optional[Callable[[Session], None]] = None, watcher=None) -> None:
+        self.replier = replier
+        self.matcher = matcher
+        self.watcher = watcher
+        self.max_concurrency = max_concurrency
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.on_turn = on_turn
+        self.on_finish = on_finish
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="chat-turn")
+        self.sessions: dict[str, _Conversation] = {}
+        self.turns = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        """Start listening; port 0 picks a free port (see ``port``)."""
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._reaper = asyncio.create_task(self._reap())
+        return self._server
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    # --- API -------------------------------------------------------------
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Optional[dict]]:
+        """Route one request, returning (status, JSON payload)."""
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        if parts == ['status']:
+            if method != 'GET':
+                return 405, {'error': "use GET"}
+            return 200, self.status()
+        if not parts or parts[0] != 'sessions' or len(parts) > 2:
+            return 404, {'error': f"no route {path}"}
+        if len(parts) == 1:
+            if method != 'POST':
+                return 405, {'error': "use POST"}
+            return await self.create_session()
+        session_id = parts[1]
+        if method == 'DELETE':
+            found = self.sessions.pop(session_id, None)
+            return (204, None) if found else (404, {'error': "unknown session"})
+        if method != 'POST':
+            return 405, {'error': "use POST or DELETE"}
+        try:
+            text = json.loads(body or b'{}').get('text', '')
+        except (ValueError, AttributeError):
+            return 400, {'error': "body must be a JSON object"}
+        if not isinstance(text, str):
+            return 400, {'error': "text must be a string"}
+        return await self.send(session_id, text)
+
+    async def create_session(self) -> Tuple[int, dict]:
+        if len(self.sessions) >= self.max_sessions:
+            return 503, {'error': "too many sessions"}
+        chat = Chat(self.replier, self.matcher, reset_log=False)
+        session_id = uuid.uuid4().hex
+        conv = self.sessions[session_id] = _Conversation(chat)
+        greeting = [n.content for n in chat.current_nodes if n.type == 'o']
+        async with conv.lock:
+            try:
+                outputs = await self._turn(chat, chat.START)
+            except Exception:
+                self.sessions.pop(session_id, None)
+                raise
+        return 201, self._response(session_id, chat, greeting + [n.content for n in outputs])
+
+    async def send(self, session_id: str, text: str) -> Tuple[int, dict]:
+        conv = self.sessions.get(session_id)
+        if conv is None:
+            return 404, {'error': "unknown session"}
+        async with conv.lock:
+            conv.last_used = time.monotonic()
+            chat = conv.chat
+            if not chat.current_nodes:
+                return 200, self._response(session_id, chat, [])
+            try:
+                outputs = await self._turn(chat, text)
+            except Exception:
+                # the session may be left half-way through a turn
+                self.sessions.pop(session_id, None)
+                raise
+            if not chat.current_nodes:
+                self.sessions.pop(session_id, None)
+                if self.on_finish is not None:
+                    await self._run(self.on_finish, chat.session)
+        return 200, self._response(session_id, chat, [n.content for n in outputs])
+
+    def status(self) -> dict:
+        status = {'sessions': len(self.sessions), 'turns': self.turns, 'errors': self.errors,
+                  'in_flight': self.in_flight,
+                  'max_concurrency': self.max_concurrency, 'max_sessions': self.max_sessions}
+        background = getattr(self.matcher, 'background', None)
+        if background is not None:
+            status['warm_up'] = background.status()
+        if self.watcher is not None:
+            status['graph'] = self.watcher.status()
+        return status
+
+    async def _turn(self, chat: Chat, request: str) -> list[ChatNode]:
+        outputs = await self._run(self._reply, chat, request)
+        self.turns += 1
+        return outputs
+
+    def _reply(self, chat: Chat, request: str) -> list[ChatNode]:
+        start = len(chat.log)
+        outputs = chat.reply(request)
+        if self.on_turn is not None:
+            self.on_turn(chat.session, chat.log[start:])
+        return outputs
+
+    async def _run(self, fn, *args):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _response(session_id: str, chat: Chat, messages: list[str]) -> dict:
+        nodes = chat.current_nodes
+        return {
+            'session': session_id,
+            'messages': messages,
+            'choices': [n.keywords[0] for n in nodes if n.type == 'c'],
+            'input': any(n.type == 'i' for n in nodes),
+            'done': not nodes,
+        }
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id, conv in list(self.sessions.items()):
+                if conv.last_used < cutoff and not conv.lock.locked():
+                    del self.sessions[session_id]
+
+    # --- HTTP ------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                start_line, headers, body = request
+                try:
+                    method, path, _ = start_line.split(' ', 2)
+                except ValueError:
+                    status, payload = 400, {'error': "malformed request line"}
+                else:
+                    if body is None and content_length(headers) is None:
+                        status, payload = 400, {'error': "malformed Content-Length"}
+                    elif body is None:
+                        status, payload = 413, {'error': "body too large"}
+                    else:
+                        try:
+                            status, payload = await self.dispatch(method.upper(), path, body)
+                        except Exception:
+                            self.errors += 1
+                            status, payload = 500, {'error': "internal error"}
+                # the unread body of a rejected message leaves the stream unusable
+                keep_alive = body is not None and headers.get('connection', '').lower() != 'close'
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Tuple[str, dict, Optional[bytes]]]:
+    """Read one HTTP/1.1 message: (start line, lower-cased headers, body); None at EOF.
+
+    The body is None, and left unread, if it is longer than MAX_BODY or
+    its length is malformed.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    headers = {}
+    while (header := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = header.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = content_length(headers)
+    if length is None or length > MAX_BODY:
+        return line.decode('latin-1').rstrip('\r\n'), headers, None
+    body = await reader.readexactly(length) if length else b''
+    return line.decode('latin-1').rstrip('\r\n'), headers, body
+
+
+def content_length(headers: dict) -> Optional[int]:
+    """Body length declared in the headers (0 if none), None if it is not a number of bytes."""
+    value = headers.get('content-length', '0')
+    if not value.isascii() or not value.isdigit():
+        return None
+    return int(value)
+
+
+def encode_response(status: int, payload: Optional[dict], keep_alive: bool = True) -> bytes:
+    body = json.dumps(payload).encode() if payload is not None else b''
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body
+
+
+class HttpClient:
+    """Minimal keep-alive JSON client for the chat server (tests, load tests)."""
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method: str, path: str, payload: Optional[dict] = None) -> Tuple[int, Optional[dict]]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+        response = await read_message(self._reader)
+        if response is None:
+            raise ConnectionError("server closed the connection")
+        start_line, headers, data = response
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(start_line.split(' ')[1]), json.loads(data) if data else None
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from .matchers import StringMatcher
+from .repliers import GraphReplier
+from .server import MAX_BODY, ChatServer, HttpClient
+from .types import ChatNode
+
+
+@pytest.fixture(autouse=True)
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.delenv('GLOVE_MODEL_PATH', raising=False)
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'chat_log.jsonl'))
+
+
+def _graph():
+    start = ChatNode("start", "o", "Hallo!")
+    private = ChatNode("private", "c", "privat;private")
+    business = ChatNode("business", "c", "geschäftlich;business")
+    ask = ChatNode("ask_email", "o", "Ihre E-Mail?")
+    email = ChatNode("email", "i", "")
+    bye = ChatNode("bye", "o", "Danke!")
+    start.addChild(private)
+    start.addChild(business)
+    private.addChild(ask)
+    business.addChild(ask)
+    ask.addChild(email)
+    email.addChild(bye)
+    return start
+
+
+def _run(server, scenario):
+    async def main():
+        await server.start(port=0)
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_conversation_over_http():
+    """Test that a session walks the graph and reports finished sessions"""
+    finished = []
+    server = ChatServer(GraphReplier(_graph()), StringMatcher(), workers=2,
+                        on_finish=lambda session: finished.append(session))
+
+    async def scenario(port):
+        client = HttpClient('127.0.0.1', port)
+        status, start = await client.request('POST', '/sessions')
+        assert status == 201
+        assert start['messages'] == ["Hallo!"]
+        assert start['choices'] == ["privat", "geschäftlich"]
+        sid = start['session']
+        status, reply = await client.request('POST', f'/sessions/{sid}', {'text': 'business'})
+        assert (status, reply['messages'], reply['input']) == (200, ["Ihre E-Mail?"], True)
+        status, reply = await client.request('POST', f'/sessions/{sid}', {'text': 'a@b.de'})
+        assert (reply['messages'], reply['done']) == (["Danke!"], True)
+        status, _ = await client.request('POST', f'/sessions/{sid}', {'text': 'x'})
+        assert status == 404
+        await client.close()
+
+    _run(server, scenario)
+    assert [finished[0].content(n) for n in finished[0].path if n.type == 'i'] == ['a@b.de']
+
+
+def test_concurrent_sessions_are_independent():
+    """Test that many sessions run concurrently without sharing state"""
+    server = ChatServer(GraphReplier(_graph()), StringMatcher(), workers=4, max_concurrency=2)
+
+    async def one(port, choice):
+        client = HttpClient('127.0.0.1', port)
+        _, start = await client.request('POST', '/sessions')
+        sid = start['session']
+        await client.request('POST', f'/sessions/{sid}', {'text': choice})
+        _, reply = await client.request('POST', f'/sessions/{sid}', {'text': f'{choice}@x.de'})
+        await client.close()
+        return reply['done']
+
+    async def scenario(port):
+        done = await asyncio.gather(*(one(port, c) for c in ['privat', 'business'] * 10))
+        client = HttpClient('127.0.0.1', port)
+        _, status = await client.request('GET', '/status')
+        await client.close()
+        return done, status
+
+    done, status = _run(server, scenario)
+    assert all(done)
+    assert status['sessions'] == 0
+    assert status['turns'] == 60
+
+
+def test_limits_and_errors():
+    """Test the session limit and malformed requests"""
+    server = ChatServer(GraphReplier(_graph()), StringMatcher(), max_sessions=1)
+
+    async def scenario(port):
+        client = HttpClient('127.0.0.1', port)
+        status, start = await client.request('POST', '/sessions')
+        assert status == 201
+        assert (await client.request('POST', '/sessions'))[0] == 503
+        assert (await client.request('POST', f"/sessions/{start['session']}", {'text': 1}))[0] == 400
+        assert (await client.request('GET', '/nowhere'))[0] == 404
+        assert (await client.request('DELETE', f"/sessions/{start['session']}"))[0] == 204
+        assert (await client.request('POST', '/sessions'))[0] == 201
+        await client.close()
+
+    _run(server, scenario)
+
+
+def test_oversized_body_is_rejected():
+    """Test that a body over the limit gets a 413 and the connection is closed"""
+    server = ChatServer(GraphReplier(_graph()), StringMatcher())
+
+    async def scenario(port):
+        client = HttpClient('127.0.0.1', port)
+        status, payload = await client.request('POST', '/sessions', {'text': 'x' * (MAX_BODY + 1)})
+        assert status == 413 and payload == {'error': "body too large"}
+        assert client._writer is None
+        # a new connection is served as usual
+        assert (await client.request('POST', '/sessions'))[0] == 201
+        await client.close()
+
+    _run(server, scenario)
+
+
+def test_failed_turn_is_answered_with_500():
+    """Test that an error during a turn answers 500, drops the session and keeps the connection"""
+    def on_turn(session, nodes):
+        if any(n.name == 'business' for n in nodes):
+            raise RuntimeError("broken hook")
+
+    server = ChatServer(GraphReplier(_graph()), StringMatcher(), on_turn=on_turn)
+
+    async def scenario(port):
+        client = HttpClient('127.0.0.1', port)
+        _, broken = await client.request('POST', '/sessions')
+        _, other = await client.request('POST', '/sessions')
+        status, payload = await client.request('POST', f"/sessions/{broken['session']}", {'text': 'business'})
+        assert (status, payload) == (500, {'error': "internal error"})
+        assert (await client.request('POST', f"/sessions/{broken['session']}", {'text': 'x'}))[0] == 404
+        status, reply = await client.request('POST', f"/sessions/{other['session']}", {'text': 'privat'})
+        assert (status, reply['messages']) == (200, ["Ihre E-Mail?"])
+        _, status = await client.request('GET', '/status')
+        await client.close()
+        return status
+
+    status = _run(server, scenario)
+    assert (status['errors'], status['sessions']) == (1, 1)
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1e3'])
+def test_malformed_content_length_is_rejected(length):
+    """Test that a Content-Length that is not a number of bytes gets a 400"""
+    server = ChatServer(GraphReplier(_graph()), StringMatcher())
+
+    async def scenario(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"POST /sessions HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    response = _run(server, scenario)
+    assert response.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+    assert b"Connection: close" in response and response.endswith(b'{"error": "malformed Content-Length"}')
@@ -0,0 +1,218 @@
+import json
+import struct
+import threading
+import zlib
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+# Layout of a shared model block, every section 64-byte aligned:
+#   header     8-byte length + JSON metadata (sizes and offsets of the sections)
+#   vectors    float32, count x dim
+#   norms      float32, count (precomputed, workers never call fill_norms)
+#   offsets    int64, count + 1, byte offsets of each word in ``words``
+#   words      UTF-8 words, concatenated
+#   table      int32 open-addressing hash table (crc32 of the word), -1 = empty
+_ALIGN = 64
+_EMPTY = -1
+_lock = threading.Lock()
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedKeys(Sequence):
+    """``index_to_key`` of a shared model: words decoded from the block on access."""
+    def __init__(self, offsets: memoryview, words: memoryview) -> None:
+        self._offsets = offsets
+        self._words = words
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return bytes(self._words[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+
+class SharedVocabulary(Mapping):
+    """``key_to_index`` of a shared model: a hash table lookup in the block."""
+    def __init__(self, offsets: memoryview, words: memoryview, table: memoryview) -> None:
+        self._offsets = offsets
+        self._words = words
+        self._table = table
+        self._mask = len(table) - 1
+
+    def _find(self, key: str) -> int:
+        if not isinstance(key, str):
+            return _EMPTY
+        data = key.encode('utf-8')
+        slot = zlib.crc32(data) & self._mask
+        while True:
+            i = self._table[slot]
+            if i == _EMPTY or self._words[self._offsets[i]:self._offsets[i + 1]] == data:
+                return i
+            slot = (slot + 1) & self._mask
+
+    def __getitem__(self, key: str) -> int:
+        i = self._find(key)
+        if i == _EMPTY:
+            raise KeyError(key)
+        return i
+
+    def get(self, key, default=None):
+        i = self._find(key)
+        return default if i == _EMPTY else i
+
+    def __contains__(self, key) -> bool:
+        return self._find(key) != _EMPTY
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        return iter(SharedKeys(self._offsets, self._words))
+
+
+class SharedModel:
+    """Embeddings in one ``multiprocessing.shared_memory`` block.
+
+    A loader process ``publish``es a model once; workers ``attach`` by name
+    and get a KeyedVectors whose vectors, norms and vocabulary are views of
+    the block, so N workers hold the model's memory once. The vocabulary is
+    a hash table instead of a dict; lookups cost about a microsecond. The
+    mapping lives as long as the model does; the creator removes the block
+    with ``unlink``.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self.name = shm.name
+        self.size = shm.size
+        self.owner = owner
+        self._shm = shm
+        (size,) = struct.unpack_from('<Q', shm.buf, 0)
+        self.meta = json.loads(bytes(shm.buf[8:8 + size]))
+        self.model = self._model(shm.buf)
+        _detach(shm)
+
+    @classmethod
+    def publish(cls, model: KeyedVectors, name: Optional[str] = None, source: str = "") -> "SharedModel":
+        """Copy a model into a new shared memory block (``name`` or a random one)."""
+        words = [w.encode('utf-8') for w in model.index_to_key]
+        count, dim = len(words), model.vector_size
+        capacity = 1 << max(4, (2 * count - 1).bit_length())
+        sections = {'vectors': 4 * count * dim, 'norms': 4 * count, 'offsets': 8 * (count + 1),
+                    'words': sum(map(len, words)), 'table': 4 * capacity}
+        meta = {'count': count, 'dim': dim, 'capacity': capacity, 'source': source}
+        header = _aligned(8 + 1024)
+        position = header
+        for section, size in sections.items():
+            meta[section] = position
+            position = _aligned(position + size)
+        encoded = json.dumps(meta).encode()
+        if len(encoded) > header - 8:
+            raise ValueError("source path too long for the shared model header")
+
+        shm = shared_memory.SharedMemory(name, create=True, size=position)
+        try:
+            struct.pack_into('<Q', shm.buf, 0, len(encoded))
+            shm.buf[8:8 + len(encoded)] = encoded
+            vectors = np.ndarray((count, dim), np.float32, shm.buf, meta['vectors'])
+            vectors[:] = model.vectors
+            np.ndarray(count, np.float32, shm.buf, meta['norms'])[:] = np.linalg.norm(vectors, axis=1)
+            offsets = np.ndarray(count + 1, np.int64, shm.buf, meta['offsets'])
+            offsets[0] = 0
+            np.cumsum([len(w) for w in words], out=offsets[1:])
+            shm.buf[meta['words']:meta['words'] + sections['words']] = b''.join(words)
+            table = [_EMPTY] * capacity
+            mask = capacity - 1
+            for i, word in enumerate(words):
+                slot = zlib.crc32(word) & mask
+                while table[slot] != _EMPTY:
+                    slot = (slot + 1) & mask
+                table[slot] = i
+            np.ndarray(capacity, np.int32, shm.buf, meta['table'])[:] = table
+            del vectors, offsets
+        except BaseException:
+            _detach(shm)
+            shm.unlink()
+            raise
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedModel":
+        """Map a published block; the model stays valid until this process exits."""
+        return cls(_open(name), owner=False)
+
+    def _model(self, buf: memoryview) -> KeyedVectors:
+        meta = self.meta
+        count, dim = meta['count'], meta['dim']
+        vectors = np.ndarray((count, dim), np.float32, buf, meta['vectors'])
+        norms = np.ndarray(count, np.float32, buf, meta['norms'])
+        vectors.flags.writeable = False
+        norms.flags.writeable = False
+        end = meta['offsets'] + 8 * (count + 1)
+        offsets = buf[meta['offsets']:end].cast('q')
+        words = buf[meta['words']:meta['words'] + offsets[count]]
+        table = buf[meta['table']:meta['table'] + 4 * meta['capacity']].cast('i')
+        model = KeyedVectors(dim)
+        model.vectors = vectors
+        model.norms = norms
+        model.index_to_key = SharedKeys(offsets, words)
+        model.key_to_index = SharedVocabulary(offsets, words, table)
+        return model
+
+    def close(self) -> None:
+        """Drop the model; the block is unmapped once nothing uses its arrays."""
+        self.model = None
+
+    def unlink(self) -> None:
+        """Remove the block (owner only); attached workers keep their mapping."""
+        self.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedModel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.owner:
+            self.unlink()
+        else:
+            self.close()
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    # Attaching registers the block with this process's resource tracker,
+    # which would unlink it when the worker exits (gh-82300)
+    with _lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+def _detach(shm: shared_memory.SharedMemory) -> None:
+    """Close ``shm`` but leave the mapping to the arrays still viewing it."""
+    try:
+        shm.close()
+    except BufferError:
+        # the arrays keep the mmap alive until they are gone; close the descriptor only
+        shm._mmap = None
+        shm.close()
+
+
+def attach_model(name: str) -> KeyedVectors:
+    """KeyedVectors of a published shared model."""
+    return SharedModel.attach(name).model
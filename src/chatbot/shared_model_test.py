@@ -0,0 +1,79 @@
+import pathlib
+import subprocess
+import sys
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+from .benchmark import fixture_model
+from .matchers import MODEL_PATH_ENV, SHARED_MODEL_ENV, IndexCache, ResultCache, StringMatcher, _get_model
+from .shared_model import *
+from .types import ChatNode
+
+
+def test_attached_model_matches_original():
+    """Test that an attached model has the vocabulary, vectors and neighbours of the original"""
+    model = fixture_model(['cleanbug', 'windowfly', 'gerät', 'staubsauger'], extra_words=500)
+    with SharedModel.publish(model, source='glove.6B.50d.kv') as shared:
+        attached = attach_model(shared.name)
+        assert len(attached) == len(model)
+        assert attached.index_to_key[:4] == model.index_to_key[:4]
+        assert attached.index_to_key[-1] == model.index_to_key[-1]
+        for word in ['cleanbug', 'gerät', model.index_to_key[-1]]:
+            assert attached.key_to_index[word] == model.key_to_index[word]
+            assert np.allclose(attached.get_vector(word, norm=True), model.get_vector(word, norm=True))
+        assert 'unbekannt' not in attached.key_to_index
+        assert attached.key_to_index.get('unbekannt', -1) == -1
+        assert attached.most_similar('cleanbug', topn=10) == model.most_similar('cleanbug', topn=10)
+
+
+def test_matcher_uses_shared_model(tmp_path, monkeypatch):
+    """Test that GLOVE_SHARED_MODEL gives the same matches as the model itself, and keywords once it is gone"""
+    vectors = {'cleanbug': [0.9, 0.1, 0.0], 'vacuum': [1.0, 0.0, 0.1],
+               'windowfly': [0.1, 0.9, 0.0], 'glass': [0.0, 1.0, 0.1]}
+    model = KeyedVectors(3)
+    model.add_vectors(list(vectors), np.array(list(vectors.values()), dtype=np.float32))
+    nodes = [ChatNode('cleanbug', 'c', 'cleanbug'), ChatNode('windowfly', 'c', 'windowfly')]
+    with SharedModel.publish(model) as shared:
+        monkeypatch.setenv(SHARED_MODEL_ENV, shared.name)
+        matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+        assert matcher.semantic_match('my vacuum', nodes).name == 'cleanbug'
+        assert matcher.semantic_match('dirty glass', nodes).name == 'windowfly'
+    monkeypatch.setenv(SHARED_MODEL_ENV, 'no-such-model')
+    assert matcher.semantic_match('dirty glass', nodes, default='cleanbug').name == 'cleanbug'
+
+
+def test_missing_shared_model_falls_back_to_file(tmp_path, monkeypatch):
+    """Test that a missing block is tried once and the model file is loaded instead"""
+    model = fixture_model(['cleanbug', 'windowfly'], extra_words=50)
+    model.save_word2vec_format(str(tmp_path / 'model.w2v.txt'))
+    attached = []
+
+    def attach(cls, name):
+        attached.append(name)
+        raise FileNotFoundError(name)
+
+    monkeypatch.setattr(SharedModel, 'attach', classmethod(attach))
+    monkeypatch.setenv(SHARED_MODEL_ENV, 'missing-model')
+    monkeypatch.setenv(MODEL_PATH_ENV, str(tmp_path / 'model.w2v.txt'))
+    loaded = _get_model()
+    assert loaded is not None and len(loaded) == len(model)
+    nodes = [ChatNode('cleanbug', 'c', 'cleanbug'), ChatNode('windowfly', 'c', 'windowfly')]
+    matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    assert matcher.semantic_match('cleanbug please', nodes).name == 'cleanbug'
+    assert _get_model() is loaded
+    assert attached == ['missing-model']
+
+
+def test_model_outlives_attached_processes():
+    """Test that a worker process attaching and exiting does not remove the block"""
+    model = fixture_model(['cleanbug', 'windowfly'], extra_words=50)
+    with SharedModel.publish(model) as shared:
+        code = ("from chatbot.shared_model import attach_model; "
+                f"print(attach_model({shared.name!r}).most_similar('cleanbug', topn=1)[0][0])")
+        for _ in range(2):
+            out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                 cwd=pathlib.Path(__file__).parents[1])
+            assert out.stdout.strip() == model.most_similar('cleanbug', topn=1)[0][0]
+            assert 'leaked' not in out.stderr
+        assert attach_model(shared.name).most_similar('cleanbug', topn=1) == model.most_similar('cleanbug', topn=1)
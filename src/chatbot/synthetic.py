@@ -0,0 +1,172 @@
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .chat import Chat
+from .graph import CompiledGraph
+from .matchers import Matcher
+from .repliers import GraphReplier
+
+SCHEMA = """
+CREATE TABLE chat_nodes (
+    name VARCHAR(255) PRIMARY KEY NOT NULL,
+    content TEXT,
+    type VARCHAR(1) DEFAULT "o"
+);
+CREATE TABLE chat_edges (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    from_name VARCHAR(255) NOT NULL,
+    to_name VARCHAR(255) NOT NULL
+);
+"""
+
+# Text sent at input nodes
+INPUT_TEXT = "kunde@example.com"
+
+
+def _keyword(n: int) -> str:
+    """n-th keyword: letters only, so the tokenizer keeps it and no keyword contains another."""
+    letters = []
+    while True:
+        n, r = divmod(n, 26)
+        letters.append(chr(ord('a') + r))
+        if n == 0:
+            break
+    return "kw" + "".join(letters) + "x"
+
+
+def generate_graph(path, nodes: int = 1000, branching: int = 3, keywords: int = 3,
+                   cycle_rate: float = 0.05, input_rate: float = 0.05, seed: int = 0) -> dict:
+    """Write a conversation graph of about ``nodes`` nodes to a new database.
+
+    Grows breadth-first from ``start`` like the real graph: every question
+    ('o') offers ``branching`` choices ('c') with ``keywords`` unique
+    keywords each, or with ``input_rate`` asks for free text ('i'). A choice
+    leads to a new question, or with ``cycle_rate`` back to an earlier one.
+    Questions left when the node budget is spent end the conversation.
+    Returns node, edge, choice and cycle counts.
+    """
+    rng = random.Random(seed)
+    rows, edges = [], []
+    questions = []
+    open_questions = deque()
+    stats = {'nodes': 0, 'edges': 0, 'choices': 0, 'inputs': 0, 'cycles': 0}
+
+    def add(name, type, content):
+        rows.append((name, content, type))
+        stats['nodes'] += 1
+        return name
+
+    def question():
+        name = add("start" if not questions else f"frage_{len(questions)}", 'o', f"Frage {len(questions)}?")
+        questions.append(name)
+        open_questions.append(name)
+        return name
+
+    question()
+    while open_questions and nodes - stats['nodes'] >= 2:
+        q = open_questions.popleft()
+        if rng.random() < input_rate:
+            field = add(f"eingabe_{stats['inputs']}", 'i', "")
+            stats['inputs'] += 1
+            edges += [(q, field), (field, question())]
+            continue
+        for _ in range(min(branching, (nodes - stats['nodes']) // 2)):
+            first = stats['choices'] * keywords
+            choice = add(f"wahl_{stats['choices']}", 'c',
+                         ";".join(_keyword(k) for k in range(first, first + keywords)))
+            stats['choices'] += 1
+            if rng.random() < cycle_rate:
+                target = rng.choice(questions)
+                stats['cycles'] += 1
+            else:
+                target = question()
+            edges += [(q, choice), (choice, target)]
+    stats['edges'] = len(edges)
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany("INSERT INTO chat_nodes (name, content, type) VALUES (?, ?, ?)", rows)
+    conn.executemany("INSERT INTO chat_edges (from_name, to_name) VALUES (?, ?)", edges)
+    conn.commit()
+    conn.close()
+    return stats
+
+
+def _skip_outputs(graph: CompiledGraph, nodes: list) -> list:
+    # what Chat.reply does: pass on through bot outputs
+    while nodes and nodes[0].type == 'o':
+        nodes = graph.children(nodes[0].id)
+    return nodes
+
+
+def scripted_walks(graph: CompiledGraph, sessions: int, max_turns: int = 20, seed: int = 0) -> List[List[str]]:
+    """User messages of ``sessions`` random walks from the root.
+
+    Each turn names one keyword of a random choice (or fills in an input);
+    walks end where the graph ends or after ``max_turns`` turns.
+    """
+    rng = random.Random(seed)
+    start = _skip_outputs(graph, [graph.node(graph.root)])
+    scripts = []
+    for _ in range(sessions):
+        script, nodes = [], start
+        while nodes and len(script) < max_turns:
+            choices = [n for n in nodes if n.type == 'c']
+            if choices:
+                node = rng.choice(choices)
+                script.append(rng.choice(node.keywords))
+            else:
+                node = nodes[0]
+                script.append(INPUT_TEXT)
+            nodes = _skip_outputs(graph, graph.children(node.id))
+        scripts.append(script)
+    return scripts
+
+
+def run_sessions(graph: CompiledGraph, matcher: Matcher, scripts: List[List[str]],
+                 workers: int = 8, replier: Optional[GraphReplier] = None) -> dict:
+    """Run every script as its own Chat on ``workers`` threads sharing graph and matcher.
+
+    Returns turn latencies in seconds, wall time and how many sessions went
+    off their script (a matcher picking another node than the walk did).
+    """
+    replier = replier or GraphReplier(graph)
+    latencies = []
+    off_script = 0
+    lock = threading.Lock()
+
+    def session(script):
+        nonlocal off_script
+        chat = Chat(replier, matcher, reset_log=False)
+        own = []
+        start = time.perf_counter()
+        chat.reply(chat.START)
+        own.append(time.perf_counter() - start)
+        for text in script:
+            if not chat.current_nodes:
+                break
+            start = time.perf_counter()
+            chat.reply(text)
+            own.append(time.perf_counter() - start)
+        expected = _follows(chat.log, script)
+        with lock:
+            latencies.extend(own)
+            off_script += not expected
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(session, scripts))
+    return {'sessions': len(scripts), 'turns': len(latencies), 'seconds': time.perf_counter() - start,
+            'latencies': latencies, 'off_script': off_script}
+
+
+def _follows(log: list, script: List[str]) -> bool:
+    """True if every chosen node of the session carries the keyword its script sent."""
+    picked = [n for n in log if n.type != 'o']
+    return all(text == INPUT_TEXT if n.type == 'i' else text in n.keywords
+               for n, text in zip(picked, script))
@@ -0,0 +1,41 @@
+import sqlite3
+
+from .graph import load_graph
+from .matchers import StringMatcher
+from .synthetic import *
+
+
+def test_generate_graph_has_requested_shape(tmp_path):
+    """Test node budget, keywords per choice and cycles of a generated graph"""
+    path = tmp_path / 'g.db'
+    stats = generate_graph(path, nodes=500, branching=4, keywords=2, cycle_rate=0.2, seed=1)
+    graph = load_graph(path, snapshot=False)
+    assert len(graph) == stats['nodes'] <= 500
+    assert stats['cycles'] > 0
+    assert stats['edges'] == sqlite3.connect(path).execute("SELECT COUNT(*) FROM chat_edges").fetchone()[0]
+    choices = [n for n in graph if n.type == 'c']
+    assert len(choices) == stats['choices']
+    assert all(len(n.content.split(';')) == 2 for n in choices)
+    assert max(len(graph.children(graph.ids[n.name])) for n in graph if n.type == 'o') == 4
+
+
+def test_generate_graph_is_deterministic(tmp_path):
+    """Test that the same seed writes the same graph"""
+    generate_graph(tmp_path / 'a.db', nodes=200, seed=3)
+    generate_graph(tmp_path / 'b.db', nodes=200, seed=3)
+    rows = [sqlite3.connect(tmp_path / f).execute("SELECT * FROM chat_edges").fetchall() for f in ('a.db', 'b.db')]
+    assert rows[0] == rows[1]
+
+
+def test_scripted_sessions_follow_their_walks(tmp_path, monkeypatch):
+    """Test that concurrent sessions take the paths their scripts were generated from"""
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'chat_log.jsonl'))
+    path = tmp_path / 'g.db'
+    generate_graph(path, nodes=2000, input_rate=0.2, seed=2)
+    graph = load_graph(path)
+    scripts = scripted_walks(graph, 50, max_turns=8)
+    assert any(INPUT_TEXT in s for s in scripts)
+    result = run_sessions(graph, StringMatcher(), scripts, workers=4)
+    assert result['sessions'] == 50
+    assert result['off_script'] == 0
+    assert result['turns'] == sum(len(s) + 1 for s in scripts)
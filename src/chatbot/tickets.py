@@ -0,0 +1,151 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class TicketStore:
+    """Ticket table access with group commits and pooled read connections.
+
+    The database runs in WAL mode, so readers never block the writer. One
+    writer thread inserts tickets: it takes up to ``batch_size`` queued
+    tickets, waiting at most ``max_delay`` seconds after the first one for
+    more, and commits them in a single transaction. With the default of no
+    delay, tickets arriving during a commit make up the next batch. If a
+    batch fails, its tickets are inserted one by one, so only the failing
+    ones report the error. ``open_ticket`` returns once the ticket is
+    committed, so nothing is lost when the process dies later. Safe to
+    share between threads; processes each open their own store and SQLite
+    serializes their commits (waiting up to ``timeout`` seconds).
+    """
+    _CLOSE = object()
+
+    def __init__(self, db_path, pool_size: int = 4, batch_size: int = 64,
+                 max_delay: float = 0.0, timeout: float = 30.0) -> None:
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.commits = 0
+        self.inserted = 0
+        self._pool: queue.Queue = queue.Queue()
+        for _ in range(max(1, pool_size)):
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._pool.put(conn)
+        self._pending: queue.Queue = queue.Queue()
+        self._closed = False
+        # no ticket is queued after the close marker, so every future gets resolved
+        self._closing = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name="ticket-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL makes NORMAL safe against corruption; a power loss may drop the last commits
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def submit(self, email: str, content: str) -> Future:
+        """Queue a ticket; the future resolves to its id once committed."""
+        future: Future = Future()
+        with self._closing:
+            if self._closed:
+                raise RuntimeError("ticket store is closed")
+            self._pending.put((email, content, future))
+        return future
+
+    def open_ticket(self, email: str, content: str) -> int:
+        """Insert a ticket and return its id after the commit."""
+        return self.submit(email, content).result()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for reads."""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def get_ticket(self, ticket_id: int) -> Optional[dict]:
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        return dict(row) if row else None
+
+    def tickets(self, email: Optional[str] = None) -> List[dict]:
+        with self.connection() as conn:
+            if email is None:
+                rows = conn.execute("SELECT * FROM tickets ORDER BY id").fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM tickets WHERE email = ? ORDER BY id", (email,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def close(self) -> None:
+        """Commit the queued tickets and close all connections."""
+        with self._closing:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending.put(self._CLOSE)
+        self._writer.join()
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def __enter__(self) -> "TicketStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        closing = False
+        while not closing:
+            item = self._pending.get()
+            if item is self._CLOSE:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+            self._commit(conn, batch)
+        # tickets queued while closing are still written
+        rest = []
+        while not self._pending.empty():
+            item = self._pending.get()
+            if item is not self._CLOSE:
+                rest.append(item)
+        if rest:
+            self._commit(conn, rest)
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: list) -> None:
+        try:
+            with conn:
+                ids = [conn.execute("INSERT INTO tickets (email, content) VALUES (?, ?)",
+                                    (email, content)).lastrowid
+                       for email, content, _ in batch]
+        except sqlite3.Error as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # one bad ticket must not fail the others: retry them one by one
+            for item in batch:
+                self._commit(conn, [item])
+            return
+        self.commits += 1
+        self.inserted += len(batch)
+        for (_, _, future), ticket_id in zip(batch, ids):
+            future.set_result(ticket_id)
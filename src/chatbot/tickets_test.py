@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+
+import pytest
+
+from .tickets import TicketStore
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / 'tickets.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status VARCHAR(20) DEFAULT 'open',
+        content TEXT)""")
+    conn.close()
+    return path
+
+
+def test_open_ticket_is_committed(db):
+    """Test that a ticket is visible to other connections once open_ticket returns"""
+    with TicketStore(db) as store:
+        ticket_id = store.open_ticket('a@b.de', 'problem: kaputt')
+        conn = sqlite3.connect(db)
+        assert conn.execute("SELECT email, content, status FROM tickets WHERE id = ?",
+                            (ticket_id,)).fetchone() == ('a@b.de', 'problem: kaputt', 'open')
+        conn.close()
+        assert store.get_ticket(ticket_id)['email'] == 'a@b.de'
+    assert sqlite3.connect(db).execute("PRAGMA journal_mode").fetchone() == ('wal',)
+
+
+def test_concurrent_tickets_are_group_committed(db):
+    """Test that tickets from many threads are all stored, in fewer commits"""
+    store = TicketStore(db, batch_size=32, max_delay=0.05)
+    ids = []
+    lock = threading.Lock()
+
+    def session(n):
+        for i in range(10):
+            ticket_id = store.open_ticket(f'user{n}@x.de', f'ticket {i}')
+            with lock:
+                ids.append(ticket_id)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(ids)) == 160
+    assert len(store.tickets()) == 160
+    assert len(store.tickets('user3@x.de')) == 10
+    assert store.commits < store.inserted == 160
+    store.close()
+
+
+def test_close_writes_queued_tickets(db):
+    """Test that submitted tickets are committed on close"""
+    store = TicketStore(db, max_delay=1.0)
+    futures = [store.submit('a@b.de', str(i)) for i in range(5)]
+    store.close()
+    assert [f.result(timeout=0) for f in futures] == [1, 2, 3, 4, 5]
+    with pytest.raises(RuntimeError):
+        store.submit('a@b.de', 'late')
+
+
+def test_errors_reach_the_caller(tmp_path):
+    """Test that a failing insert raises in open_ticket"""
+    with TicketStore(tmp_path / 'empty.db') as store:
+        with pytest.raises(sqlite3.OperationalError):
+            store.open_ticket('a@b.de', 'x')
+
+
+def test_failing_ticket_does_not_fail_its_batch(db):
+    """Test that only the ticket that cannot be inserted fails when its batch is committed"""
+    store = TicketStore(db, max_delay=1.0)
+    futures = [store.submit('a@b.de', 'eins'), store.submit(None, 'ohne E-Mail'), store.submit('c@d.de', 'drei')]
+    store.close()
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(timeout=0)
+    ids = [futures[0].result(timeout=0), futures[2].result(timeout=0)]
+    assert store.inserted == 2
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT id, content FROM tickets ORDER BY id").fetchall() == [
+        (ids[0], 'eins'), (ids[1], 'drei')]
+    conn.close()
+
+
+def test_submit_racing_close_is_resolved(db):
+    """Test that a ticket submitted while another thread closes the store is still committed"""
+    store = TicketStore(db)
+    put = store._pending.put
+    queuing, go = threading.Event(), threading.Event()
+
+    def slow_put(item, *args, **kwargs):
+        # hold the submit between its closed check and queuing the ticket
+        if item is not TicketStore._CLOSE:
+            queuing.set()
+            go.wait(5)
+        put(item, *args, **kwargs)
+
+    store._pending.put = slow_put
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(store.submit('a@b.de', 'x')))
+    submitter.start()
+    queuing.wait(5)
+    closer = threading.Thread(target=store.close)
+    closer.start()
+    closer.join(0.2)
+    go.set()
+    submitter.join()
+    closer.join()
+    assert futures[0].result(timeout=1) == 1
@@ -0,0 +1,34 @@
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+# words as gensim's simple_preprocess sees them: letters and underscores, no digits
+_WORD = re.compile(r'(?:(?!\d)\w)+')
+_TAG = re.compile(r'<[^<>]+>')
+_URL = re.compile(r'http[s]?://\S+')
+# distinct node contents kept tokenized (ChatNode graphs; compiled graphs store their own)
+NODE_CACHE_SIZE = 65536
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize and clean text.
+
+    Same tokens as gensim.utils.simple_preprocess after replacing markup
+    tags by spaces and links by ``url``, without importing gensim. Text
+    without tags or links is tokenized in one regex pass.
+    """
+    if '<' in text or 'http' in text:
+        text = _URL.sub(' url ', _TAG.sub(' ', text))
+    return [t for t in _WORD.findall(text.lower()) if 2 <= len(t) <= 15 and t[0] != '_']
+
+
+@lru_cache(maxsize=NODE_CACHE_SIZE)
+def node_keywords(content: str) -> Tuple[str, ...]:
+    """The ';'-separated keywords (or choice texts) of a node's content."""
+    return tuple(content.split(';'))
+
+
+@lru_cache(maxsize=NODE_CACHE_SIZE)
+def node_tokens(content: str) -> Tuple[str, ...]:
+    """Tokens of all keywords of a node's content."""
+    return tuple(tokenize(content.replace(';', ' ')))
@@ -0,0 +1,38 @@
+import re
+
+from gensim.utils import simple_preprocess
+
+from .graph import CompiledGraph
+from .tokens import *
+from .types import ChatNode
+
+
+def _reference(text):
+    """The tokenizer as it was: two substitutions, then simple_preprocess."""
+    text = re.sub(r'<[^<>]+>', ' ', text)
+    text = re.sub(r'http[s]?://\S+', ' url ', text)
+    return simple_preprocess(text)
+
+
+def test_tokenize_matches_simple_preprocess():
+    """Test that tokenize gives the tokens of the substitutions plus simple_preprocess"""
+    texts = ["Mein Cleanbug startet nicht!", "ja", "a b c", "Fläche über 100 m2", "_intern wort",
+             "<b>Fett</b> gedruckt", "siehe https://bugland.com/hilfe?x=1 oder HTTP://X", "x<y>z",
+             "sehrsehrsehrlangeswort kurz", "İstanbul ÄÖÜ straße", "http://a<b>c"]
+    for text in texts:
+        assert tokenize(text) == _reference(text), text
+
+
+def test_node_keywords_and_tokens():
+    """Test keywords and tokens of ChatNodes and compiled graph nodes"""
+    node = ChatNode('problem', 'c', 'geht nicht an;startet nicht;kein Strom')
+    assert node.keywords == ('geht nicht an', 'startet nicht', 'kein Strom')
+    assert node.tokens == ('geht', 'nicht', 'an', 'startet', 'nicht', 'kein', 'strom')
+    root = ChatNode('start', 'o', 'Hallo?')
+    root.addChild(node)
+    graph = CompiledGraph.from_nodes(root)
+    view = graph['problem']
+    assert graph._tokens[view.id] is None
+    assert view.keywords == node.keywords and view.tokens == node.tokens
+    # tokenized once, then reused
+    assert view.tokens is graph._tokens[view.id]
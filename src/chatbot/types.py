@@ -1,12 +1,24 @@
-from typing import Self
+from typing import Self, Tuple
+
+from .tokens import node_keywords, node_tokens
 
 class ChatNode:
+    __slots__ = ('name', 'type', 'content', 'children')
+
     def __init__(self, name: str, type: str, content: str) -> None:
         self.name = name
         self.type = type
         self.content = content
         self.children = []
 
+    @property
+    def keywords(self) -> Tuple[str, ...]:
+        return node_keywords(self.content)
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        return node_tokens(self.content)
+
     def addChild(self, child: Self) -> Self:
         self.children.append(child)
         return child
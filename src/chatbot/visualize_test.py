@@ -0,0 +1,127 @@
+import os
+import re
+import sys
+
+import pytest
+
+from .types import ChatNode
+
+# visualize.py is a script next to the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from visualize import ChatVisualizer, dominator_tree, partition, walk  # noqa: E402
+
+
+def _branches(count, length):
+    """A start node with ``count`` chains of ``length`` nodes below it"""
+    start = ChatNode("start", "o", "Hallo!")
+    for b in range(count):
+        parent = start
+        for i in range(length):
+            node = ChatNode(f"b{b}_{i}", "o" if i % 2 else "c", f"Text {b} {i}")
+            parent.addChild(node)
+            parent = node
+    return start
+
+
+def test_walk_handles_deep_chains():
+    """Test that a chain deeper than the recursion limit is walked, dominated and split"""
+    length = sys.getrecursionlimit() * 2
+    root = parent = ChatNode("n0", "o", "0")
+    for i in range(1, length):
+        node = ChatNode(f"n{i}", "o", str(i))
+        parent.addChild(node)
+        parent = node
+    nodes, edges = walk([root])
+    assert len(nodes) == length
+    assert len(edges) == length - 1
+    tree, sizes = dominator_tree(nodes, edges, ["n0"])
+    assert sizes["n0"] == length
+    assert tree["n0"] == ["n1"]
+    parts = partition(tree, sizes, "n0", max_nodes=500)
+    assert sum(len(members) for _, members, _ in parts) == length
+
+
+def test_dominator_tree_of_merging_branches():
+    """Test that a node reached through both choices is dominated by the start node"""
+    start = ChatNode("start", "o", "Hallo!")
+    private = ChatNode("private", "c", "privat")
+    business = ChatNode("business", "c", "business")
+    produkt = ChatNode("produkt", "o", "Welches Produkt?")
+    cleanbug = ChatNode("cleanbug", "c", "Cleanbug")
+    start.addChild(private)
+    start.addChild(business)
+    private.addChild(produkt)
+    business.addChild(produkt)
+    produkt.addChild(cleanbug)
+    nodes, edges = walk([start])
+    tree, sizes = dominator_tree(nodes, edges, ["start"])
+    assert tree[None] == ["start"]
+    assert sorted(tree["start"]) == ["business", "private", "produkt"]
+    assert tree["private"] == tree["business"] == []
+    assert tree["produkt"] == ["cleanbug"]
+    assert sizes == {None: 6, "start": 5, "private": 1, "business": 1, "produkt": 2, "cleanbug": 1}
+
+
+def test_partition_respects_max_nodes():
+    """Test that every part fits max_nodes and every node is in exactly one part"""
+    nodes, edges = walk([_branches(6, 4)])
+    tree, sizes = dominator_tree(nodes, edges, ["start"])
+    parts = partition(tree, sizes, "start", max_nodes=8)
+    assert len(parts) > 1
+    seen = []
+    for heads, members, collapsed in parts:
+        assert len(members) <= 8
+        assert all(head in members for head in heads)
+        seen.extend(members)
+    assert sorted(seen) == sorted(nodes)
+    # every collapsed branch heads a later part
+    later = [head for heads, _, _ in parts[1:] for head in heads]
+    assert sorted(c for _, _, collapsed in parts for c in collapsed) == sorted(later)
+
+
+def test_collapsed_branches_link_to_their_files(monkeypatch):
+    """Test that the folder of a collapsed branch links to the file rendering it"""
+    pytest.importorskip("graphviz")
+    jobs = {}
+
+    def render(self, dot, output_file, force=False):
+        jobs[output_file] = dot.source
+        return True
+
+    monkeypatch.setattr(ChatVisualizer, "_render", render)
+    rendered = ChatVisualizer().visualize(_branches(6, 4), "flow", max_nodes=8)
+    assert len(rendered) == len(jobs) > 1
+    assert "flow" in jobs
+    links = re.findall(r'(\w+) \[label="[^"]*" URL="([^"]+)\.png" shape=folder\]', "".join(jobs.values()))
+    assert links
+    for name, file in links:
+        assert file in jobs
+        # the linked file draws the branch itself, not another folder
+        assert re.search(rf"\b{name} \[label=.*style=filled", jobs[file])
+
+
+def test_render_skips_unchanged_source(tmp_path):
+    """Test that a file is only rendered again when its source changes or it is forced"""
+    graphviz = pytest.importorskip("graphviz")
+    calls = []
+
+    def fake_render(output_file, format, cleanup):
+        calls.append(output_file)
+        with open(f"{output_file}.{format}", "w") as f:
+            f.write("image")
+
+    visualizer = ChatVisualizer()
+    output = str(tmp_path / "flow")
+    dot = graphviz.Digraph()
+    dot.node("start")
+    dot.render = fake_render
+    assert visualizer._render(dot, output)
+    assert not visualizer._render(dot, output)
+    assert len(calls) == 1
+    assert visualizer._render(dot, output, force=True)
+    dot.node("private")
+    assert visualizer._render(dot, output)
+    assert len(calls) == 3
+    os.remove(f"{output}.png")
+    assert visualizer._render(dot, output)
+    assert len(calls) == 4
@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .graph import CompiledGraph, diff_graphs, graph_signature, load_graph
+from .matchers import IndexCache
+from .repliers import GraphReplier
+
+
+class GraphWatcher:
+    """Reloads the conversation graph into a replier when its database changes.
+
+    Polls the graph's signature (the version kept by the database's
+    triggers, see init.sql) every ``interval`` seconds in a background
+    thread. A changed graph is loaded (rewriting its snapshot), compared
+    with the current one and swapped into the replier in one assignment:
+    turns starting afterwards use it, running sessions keep their place
+    (see GraphReplier.current). Only the cached indexes and results of
+    candidate sets that changed are dropped from the ``matchers``; the
+    indexes of their new versions are built before the swap.
+    ``on_reload`` gets every reload's report in the watcher thread.
+    """
+    def __init__(self, db_path, replier: GraphReplier, matchers: List = (), interval: float = 2.0,
+                 root: str = "start", on_reload: Optional[Callable[[dict], None]] = None) -> None:
+        self.db_path = db_path
+        self.replier = replier
+        self.matchers = list(matchers)
+        self.interval = interval
+        self.root = root
+        self.on_reload = on_reload
+        self.reloads = 0
+        self.last: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+        self._signature = graph_signature(db_path)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='graph-watcher', daemon=True)
+
+    def start(self) -> "GraphWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def check(self) -> Optional[dict]:
+        """Reload the graph if the database changed; returns the reload's report or None."""
+        with self._lock:
+            signature = graph_signature(self.db_path)
+            if signature == self._signature:
+                return None
+            start = time.perf_counter()
+            old = self.replier.graph
+            new = load_graph(self.db_path, self.root)
+            diff = diff_graphs(old, new)
+            stale, fresh = _candidate_sets(old, new, diff)
+            dropped = 0
+            for matcher in self.matchers:
+                dropped += matcher.forget(stale)
+                background = getattr(matcher, 'background', None)
+                if fresh and (background is None or background.done()):
+                    matcher.warm_up(fresh)
+            self.replier.graph = new
+            self._signature = signature
+            self.reloads += 1
+            self.last = {'seconds': time.perf_counter() - start, 'nodes': len(new),
+                         'candidate_sets': len(fresh), 'dropped': dropped,
+                         **{kind: len(names) for kind, names in diff.items()}}
+            report = self.last
+        if self.on_reload is not None:
+            self.on_reload(report)
+        return report
+
+    def status(self) -> dict:
+        return {'reloads': self.reloads, 'last': self.last,
+                'error': repr(self.error) if self.error is not None else None}
+
+    def describe(self, report: dict) -> str:
+        return (f"Graph reloaded in {report['seconds'] * 1000:.1f} ms: {report['added']} added, "
+                f"{report['removed']} removed, {report['changed']} changed, {report['rewired']} rewired nodes; "
+                f"{report['candidate_sets']} candidate sets rebuilt, {report['dropped']} cache entries dropped")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+                self.error = None
+            except Exception as e:
+                # e.g. an edit in progress left an edge without its node; keep the graph, retry
+                self.error = e
+
+
+def _candidate_sets(old: CompiledGraph, new: CompiledGraph, diff: dict):
+    """Keys of the old candidate sets (children lists) that changed, and the new sets replacing them."""
+    touched = diff['changed'] | diff['removed']
+    parents = diff['rewired'] | diff['removed']
+    for id in range(len(old)):
+        if any(old.names[t] in touched for t in old.targets[old.offsets[id]:old.offsets[id + 1]]):
+            parents.add(old.names[id])
+    stale = {IndexCache.key(old.children(old.ids[p])) for p in parents}
+    fresh = []
+    for p in parents | diff['added']:
+        if p in new.ids:
+            children = new.children(new.ids[p])
+            if any(n.type != 'o' for n in children):
+                fresh.append(children)
+    return stale - {()}, fresh
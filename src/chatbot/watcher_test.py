@@ -0,0 +1,128 @@
+import pathlib
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from .chat import Chat
+from .evaluation import choice_points
+from .graph import load_graph
+from .matchers import IndexCache, ResultCache, StringMatcher
+from .repliers import GraphReplier
+from .watcher import GraphWatcher
+
+
+@pytest.fixture(autouse=True)
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setenv('CHAT_LOG_PATH', str(tmp_path / 'chat_log.jsonl'))
+
+
+def _bugland(tmp_path):
+    db = tmp_path / 'bugland.db'
+    conn = sqlite3.connect(db)
+    conn.executescript((pathlib.Path(__file__).parents[2] / 'data' / 'init.sql').read_text())
+    conn.close()
+    return db
+
+
+def _edit(db, *statements):
+    conn = sqlite3.connect(db)
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def _index(nodes, model, termsim, neighbours):
+    return SimpleNamespace(nodes=nodes, model=model, termsim=termsim, neighbours=neighbours)
+
+
+def test_reload_keeps_sessions_and_unchanged_indexes(tmp_path, monkeypatch):
+    """Test that an edited flow reaches running and new sessions and only its candidate set is dropped"""
+    monkeypatch.delenv('GLOVE_MODEL_PATH', raising=False)
+    monkeypatch.delenv('GLOVE_SHARED_MODEL', raising=False)
+    db = _bugland(tmp_path)
+    graph = load_graph(db)
+    replier = GraphReplier(graph)
+    cache = IndexCache(factory=_index)
+    points = choice_points({n.name: n for n in graph})
+    for nodes in points:
+        cache.get(nodes, 'model')
+    matcher = StringMatcher(cache=cache, results=ResultCache(0))
+    watcher = GraphWatcher(db, replier, [matcher])
+    assert watcher.check() is None
+
+    running = Chat(replier, matcher, reset_log=False)
+    running.reply(running.START)
+    running.reply("privat")
+    assert 'robosauger' not in [k for n in running.current_nodes for k in n.keywords]
+
+    _edit(db, "UPDATE chat_nodes SET content = 'cleanbug;reinigungsroboter;robosauger' WHERE name = 'cleanbug'",
+          "INSERT INTO chat_nodes (name, content, type) VALUES ('rasenmaeher', 'rasenmäher;mähroboter', 'c')",
+          "INSERT INTO chat_edges (from_name, to_name) VALUES ('produkt', 'rasenmaeher')",
+          "INSERT INTO chat_edges (from_name, to_name) VALUES ('rasenmaeher', 'produkt')")
+    report = watcher.check()
+    assert (report['added'], report['changed'], report['rewired']) == (1, 1, 1)
+    assert replier.graph is not graph
+    # only the product choices changed: every other index is still cached
+    product = IndexCache.key(graph['produkt'].children)
+    assert report['dropped'] == 1 and len(cache) == len(points) - 1
+    assert all(IndexCache.key(nodes) in cache._entries for nodes in points if IndexCache.key(nodes) != product)
+
+    # the running session answers the question it was shown, with the new keywords
+    running.reply("mein robosauger")
+    picked = [n for n in running.log if n.type != 'o'][-1]
+    assert picked.name == 'cleanbug' and picked.graph is replier.graph
+    fresh = Chat(replier, matcher, reset_log=False)
+    fresh.reply(fresh.START)
+    fresh.reply("privat")
+    assert 'rasenmaeher' in [n.name for n in fresh.current_nodes]
+    assert watcher.check() is None
+
+
+def test_session_ends_when_its_choices_are_deleted(tmp_path, monkeypatch):
+    """Test that a session waiting at deleted nodes ends instead of failing"""
+    monkeypatch.delenv('GLOVE_MODEL_PATH', raising=False)
+    monkeypatch.delenv('GLOVE_SHARED_MODEL', raising=False)
+    db = _bugland(tmp_path)
+    replier = GraphReplier(load_graph(db))
+    matcher = StringMatcher(cache=IndexCache(), results=ResultCache(0))
+    watcher = GraphWatcher(db, replier, [matcher])
+    running = Chat(replier, matcher, reset_log=False)
+    running.reply(running.START)
+    running.reply("privat")
+    choices = [n.name for n in running.current_nodes]
+    assert 'cleanbug' in choices
+
+    names = ', '.join(f"'{name}'" for name in choices)
+    _edit(db, f"DELETE FROM chat_edges WHERE from_name IN ({names}) OR to_name IN ({names})",
+          f"DELETE FROM chat_nodes WHERE name IN ({names})")
+    assert watcher.check()['removed'] == len(choices)
+    path = len(running.log)
+    assert running.reply("cleanbug") == []
+    assert running.current_nodes == [] and len(running.log) == path
+    assert running.advance("cleanbug") == []
+
+
+def test_watcher_thread_reloads_and_survives_broken_edits(tmp_path):
+    """Test that the background watcher picks up changes and keeps the graph on a broken one"""
+    db = _bugland(tmp_path)
+    replier = GraphReplier(load_graph(db))
+    reports = []
+    watcher = GraphWatcher(db, replier, interval=0.02, on_reload=reports.append).start()
+    try:
+        _edit(db, "UPDATE chat_nodes SET content = 'Moin!' WHERE name = 'start'")
+        deadline = time.monotonic() + 5
+        while not reports and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert replier.graph['start'].content == 'Moin!'
+        assert 'changed' in watcher.describe(reports[0])
+
+        _edit(db, "INSERT INTO chat_edges (from_name, to_name) VALUES ('start', 'gibt_es_nicht')")
+        while watcher.error is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert watcher.status()['error'] is not None
+        assert replier.graph['start'].content == 'Moin!' and watcher.reloads == 1
+    finally:
+        watcher.stop()
@@ -0,0 +1,42 @@
+import argparse
+import os
+import pathlib
+
+from chatbot.evaluation import choice_points, compare_matchers, format_report, logged_requests
+from chatbot.graph import load_graph
+from chatbot.matchers import CentroidMatcher, StringMatcher
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Compare StringMatcher and CentroidMatcher decisions on logged requests"
+    )
+    parser.add_argument('requests', type=pathlib.Path, nargs='+',
+                        help="Chat logs (.jsonl or .json), or request files (.txt, one per line) "
+                             "scored at every choice point")
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to use")
+    parser.add_argument('--database', type=pathlib.Path,
+                        default=project_root / 'data' / 'bugland.db',
+                        help="Path to the chat graph database")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    os.environ["GLOVE_MODEL_PATH"] = str(glove_file)
+    # creating a matcher clears the chat log, which may be one of the analysed logs
+    os.environ["CHAT_LOG_PATH"] = os.devnull
+
+    graph = load_graph(args.database, snapshot=False)
+    pairs, requests, unplaced = logged_requests(args.requests, graph)
+    if unplaced:
+        print(f"Skipping {unplaced} logged requests whose node is not in the graph any more.")
+    points = choice_points({node.name: node for node in graph})
+    report = compare_matchers(StringMatcher(), CentroidMatcher(), requests, points, pairs)
+    print(format_report(report, names=('string', 'centroid')))
+
+
+if __name__ == '__main__':
+    main()
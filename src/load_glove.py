@@ -5,6 +5,8 @@ import zipfile
 import subprocess
 import sys
 
+from gensim.models import KeyedVectors
+
 # Import tqdm for progress bar (ignore unresolved import if not installed)
 try:
     from tqdm import tqdm  # type: ignore
@@ -45,6 +47,14 @@ def convert_to_word2vec(glove_path, output_path):
     print(f"Saved converted file to {output_path.name}.")
 
 
+def convert_to_native(w2v_path, kv_path):
+    print(f"Converting {w2v_path.name} to native KeyedVectors format...")
+    model = KeyedVectors.load_word2vec_format(str(w2v_path), binary=False)
+    # store the vectors as a separate .npy so they can be memory-mapped
+    model.save(str(kv_path), separately=['vectors'])
+    print(f"Saved native model to {kv_path.name}.")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Download and convert GloVe embeddings"
@@ -89,8 +99,15 @@ def main():
         w2v_file = output_dir / f"glove.{args.version}.{dim}d.w2v.txt"
         if w2v_file.exists():
             print(f"{w2v_file.name} already exists, skipping conversion.")
-            continue
-        convert_to_word2vec(glove_file, w2v_file)
+        else:
+            convert_to_word2vec(glove_file, w2v_file)
+
+        # Convert to native format for fast, memory-mapped loading
+        kv_file = output_dir / f"glove.{args.version}.{dim}d.kv"
+        if kv_file.exists():
+            print(f"{kv_file.name} already exists, skipping conversion.")
+        else:
+            convert_to_native(w2v_file, kv_file)
 
 
 if __name__ == '__main__':
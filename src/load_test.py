@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from chatbot.server import HttpClient
+
+# A solved cleanbug problem without feedback, so no tickets are written
+DEFAULT_SCRIPT = ["privat", "cleanbug", "startet nicht", "ja", "nein"]
+
+
+async def run_session(client: HttpClient, script, latencies, errors) -> None:
+    start = time.perf_counter()
+    status, reply = await client.request('POST', '/sessions')
+    latencies.append(time.perf_counter() - start)
+    if status != 201:
+        errors.append(status)
+        return
+    session_id = reply['session']
+    for text in script:
+        if reply['done']:
+            return
+        start = time.perf_counter()
+        status, reply = await client.request('POST', f'/sessions/{session_id}', {'text': text})
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+            return
+    if not reply['done']:
+        await client.request('DELETE', f'/sessions/{session_id}')
+
+
+async def load_test(host, port, sessions, concurrency, script) -> dict:
+    latencies, errors = [], []
+    todo = iter(range(sessions))
+
+    async def worker():
+        client = HttpClient(host, port)
+        try:
+            for _ in todo:
+                await run_session(client, script, latencies, errors)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ms = np.asarray(latencies) * 1000
+    return {
+        'sessions': sessions,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': float(np.percentile(ms, 50)) if ms.size else None,
+        'p99_ms': float(np.percentile(ms, 99)) if ms.size else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many scripted conversations against serve.py")
+    parser.add_argument('--host', default='127.0.0.1', help="Server address")
+    parser.add_argument('--port', type=int, default=8080, help="Server port")
+    parser.add_argument('--sessions', type=int, default=500, help="Conversations to run in total")
+    parser.add_argument('--concurrency', type=int, default=50, help="Conversations running at the same time")
+    parser.add_argument('--script', nargs='*', default=DEFAULT_SCRIPT,
+                        help="User messages sent in every conversation")
+    args = parser.parse_args()
+
+    result = asyncio.run(load_test(args.host, args.port, args.sessions, args.concurrency, args.script))
+    print(f"{result['sessions']} sessions, {result['requests']} requests, {result['errors']} errors "
+          f"in {result['seconds']:.2f} s")
+    if result['requests']:
+        print(f"{result['rps']:.0f} requests/s, latency p50 {result['p50_ms']:.2f} ms, "
+              f"p99 {result['p99_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
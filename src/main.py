@@ -1,18 +1,29 @@
+import time
+
+# taken before the chatbot imports for --startup-profile
+_START = time.perf_counter()
+
 import argparse
 import os
 import pathlib
-import sqlite3
 
-from chatbot import ChatNode
+from chatbot.graph import load_graph
 from chatbot.debug_mode import set_debug
 from chatbot.repliers import GraphReplier
-from chatbot.matchers import StringMatcher
-from chatbot.chat import Chat
+from chatbot.matchers import CentroidMatcher, StringMatcher, model_name
+from chatbot.chat import Chat, Session
 from chatbot.cli import Cli
 from chatbot.debug_mode import get_semantic_log
+from chatbot.evaluation import choice_points
+from chatbot.tickets import TicketStore
+from chatbot.watcher import GraphWatcher
+from chatbot.profiling import (HistogramCollector, StartupTimer, format_span_profile, format_startup_profile,
+                               import_times, set_collector)
 
 
 def main():
+    timer = StartupTimer(_START)
+    timer.mark("imports")
     # Parse CLI args
     parser = argparse.ArgumentParser(description="Run chatbot with optional debug output")
     parser.add_argument("--debug", action="store_true", help="Enable debug output of path taken")
@@ -23,7 +34,41 @@ def main():
         default=50,
         help="Dimension of GloVe embeddings to load",
     )
+    parser.add_argument(
+        "--matcher",
+        choices=["string", "centroid"],
+        default="string",
+        help="Semantic matcher: soft-cosine (string) or mean-embedding cosine (centroid)",
+    )
+    parser.add_argument(
+        "--pruned",
+        action="store_true",
+        help="Use the GloVe subset written by prune_glove.py (graph vocabulary + frequent words)",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="Print startup phase timings and the slowest imports at exit",
+    )
+    parser.add_argument(
+        "--warm-indexes",
+        action="store_true",
+        help="Also build the matcher indexes of all choices while the model loads in the background",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=2.0,
+        help="Seconds between checks of the database for graph changes, reloaded without a restart (0: off)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time the phases of every turn (matching, index builds, reply, logging) and print a histogram at exit",
+    )
     args = parser.parse_args()
+    if args.profile:
+        set_collector(HistogramCollector())
 
     # Set debug mode
     set_debug(args.debug)
@@ -40,37 +85,55 @@ def main():
 
     # Configure GloVe model path
     project_root = pathlib.Path(__file__).resolve().parents[1]
-    glove_file = project_root / "glove.6B" / f"glove.6B.{args.glove_dim}d.w2v.txt"
+    # Prefer the native format (memory-mapped) over parsing the word2vec text file
+    glove_file = project_root / "glove.6B" / f"glove.6B.{args.glove_dim}d.kv"
+    if args.pruned:
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.pruned.kv")
+    elif not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
     os.environ["GLOVE_MODEL_PATH"] = str(glove_file)
     if args.debug:
         print(f"Using GloVe model: {glove_file.name}")
 
+    # Use the precomputed term similarity matrix if one was built for this model
+    termsim_file = project_root / "data" / f"bugland.{args.glove_dim}d.termsim"
+    if termsim_file.is_file():
+        os.environ["TERM_SIMILARITY_PATH"] = str(termsim_file)
+        if args.debug:
+            print(f"Using term similarity matrix: {termsim_file.name}")
+
+    # Use the precomputed embedding neighbours if they were built for this model
+    neighbours_file = glove_file.with_name(f"{model_name(str(glove_file))}.neighbours")
+    if neighbours_file.is_file():
+        os.environ["NEIGHBOUR_TABLE_PATH"] = str(neighbours_file)
+        if args.debug:
+            print(f"Using neighbour table: {neighbours_file.name}")
+
     # Connect to database
     db_path = project_root / "data" / "bugland.db"
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    def open_ticket(log: list[ChatNode], email: str) -> None:
-        content = "\n".join(f"{n.name}: {n.content}" for n in log if n.type == "i")
-        cursor.execute(
-            "INSERT INTO tickets (content, email) VALUES (?, ?)",
-            (content, email),
-        )
+    tickets = TicketStore(db_path)
 
-    # Load conversation graph
-    cursor.execute("SELECT name, content, type FROM chat_nodes")
-    rows = cursor.fetchall()
-    node_map = {name: ChatNode(name, typ, content) for name, content, typ in rows}
+    def open_ticket(session: Session, email: str) -> int:
+        content = "\n".join(f"{n.name}: {session.content(n)}" for n in session.path if n.type == "i")
+        return tickets.open_ticket(email, content)
 
-    cursor.execute("SELECT from_name, to_name FROM chat_edges")
-    for frm, to in cursor.fetchall():
-        node_map[frm].addChild(node_map[to])
+    # Load the conversation graph in compiled form
+    graph = load_graph(db_path)
+    timer.mark("graph load")
 
     # Initialize chatbot
-    replier = GraphReplier(node_map["start"])
-    matcher = StringMatcher()
+    replier = GraphReplier(graph)
+    matcher = CentroidMatcher() if args.matcher == "centroid" else StringMatcher()
+    # Load the model while the greeting is shown; keyword matching answers until it is ready
+    warm_up = matcher.start_warm_up(choice_points({n.name: n for n in graph}) if args.warm_indexes else ())
     chat = Chat(replier, matcher)
     cli = Cli(chat)
+    # Edits of chat_nodes/chat_edges take effect from the next turn on
+    watcher = None
+    if args.watch_interval > 0:
+        watcher = GraphWatcher(db_path, replier, [matcher], interval=args.watch_interval,
+                               on_reload=(lambda r: print(watcher.describe(r))) if args.debug else None).start()
+    timer.mark("matcher and chat setup")
 
     # Print initial prompt
     for n in chat.current_nodes:
@@ -79,22 +142,33 @@ def main():
 
     # Chat loop
     request = chat.START
+    # startup phases still to time: up to the first question, then answering it
+    phase = "first prompt"
     while (nodes := chat.advance(request)):
+        if phase == "first user turn":
+            timer.mark(phase)
+            phase = None
+        # Open the ticket as soon as the e-mail is known, committed before the chat goes on
+        if chat.log[-1].name == "ticket_eroeffnen_email":
+            open_ticket(chat.session, request)
         if args.debug:
             path = " -> ".join(n.name for n in chat.log)
             print(f"Path taken: {path}")
+            if not warm_up.done():
+                print("Model still loading, matched by keywords")
         if nodes[0].type == "o":
             print(f"Chatbot: {nodes[0].content}")
         else:
+            if phase == "first prompt":
+                timer.mark(phase)
             request = cli.input("You: ")
+            if phase == "first prompt":
+                timer.resume()
+                phase = "first user turn"
 
-    # Handle ticket creation
-    for n in chat.log:
-        if n.name == "ticket_eroeffnen_email":
-            open_ticket(chat.log, n.content)
-
-    conn.commit()
-    conn.close()
+    if watcher is not None:
+        watcher.stop()
+    tickets.close()
 
     # Always print the unified chat log
     from chatbot.debug_mode import get_chat_log
@@ -104,6 +178,15 @@ def main():
         for entry in entries:
             print(entry)
 
+    if args.startup_profile:
+        print()
+        print(format_startup_profile(timer, import_times("chatbot")))
+        print(warm_up.describe())
+
+    if args.profile:
+        print()
+        print(format_span_profile(set_collector(None)))
+
     # Print semantic match usage log (debug only)
     if args.debug:
         sem = get_semantic_log()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import pathlib
+
+from gensim.models import KeyedVectors
+
+from chatbot.evaluation import choice_points, compare_matchers, format_report, logged_requests
+from chatbot.graph import load_graph
+from chatbot.matchers import IndexCache, StringMatcher, load_model, node_vocabulary
+
+
+def prune_model(model, graph_words, top_n):
+    """Keep the vectors of the graph vocabulary plus the top_n most frequent words."""
+    keep = set(model.index_to_key[:top_n])
+    keep.update(w for w in graph_words if w in model.key_to_index)
+    # GloVe files are sorted by frequency; keep that order
+    words = sorted(keep, key=model.key_to_index.get)
+    pruned = KeyedVectors(model.vector_size)
+    pruned.add_vectors(words, model[words])
+    return pruned
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Write a GloVe subset limited to the graph vocabulary and frequent words"
+    )
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to prune")
+    parser.add_argument('--top-n', type=int, default=20000,
+                        help="Number of most frequent words to keep besides the graph vocabulary")
+    parser.add_argument('--database', type=pathlib.Path,
+                        default=project_root / 'data' / 'bugland.db',
+                        help="Path to the chat graph database")
+    parser.add_argument('--requests', type=pathlib.Path, nargs='*', default=[],
+                        help="Chat logs (.jsonl or .json), or request files (.txt, one per line) scored at "
+                             "every choice point, to compare matches on")
+    args = parser.parse_args()
+
+    glove_dir = project_root / 'glove.6B'
+    glove_file = glove_dir / f"glove.6B.{args.glove_dim}d.kv"
+    if not glove_file.is_file():
+        glove_file = glove_dir / f"glove.6B.{args.glove_dim}d.w2v.txt"
+    output = glove_dir / f"glove.6B.{args.glove_dim}d.pruned.kv"
+
+    print(f"Loading graph from {args.database}...")
+    graph = load_graph(args.database, snapshot=False)
+    node_map = {node.name: node for node in graph}
+    graph_words = node_vocabulary([n.content for n in node_map.values()])
+    print(f"Loading GloVe model {glove_file.name}...")
+    full = load_model(str(glove_file))
+
+    pruned = prune_model(full, graph_words, args.top_n)
+    pruned.save(str(output), separately=['vectors'])
+    missing = sum(w not in full.key_to_index for w in graph_words)
+    print(f"Saved {len(pruned)} of {len(full)} words to {output.name} "
+          f"({pruned.vectors.nbytes / 2**20:.1f} MB instead of {full.vectors.nbytes / 2**20:.1f} MB).")
+    print(f"Graph vocabulary: {len(graph_words)} words, {missing} not in GloVe.")
+
+    pairs, requests, unplaced = logged_requests(args.requests, graph)
+    if not pairs and not requests:
+        print("No requests given, skipping match comparison.")
+        return
+    if unplaced:
+        print(f"Skipping {unplaced} logged requests whose node is not in the graph any more.")
+    # creating a matcher clears the chat log, which may be one of the analysed logs
+    os.environ["CHAT_LOG_PATH"] = os.devnull
+    full_matcher = StringMatcher(cache=IndexCache(), model=full)
+    pruned_matcher = StringMatcher(cache=IndexCache(), model=pruned)
+    report = compare_matchers(full_matcher, pruned_matcher, requests, choice_points(node_map), pairs)
+    print(format_report(report, names=('full', 'pruned')))
+
+
+if __name__ == '__main__':
+    main()
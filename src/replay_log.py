@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+
+from chatbot.evaluation import REPLAY_MATCHERS, format_replay, replay_log
+from chatbot.matchers import MIN_SCORE
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Replay the semantic decisions of chat logs through a matcher and compare them")
+    parser.add_argument('logs', type=pathlib.Path, nargs='+', help="Unified chat logs (.jsonl or .json)")
+    parser.add_argument('--matcher', choices=sorted(REPLAY_MATCHERS), default='string',
+                        help="Matcher to replay with")
+    parser.add_argument('--min-score', type=float,
+                        help="Threshold of the replayed matcher (default: the matcher's own)")
+    parser.add_argument('--logged-min-score', type=float, default=MIN_SCORE,
+                        help="Threshold the logs were written with")
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to use")
+    parser.add_argument('--pruned', action='store_true',
+                        help="Use the GloVe subset written by prune_glove.py")
+    parser.add_argument('--shared-model', metavar='NAME',
+                        help="Attach to a model published by share_model.py instead of loading one per worker")
+    parser.add_argument('--database', type=pathlib.Path, default=project_root / 'data' / 'bugland.db',
+                        help="Chat graph the logs were written with")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Matcher processes")
+    parser.add_argument('--output', type=pathlib.Path, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if args.pruned:
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.pruned.kv")
+    elif not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    # inherited by the worker processes
+    os.environ['GLOVE_MODEL_PATH'] = str(glove_file)
+    if args.shared_model:
+        os.environ['GLOVE_SHARED_MODEL'] = args.shared_model
+    # creating a matcher clears the chat log, which may be one of the replayed logs
+    os.environ['CHAT_LOG_PATH'] = os.devnull
+    os.environ['TQDM_DISABLE'] = '1'
+
+    report = replay_log(args.logs, args.database, matcher=args.matcher, min_score=args.min_score,
+                        logged_min_score=args.logged_min_score, workers=args.workers)
+    print(format_replay(report))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import os
+import pathlib
+
+from chatbot.chat import Session
+from chatbot.debug_mode import configure_log_sink, set_memory_log
+from chatbot.evaluation import choice_points
+from chatbot.graph import load_graph
+from chatbot.matchers import CentroidMatcher, StringMatcher, model_name
+from chatbot.repliers import GraphReplier
+from chatbot.server import ChatServer
+from chatbot.tickets import TicketStore
+from chatbot.watcher import GraphWatcher
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(description="Serve many concurrent chat sessions over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on")
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to load")
+    parser.add_argument('--matcher', choices=['string', 'centroid'], default='string',
+                        help="Semantic matcher: soft-cosine (string) or mean-embedding cosine (centroid)")
+    parser.add_argument('--pruned', action='store_true',
+                        help="Use the GloVe subset written by prune_glove.py")
+    parser.add_argument('--shared-model', metavar='NAME',
+                        help="Attach the model published by share_model.py instead of loading it")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Threads running chat turns (default: Python's thread pool default)")
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help="Chat turns running at the same time; further turns wait")
+    parser.add_argument('--max-sessions', type=int, default=10000,
+                        help="Open sessions; new sessions beyond this are refused")
+    parser.add_argument('--watch-interval', type=float, default=2.0,
+                        help="Seconds between checks of the database for graph changes (0: off)")
+    parser.add_argument('--session-ttl', type=float, default=1800.0,
+                        help="Seconds after which idle sessions are dropped")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if args.pruned:
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.pruned.kv")
+    elif not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    os.environ['GLOVE_MODEL_PATH'] = str(glove_file)
+    if args.shared_model:
+        os.environ['GLOVE_SHARED_MODEL'] = args.shared_model
+    termsim_file = project_root / 'data' / f"bugland.{args.glove_dim}d.termsim"
+    if termsim_file.is_file():
+        os.environ['TERM_SIMILARITY_PATH'] = str(termsim_file)
+
+    neighbours_file = glove_file.with_name(f"{model_name(str(glove_file))}.neighbours")
+    if neighbours_file.is_file():
+        os.environ['NEIGHBOUR_TABLE_PATH'] = str(neighbours_file)
+
+    # one log for all sessions, written by a background thread, nothing kept in memory
+    set_memory_log(False)
+    configure_log_sink(background=True)
+
+    db_path = project_root / 'data' / 'bugland.db'
+    graph = load_graph(db_path)
+    matcher = CentroidMatcher() if args.matcher == 'centroid' else StringMatcher()
+    # sessions are served with keyword matching until the model is loaded
+    print(f"Loading GloVe model {glove_file.name} and building indexes in the background...")
+    matcher.start_warm_up(choice_points({n.name: n for n in graph}),
+                          on_done=lambda warm_up: print(warm_up.describe(), flush=True))
+
+    tickets = TicketStore(db_path)
+    replier = GraphReplier(graph)
+    # edited flows reach new turns without a restart; only changed candidate sets are re-indexed
+    watcher = None
+    if args.watch_interval > 0:
+        watcher = GraphWatcher(db_path, replier, [matcher], interval=args.watch_interval,
+                               on_reload=lambda r: print(watcher.describe(r), flush=True)).start()
+
+    def open_ticket(session: Session, passed: list) -> None:
+        # committed while the turn is answered, before the user sees the confirmation
+        for n in passed:
+            if n.name == "ticket_eroeffnen_email":
+                content = "\n".join(f"{i.name}: {session.content(i)}" for i in session.path if i.type == "i")
+                tickets.open_ticket(session.content(n), content)
+
+    server = ChatServer(replier, matcher, workers=args.workers,
+                        max_concurrency=args.max_concurrency, max_sessions=args.max_sessions,
+                        session_ttl=args.session_ttl, on_turn=open_ticket, watcher=watcher)
+
+    async def serve():
+        await server.start(args.host, args.port)
+        print(f"Serving chat sessions on http://{args.host}:{server.port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+            if watcher is not None:
+                watcher.stop()
+            tickets.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
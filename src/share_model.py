@@ -0,0 +1,53 @@
+import argparse
+import pathlib
+import signal
+import sys
+import threading
+import time
+
+from chatbot.semantic import load_model
+from chatbot.shared_model import SharedModel
+
+
+def main():
+    project_root = pathlib.Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser(
+        description="Load a GloVe model once into shared memory for matcher processes to attach")
+    parser.add_argument('--glove-dim', type=int, choices=[50, 100, 200, 300], default=50,
+                        help="Dimension of GloVe embeddings to load")
+    parser.add_argument('--pruned', action='store_true',
+                        help="Use the GloVe subset written by prune_glove.py")
+    parser.add_argument('--name', help="Name of the shared memory block (default: glove-<dim>d)")
+    args = parser.parse_args()
+
+    glove_file = project_root / 'glove.6B' / f"glove.6B.{args.glove_dim}d.kv"
+    if args.pruned:
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.pruned.kv")
+    elif not glove_file.is_file():
+        glove_file = glove_file.with_name(f"glove.6B.{args.glove_dim}d.w2v.txt")
+    if not glove_file.is_file():
+        print(f"Model {glove_file} not found, run load_glove.py first")
+        return 1
+
+    start = time.perf_counter()
+    shared = SharedModel.publish(load_model(str(glove_file)), name=args.name or f"glove-{args.glove_dim}d",
+                                 source=str(glove_file))
+    print(f"Shared {glove_file.name} ({shared.meta['count']} words, {shared.size / 2 ** 20:.1f} MiB) "
+          f"in {time.perf_counter() - start:.1f} s")
+    print(f"Start matcher processes with GLOVE_SHARED_MODEL={shared.name}; Ctrl-C removes the model")
+
+    # the block is removed on Ctrl-C or SIGTERM; running workers keep their mapping
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shared.unlink()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,9 +4,11 @@ Standalone chat visualization script.
 This script generates visualizations of the chatbot conversation flow.
 """
 import os
-import sqlite3
+import re
 import argparse
+import hashlib
 import sys
+from collections import Counter, defaultdict, deque
 
 # Add the src directory to the Python path if needed
 src_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,105 +20,328 @@ docs_dir = os.path.join(src_dir, "..", "docs")
 if docs_dir not in sys.path:
     sys.path.append(docs_dir)
 
-# We'll import ChatNode directly - do this before any chatbot module imports
+# We'll import the graph loader directly - do this before any chatbot module imports
 # to avoid circular dependencies
-from chatbot import ChatNode
+from chatbot.graph import load_graph
+
+
+# Node style per type: bot outputs, user input fields and user choices
+NODE_STYLES = {
+    "o": {"shape": "box", "fillcolor": "lightblue"},
+    "i": {"shape": "parallelogram", "fillcolor": "lightyellow"},
+    "c": {"shape": "oval", "fillcolor": "lightgreen"},
+}
+
+
+def walk(roots):
+    """Nodes reachable from ``roots`` by name, in depth-first order, and their edges.
+
+    Iterative, so deep flows do not hit the recursion limit.
+    """
+    nodes, edges = {}, []
+    for root in roots:
+        if root.name in nodes:
+            continue
+        nodes[root.name] = root
+        stack = [(root.name, iter(root.children))]
+        while stack:
+            name, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            edges.append((name, child.name))
+            if child.name not in nodes:
+                nodes[child.name] = child
+                stack.append((child.name, iter(child.children)))
+    return nodes, edges
+
+
+def dominator_tree(names, edges, roots):
+    """Children of every node in the dominator tree and the size of its subtree.
+
+    A node dominates another if every path from the roots to it passes
+    through it, so its subtree is a branch of the flow that is only entered
+    through it. ``None`` stands above the roots. Uses the iterative
+    algorithm of Cooper, Harvey and Kennedy.
+    """
+    successors = {None: list(roots), **{name: [] for name in names}}
+    predecessors = {name: [] for name in names}
+    for a, b in edges:
+        successors[a].append(b)
+        predecessors[b].append(a)
+    for root in roots:
+        predecessors[root].append(None)
+
+    # postorder of a depth-first walk from above the roots
+    order, seen, stack = [], {None}, [(None, iter(successors[None]))]
+    while stack:
+        name, children = stack[-1]
+        for child in children:
+            if child not in seen:
+                seen.add(child)
+                stack.append((child, iter(successors[child])))
+                break
+        else:
+            order.append(name)
+            stack.pop()
+    position = {name: i for i, name in enumerate(order)}
+
+    idom = {None: None}
+
+    def intersect(a, b):
+        while a != b:
+            while position[a] < position[b]:
+                a = idom[a]
+            while position[b] < position[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for name in reversed(order[:-1]):
+            new = None
+            for p in predecessors[name]:
+                if p in idom:
+                    new = p if new is None else intersect(p, new)
+            if name not in idom or idom[name] != new:
+                idom[name] = new
+                changed = True
+
+    tree = {name: [] for name in order}
+    sizes = dict.fromkeys(order, 1)
+    for name in reversed(order[:-1]):
+        tree[idom[name]].append(name)
+    # a node comes after everything it dominates in postorder
+    for name in order[:-1]:
+        sizes[idom[name]] += sizes[name]
+    return tree, sizes
+
+
+def partition(tree, sizes, head=None, max_nodes=None):
+    """Split the dominator tree below ``head`` into parts of about ``max_nodes`` nodes.
+
+    Returns ``(heads, members, collapsed)`` per part, the part of ``head``
+    first. ``members`` maps every node of the part to its top-level branch
+    (the child of a single head, or the head of a part holding several
+    small branches); ``collapsed`` are the heads of the branches that did
+    not fit, which go to the following parts.
+    """
+    parts, seeds = [], deque([[head]])
+    while seeds:
+        heads = seeds.popleft()
+        members, collapsed, queue = {}, [], deque()
+        for top in heads:
+            members[top] = top if len(heads) > 1 else None
+            queue.extend((child, members[top] or child) for child in tree[top])
+        while queue:
+            name, branch = queue.popleft()
+            if max_nodes is None or len(members) + sizes[name] <= max_nodes:
+                members.update((n, branch) for n in _subtree(tree, name))
+            elif len(members) < max_nodes:
+                members[name] = branch
+                queue.extend((child, branch) for child in tree[name])
+            else:
+                collapsed.append(name)
+        # small branches that did not fit share parts
+        group, total = [], 0
+        for name in collapsed:
+            if group and total + sizes[name] > max_nodes:
+                seeds.append(group)
+                group, total = [], 0
+            group.append(name)
+            total += sizes[name]
+        if group:
+            seeds.append(group)
+        parts.append((heads, members, collapsed))
+    return parts
+
+
+def _subtree(tree, name):
+    stack = [name]
+    while stack:
+        name = stack.pop()
+        yield name
+        stack.extend(reversed(tree[name]))
+
+
+def neighbourhood(edges, focus, depth=2):
+    """Names of the nodes at most ``depth`` edges away from ``focus``, in either direction."""
+    adjacent = defaultdict(set)
+    for a, b in edges:
+        adjacent[a].add(b)
+        adjacent[b].add(a)
+    seen, frontier = {focus}, [focus]
+    for _ in range(depth):
+        frontier = [m for n in frontier for m in adjacent[n] if m not in seen]
+        seen.update(frontier)
+    return seen
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(name))
 
 
 class ChatVisualizer:
-    """Class for visualizing chat graphs"""
+    """Class for visualizing chat graphs
+
+    Every rendered file is stored with the hash of its Graphviz source next
+    to it (``<file>.sha256``); a file whose source did not change is not
+    rendered again. Large graphs can be grouped into clusters per top-level
+    branch, split into files of at most ``max_nodes`` nodes (only the parts
+    that changed are rendered again) or cut down to the neighbourhood of one
+    node.
+    """
     
     def __init__(self, output_format="png"):
         self.output_format = output_format
     
-    def visualize(self, root_node, output_file="chat_flowchart"):
-        """Generate a visual representation of the chat graph."""
+    def visualize(self, root_node, output_file="chat_flowchart", clusters=False, max_nodes=None,
+                  focus=None, depth=2, force=False):
+        """Generate a visual representation of the chat graph.
+
+        ``clusters`` boxes every top-level branch, ``max_nodes`` splits the
+        flow into ``output_file`` and one file per collapsed branch
+        (``<output_file>_<node>``), ``focus`` renders only the nodes up to
+        ``depth`` edges around that node. ``force`` renders unchanged files
+        too. Returns the files rendered.
+        """
         try:
             from graphviz import Digraph
-            
-            # Create a new directed graph
-            dot = Digraph(comment='Chat Flow')
-            
-            # Function to recursively add nodes and edges
-            def add_nodes_and_edges(node, visited=None):
-                if visited is None:
-                    visited = set()
-                    
-                if node.name in visited:
-                    return
-                
-                visited.add(node.name)
-                
-                # Set node style based on type
-                if node.type == "o":
-                    # Output node (bot messages)
-                    dot.node(node.name, f'"{node.content}"', shape='box', style='filled', fillcolor='lightblue')
-                elif node.type == "i":
-                    # Input node (user input fields)
-                    dot.node(node.name, f'"{node.content}"', shape='parallelogram', style='filled', fillcolor='lightyellow')
-                else:  # "c" for choice nodes
-                    # Choice node (user selections)
-                    dot.node(node.name, f'"{node.content}"', shape='oval', style='filled', fillcolor='lightgreen')
-                
-                # Add edges to children
-                for child in node.children:
-                    dot.edge(node.name, child.name)
-                    add_nodes_and_edges(child, visited)
-            
-            # Check if we received a dictionary of nodes or a single root node
-            if isinstance(root_node, dict):
-                # Find the 'start' node as root
-                if 'start' in root_node:
-                    root = root_node['start']
-                    add_nodes_and_edges(root)
-                else:
-                    # Process all nodes in the dictionary to ensure we cover the entire graph
-                    for node in root_node.values():
-                        add_nodes_and_edges(node)
-            else:
-                # Start with the single root node
-                add_nodes_and_edges(root_node)
-            
-            # Render the graph
-            dot.render(output_file, format=self.output_format, cleanup=True)
-            print(f"Flowchart saved as {output_file}.{self.output_format}")
-            
         except ImportError:
             print("Please install graphviz: pip install graphviz")
             print("You may also need to install the system Graphviz package.")
+            return []
+
+        # Check if we received a dictionary of nodes or a single root node
+        if isinstance(root_node, dict):
+            # Start at the 'start' node, otherwise cover every node of the dictionary
+            roots = [root_node['start']] if 'start' in root_node else list(root_node.values())
+        else:
+            roots = [root_node]
+        nodes, edges = walk(roots)
+
+        if focus is not None:
+            if focus not in nodes:
+                print(f"Node {focus} not found in the chat graph")
+                return []
+            members = neighbourhood(edges, focus, depth)
+            dot = self._digraph(Digraph, nodes, edges, dict.fromkeys(members), focus=focus)
+            return self._render_all([(dot, output_file)], force)
+
+        if not clusters and max_nodes is None:
+            dot = self._digraph(Digraph, nodes, edges, dict.fromkeys(nodes))
+            return self._render_all([(dot, output_file)], force)
+
+        root_names = list(dict.fromkeys(root.name for root in roots))
+        tree, sizes = dominator_tree(nodes, edges, root_names)
+        head = root_names[0] if len(root_names) == 1 else None
+        parts = partition(tree, sizes, head, max_nodes)
+        files = {}
+        for i, (heads, _, _) in enumerate(parts):
+            file = output_file if i == 0 else f"{output_file}_{_slug(heads[0])}"
+            files.update(dict.fromkeys(heads, file))
+        jobs = []
+        for heads, members, collapsed in parts:
+            members.pop(None, None)
+            boxes = {name: (sizes[name], os.path.basename(files[name])) for name in collapsed}
+            dot = self._digraph(Digraph, nodes, edges, members, clusters=clusters, boxes=boxes)
+            jobs.append((dot, files[heads[0]]))
+        return self._render_all(jobs, force)
+
+    def _digraph(self, Digraph, nodes, edges, members, clusters=False, boxes=None, focus=None):
+        """Graph of ``members`` (name -> branch) with their edges.
+
+        Edges leaving the members end at ``boxes`` (collapsed branches linking
+        to their own file) or at dashed stubs; in the neighbourhood of
+        ``focus`` they are left out and their members get a double border.
+        """
+        boxes = boxes or {}
+        dot = Digraph(comment='Chat Flow')
+        graphs = {}
+        if clusters:
+            # one cluster per top-level branch of more than one node
+            counts = Counter(members.values())
+            for branch, count in counts.items():
+                if branch is not None and count > 1:
+                    graphs[branch] = Digraph(name=f"cluster_{_slug(branch)}")
+                    graphs[branch].attr(label=branch, style='rounded', color='gray')
+        cut = set()
+        if focus is not None:
+            cut = {a for a, b in edges if a in members and b not in members}
+            cut |= {b for a, b in edges if b in members and a not in members}
+
+        emitted = set()
 
+        def emit(name):
+            # every node right before its first edge, as the former recursive walk wrote them
+            if name in emitted:
+                return
+            emitted.add(name)
+            if name in boxes:
+                size, file = boxes[name]
+                dot.node(name, f"{name} ({size} nodes)", shape='folder', URL=f"{file}.{self.output_format}")
+            elif name not in members:
+                dot.node(name, name, shape='box', style='dashed')
+            else:
+                node = nodes[name]
+                attrs = dict(NODE_STYLES.get(node.type, NODE_STYLES["c"]), style='filled')
+                if name == focus:
+                    attrs['penwidth'] = '3'
+                if name in cut:
+                    attrs['peripheries'] = '2'
+                graphs.get(members[name], dot).node(name, f'"{node.content}"', **attrs)
+
+        for a, b in edges:
+            if a not in members or (focus is not None and b not in members):
+                continue
+            emit(a)
+            dot.edge(a, b)
+            emit(b)
+        for name in members:
+            emit(name)
+        for graph in graphs.values():
+            dot.subgraph(graph)
+        return dot
+
+    def _render_all(self, jobs, force):
+        rendered = [file for dot, file in jobs if self._render(dot, file, force)]
+        if len(jobs) == 1:
+            file = f"{jobs[0][1]}.{self.output_format}"
+            print(f"Flowchart saved as {file}" if rendered else f"Flowchart unchanged: {file}")
+        else:
+            print(f"Flowchart split into {len(jobs)} files, {len(rendered)} rendered, "
+                  f"{len(jobs) - len(rendered)} unchanged: {jobs[0][1]}*.{self.output_format}")
+        return [f"{file}.{self.output_format}" for file in rendered]
 
-def visualize_chat_graph(root_node, output_file="chat_flowchart"):
+    def _render(self, dot, output_file, force=False):
+        """Render unless the file was rendered from the same source before."""
+        target = f"{output_file}.{self.output_format}"
+        digest = hashlib.sha256(f"{self.output_format}\n{dot.source}".encode()).hexdigest()
+        hash_file = f"{target}.sha256"
+        if not force and os.path.exists(target):
+            try:
+                with open(hash_file) as f:
+                    if f.read().strip() == digest:
+                        return False
+            except OSError:
+                pass
+        dot.render(output_file, format=self.output_format, cleanup=True)
+        with open(hash_file, 'w') as f:
+            f.write(digest)
+        return True
+
+
+def visualize_chat_graph(root_node, output_file="chat_flowchart", **options):
     """Convenience function that creates a ChatVisualizer and calls visualize"""
     visualizer = ChatVisualizer()
-    visualizer.visualize(root_node, output_file)
+    return visualizer.visualize(root_node, output_file, **options)
 
 
 def load_node_map(db_path):
-    """Load the conversation graph from the database."""
-    node_map = {}
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Load all nodes
-    cursor.execute("SELECT name, content, type FROM chat_nodes")
-    rows = cursor.fetchall()
-    
-    for name, content, typ in rows:
-        node_map[name] = ChatNode(name, typ, content)
-    
-    # Load all edges
-    cursor.execute("SELECT from_name, to_name FROM chat_edges")
-    edges = cursor.fetchall()
-    
-    for from_name, to_name in edges:
-        parent = node_map[from_name]
-        child = node_map[to_name]
-        parent.addChild(child)
-    
-    conn.close()
-    return node_map
+    """Load the conversation graph from the database (or its snapshot)."""
+    return {node.name: node for node in load_graph(db_path)}
 
 
 def main():
@@ -129,6 +354,16 @@ def main():
                        help='Output file format')
     parser.add_argument('-d', '--database', default=None,
                        help='Path to the database file (defaults to ../data/bugland.db)')
+    parser.add_argument('--clusters', action='store_true',
+                       help='Group the nodes of every top-level branch into a box')
+    parser.add_argument('--max-nodes', type=int, default=None,
+                       help='Split the flow into files of about this many nodes (large graphs)')
+    parser.add_argument('--focus', default=None,
+                       help='Only render the nodes around this node')
+    parser.add_argument('--depth', type=int, default=2,
+                       help='Edges from the --focus node to render')
+    parser.add_argument('--force', action='store_true',
+                       help='Render even if the graph did not change since the last run')
     
     args = parser.parse_args()
     
@@ -156,7 +391,8 @@ def main():
     # Create visualization
     print("Generating visualization...")
     visualizer = ChatVisualizer(output_format=args.format)
-    visualizer.visualize(node_map, output_file=output_path)
+    visualizer.visualize(node_map, output_file=output_path, clusters=args.clusters, max_nodes=args.max_nodes,
+                         focus=args.focus, depth=args.depth, force=args.force)
     
     return 0
 